@@ -0,0 +1,128 @@
+import math
+import threading
+import time
+from collections import deque, namedtuple
+
+# Characters per page of plain text, used when a format has no page count
+TEXT_BYTES_PER_PAGE = 3000
+# Bytes that weigh as much as a page, so image-heavy files cost more than
+# their page count
+BYTES_PER_COST_UNIT = 256 * 1024
+
+# Assumed seconds per page until a job has finished and measured the rate
+DEFAULT_SECONDS_PER_UNIT = 0.01
+
+# Returned by acquire and handed back to release
+Ticket = namedtuple('Ticket', ['cost', 'admitted_at', 'wait_seconds'])
+
+
+def estimate_cost(size_bytes, pages=None):
+    """Estimated cost of extracting and analyzing a document, in pages.
+
+    Without a page count (plain text) the pages are estimated from the
+    size; files much larger than their page count suggests weigh by size.
+    """
+    if pages is None:
+        pages = size_bytes / TEXT_BYTES_PER_PAGE
+    return max(1.0, float(pages), size_bytes / BYTES_PER_COST_UNIT)
+
+
+class AdmissionRejected(Exception):
+    """The server is at capacity; retry after retry_after seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Weighted semaphore admitting heavy work by its estimated cost.
+
+    Jobs run while the sum of their costs stays within capacity; a job
+    costing more than the capacity is admitted alone. Waiting jobs are
+    admitted in arrival order, so a large job is not starved by a stream of
+    small ones. Once max_queue jobs are waiting, or a job has waited
+    max_wait_seconds, acquire raises AdmissionRejected with an estimate of
+    when capacity frees up.
+    """
+
+    def __init__(self, capacity, max_queue=16, max_wait_seconds=30):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self._condition = threading.Condition()
+        self._queue = deque()  # [cost] per waiting job, in arrival order
+        self._in_use = 0.0
+        self._running = 0
+        self._seconds_per_unit = None
+        self._waits = deque(maxlen=256)
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def acquire(self, cost):
+        """Wait until the job fits and return a ticket for release"""
+        cost = min(cost, self.capacity)
+        started = time.monotonic()
+        with self._condition:
+            if (self._queue or self._in_use + cost > self.capacity) and len(self._queue) >= self.max_queue:
+                self.rejected += 1
+                raise AdmissionRejected("Server is busy, please retry later", self._retry_after(cost))
+            entry = [cost]
+            self._queue.append(entry)
+            deadline = started + self.max_wait_seconds
+            while self._queue[0] is not entry or self._in_use + cost > self.capacity:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._queue.remove(entry)
+                    self._condition.notify_all()
+                    self.timed_out += 1
+                    raise AdmissionRejected("Timed out waiting for capacity, please retry later",
+                                            self._retry_after(cost))
+                self._condition.wait(remaining)
+            self._queue.popleft()
+            self._in_use += cost
+            self._running += 1
+            self.admitted += 1
+            now = time.monotonic()
+            self._waits.append(now - started)
+            # The next job in line may fit as well
+            self._condition.notify_all()
+        return Ticket(cost, now, now - started)
+
+    def release(self, ticket):
+        elapsed = time.monotonic() - ticket.admitted_at
+        with self._condition:
+            self._in_use -= ticket.cost
+            self._running -= 1
+            rate = elapsed / ticket.cost
+            self._seconds_per_unit = rate if self._seconds_per_unit is None else 0.8 * self._seconds_per_unit + 0.2 * rate
+            self._condition.notify_all()
+
+    def _retry_after(self, cost):
+        """Whole seconds until the running and queued work has likely drained"""
+        rate = self._seconds_per_unit or DEFAULT_SECONDS_PER_UNIT
+        backlog = self._in_use + sum(entry[0] for entry in self._queue) + cost
+        return max(1, min(300, math.ceil(rate * backlog / max(1, self._running))))
+
+    def stats(self):
+        with self._condition:
+            waits = sorted(self._waits)
+            return {
+                "capacity": self.capacity,
+                "in_use": round(self._in_use, 1),
+                "running": self._running,
+                "queued": len(self._queue),
+                "queued_cost": round(sum(entry[0] for entry in self._queue), 1),
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "wait_ms": {
+                    "mean": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+                    "p50": round(waits[len(waits) // 2] * 1000, 1) if waits else 0.0,
+                    "p95": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else 0.0,
+                    "max": round(waits[-1] * 1000, 1) if waits else 0.0
+                },
+                "seconds_per_page": round(self._seconds_per_unit, 4) if self._seconds_per_unit is not None else None
+            }
@@ -1,109 +1,214 @@
 import re
 import json
 import os
+import hashlib
+import threading
+from clause_matcher import ClauseMatcher, ClauseTypeRegistry
+from llm_backend import MockLLM, QueuedLLM, create_backend
+from metrics import StageTimer, timed_stage
+from retrieval import ChunkIndex, ChunkIndexBuilder, chunk_spans
+from cache import LRUCache
+from page_index import PageIndex
+from revisions import SectionMap, clause_types_fingerprint, section_hash
+from settings import get_setting
+from terms import KEY_TERMS, TermCounter, default_vocabulary
+
+# Bump whenever analysis output changes so cached results are not reused
+ANALYZER_VERSION = "9"
+
+# The parties of a contract are named in its opening words
+PREAMBLE_CHARS = 3000
+# "between Acme Inc. (the "Customer") and Northwind LLC, a Delaware company"
+PARTIES_PATTERN = re.compile(
+    r'\bbetween:?\s+(.{2,150}?)\s*(?:\([^)]{0,100}\)\s*)?,?\s+and\s+(.{2,150}?)\s*(?:\(|,|;|\.\s|\.?$|\n\s*\n)',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Exercises every analysis stage in warm_up()
+WARM_UP_TEXT = (
+    "Payment is due within thirty days of invoice.\n\n"
+    "Either party may terminate this Agreement with sixty days notice.\n\n"
+    "Neither party's liability shall exceed the fees paid under this Agreement.\n"
+)
+
 
 class DocumentProcessor:
-    def __init__(self):
+    def __init__(self, clause_registry=None):
         # Simple processor without external AI dependencies
         self.llm = None
+        self.ready = False
+        self._warming = None
+        self._backend = None
+        self._llm_lock = threading.Lock()
+        self.clause_registry = clause_registry if clause_registry is not None else ClauseTypeRegistry()
+        self.clause_matcher = ClauseMatcher(self.clause_registry)
+        self.chunk_size = get_setting('CHUNK_SIZE', 1000)
+        self.chunk_overlap = get_setting('CHUNK_OVERLAP', 200)
+        self.term_vocabulary = default_vocabulary()
+        self._term_vectors = LRUCache(get_setting('TERM_VECTOR_CACHE_ENTRIES', 128))
         
+    def load_backend(self, model_path=None):
+        """Load the local LLM backend once; starts no threads, so it is safe
+        to call in a server's master process before forking workers"""
+        if self._backend is not None and model_path is None:
+            return self._backend
+        model_path = model_path or get_setting('MODEL_PATH', None)
+        backend = create_backend(model_path, get_setting('LLM_BACKEND', None))
+        if isinstance(backend, MockLLM):
+            print("⚠️  Using fallback methods for document processing")
+            print("To enable full AI features, install llama-cpp-python and set MODEL_PATH to a GGUF model")
+        else:
+            print(f"✅ Loaded local LLM: {model_path}")
+        self._backend = backend
+        return backend
+
     def initialize_llm(self, model_path=None):
-        """Initialize the local LLM. Currently using fallback methods."""
-        print("⚠️  Using fallback methods for document processing")
-        print("To enable full AI features, install LangChain and download a local LLM model")
-        self.llm = MockLLM()
+        """Keep the loaded LLM warm behind a request queue that groups
+        requests by document prefix"""
+        self.llm = QueuedLLM(
+            self.load_backend(model_path),
+            max_group=get_setting('LLM_QUEUE_GROUP', 8)
+        )
+
+    def warm_up(self):
+        """Load the model and run the analysis path once so no request pays
+        for first-use costs; sets ready"""
+        self.load_backend()
+        analysis = DocumentAnalysis(self)
+        analysis.feed(WARM_UP_TEXT)
+        analysis.finish()
+        self.build_chunk_index(WARM_UP_TEXT).search("payment terms")
+        self.ready = True
+
+    def warm_up_in_background(self):
+        """Start warm_up on a daemon thread once, for hosts that do not call
+        it at startup (flask run, other WSGI servers)"""
+        with self._llm_lock:
+            if self.ready or self._warming is not None:
+                return
+            self._warming = threading.Thread(target=self._warm_up_quietly, daemon=True)
+        self._warming.start()
+
+    def _warm_up_quietly(self):
+        try:
+            self.warm_up()
+        except Exception as e:
+            print(f"⚠️  Warm-up failed, retrying on the next health check: {e}")
+            self._warming = None
+
+    def answer_question(self, question, context, summary=""):
+        """Answer a question from retrieved document excerpts.
+
+        The summary goes into the document-level prompt prefix, which stays
+        the same for follow-up questions on the same document.
+        """
+        return self._get_llm().generate(self._qa_prefix(summary), context, question,
+                                        max_tokens=get_setting('LLM_MAX_TOKENS', 256))
+
+    def stream_answer(self, question, context, summary="", cancel_event=None):
+        """Like answer_question, but yield tokens as the model produces them"""
+        return self._get_llm().stream(self._qa_prefix(summary), context, question,
+                                      max_tokens=get_setting('LLM_MAX_TOKENS', 256), cancel_event=cancel_event)
+
+    def _get_llm(self):
+        if self.llm is None:
+            with self._llm_lock:
+                if self.llm is None:
+                    self.initialize_llm()
+        return self.llm
+
+    def _qa_prefix(self, summary):
+        return ("You are a legal assistant. Answer questions using only the document below.\n"
+                f"Document summary: {summary}\n")
     
     def split_text(self, text):
-        """Split text into chunks for processing"""
-        # Simple text splitting
-        chunk_size = 1000
-        chunks = []
-        for i in range(0, len(text), chunk_size):
-            chunks.append(text[i:i + chunk_size])
-        return chunks
+        """Split text into overlapping CHUNK_SIZE chunks for processing"""
+        return [text[start:end] for start, end in chunk_spans(len(text), self.chunk_size, self.chunk_overlap)]
+
+    def chunk_index_builder(self):
+        """Start a BM25 chunk index using the configured chunk size and overlap"""
+        return ChunkIndexBuilder(self.chunk_size, self.chunk_overlap)
+
+    def build_chunk_index(self, text):
+        """Build a BM25 chunk index over a complete text"""
+        return ChunkIndex.build(text, self.chunk_size, self.chunk_overlap)
     
+    @timed_stage('clauses')
     def extract_clauses(self, text):
-        """Extract legal clauses from the document using regex patterns"""
-        clauses = []
-        
-        # Define common legal clause patterns
-        clause_patterns = [
-            {
-                'type': 'Termination',
-                'pattern': r'(termination|terminate|end|cancel).*?(?=\n\n|\n[A-Z]|$)',
-                'risk': 'medium'
-            },
-            {
-                'type': 'Liability',
-                'pattern': r'(liability|liable|damages|indemnification).*?(?=\n\n|\n[A-Z]|$)',
-                'risk': 'high'
-            },
-            {
-                'type': 'Payment',
-                'pattern': r'(payment|pay|invoice|due|terms).*?(?=\n\n|\n[A-Z]|$)',
-                'risk': 'low'
-            },
-            {
-                'type': 'Confidentiality',
-                'pattern': r'(confidential|confidentiality|secret|proprietary).*?(?=\n\n|\n[A-Z]|$)',
-                'risk': 'medium'
-            },
-            {
-                'type': 'Governing Law',
-                'pattern': r'(governing law|jurisdiction|venue|applicable law).*?(?=\n\n|\n[A-Z]|$)',
-                'risk': 'low'
-            },
-            {
-                'type': 'Non-Compete',
-                'pattern': r'(non.?compete|non.?competition|restrictive covenant).*?(?=\n\n|\n[A-Z]|$)',
-                'risk': 'high'
-            },
-            {
-                'type': 'Intellectual Property',
-                'pattern': r'(intellectual property|ip|patent|copyright|trademark).*?(?=\n\n|\n[A-Z]|$)',
-                'risk': 'medium'
-            }
-        ]
-        
-        for pattern_info in clause_patterns:
-            matches = re.finditer(pattern_info['pattern'], text, re.IGNORECASE | re.DOTALL)
-            for match in matches:
-                content = match.group(0).strip()
-                if len(content) > 20:  # Only include substantial clauses
-                    clauses.append({
-                        'type': pattern_info['type'],
-                        'description': f"{pattern_info['type']} clause found in document",
-                        'risk': pattern_info['risk'],
-                        'content': content[:300] + '...' if len(content) > 300 else content,
-                        'page': 1
-                    })
-        
-        return clauses
+        """Extract legal clauses from the document, one per classified section"""
+        page_index = PageIndex.from_text(text)
+        return [self.clause_from_span(span, page_index) for span in self.clause_matcher.find_spans(text)
+                if len(span.text) > 20]  # Only include substantial clauses
+
+    def extract_parties(self, preamble):
+        """Names of the two parties of a contract from its opening text
+        ("between X and Y"), or an empty list"""
+        match = PARTIES_PATTERN.search(preamble[:PREAMBLE_CHARS])
+        if not match:
+            return []
+        parties = []
+        for name in match.groups():
+            # "Acme Inc., a Delaware corporation" names Acme Inc; trailing
+            # periods are dropped so "Ltd." and "Ltd" count as one party
+            name = re.split(r',\s+(?:a|an)\s', ' '.join(name.split()), maxsplit=1)[0].strip(' ,;:."\'“”')
+            if 1 < len(name) <= 100 and name not in parties:
+                parties.append(name)
+        return parties
+
+    def clause_from_span(self, span, page_index):
+        """Build the clause dict reported to clients from a matched span"""
+        clause_type = span.clause_type
+        content = span.text.strip()
+        page, line = page_index.locate(span.start)
+        return {
+            'type': clause_type['type'],
+            'description': f"{clause_type['type']} clause found in document",
+            'risk': clause_type['risk'],
+            'content': content[:300] + '...' if len(content) > 300 else content,
+            'section': span.section,
+            'start': span.start,
+            'end': span.end,
+            'page': page,
+            'line': line
+        }
     
+    @timed_stage('summarize')
     def summarize_document(self, text):
         """Generate a basic summary of the document"""
+        return self.summary_from_terms(self.term_vector(text))
+
+    def term_counter(self):
+        """Start a single-pass term counter over the configured vocabulary"""
+        return TermCounter(self.term_vocabulary)
+
+    def term_vector(self, text):
+        """Return the TermVector of a text, reusing it if the text was counted before"""
+        key = hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest()
+        vector = self._term_vectors.get(key)
+        if vector is None:
+            counter = self.term_counter()
+            counter.feed(text)
+            vector = counter.finish()
+            self._term_vectors.put(key, vector)
+        return vector
+
+    def summary_from_terms(self, terms):
+        """Build the summary text from a document's TermVector"""
         summary_parts = []
         
         # Try to find document type
         doc_type = "legal document"
-        if any(word in text.lower() for word in ['agreement', 'contract']):
+        if terms.contains('agreement') or terms.contains('contract'):
             doc_type = "legal agreement or contract"
-        elif 'employment' in text.lower():
+        elif terms.contains('employment'):
             doc_type = "employment agreement"
-        elif 'lease' in text.lower():
+        elif terms.contains('lease'):
             doc_type = "lease agreement"
         
         summary_parts.append(f"This appears to be a {doc_type}.")
         
         # Count key terms
-        key_terms = {
-            'payment': text.lower().count('payment'),
-            'termination': text.lower().count('termination'),
-            'liability': text.lower().count('liability'),
-            'confidentiality': text.lower().count('confidentiality'),
-            'breach': text.lower().count('breach'),
-            'damages': text.lower().count('damages')
-        }
+        key_terms = {term: terms.count(term) for term in KEY_TERMS}
         
         summary_parts.append(f"Document contains {key_terms['payment']} payment-related terms, "
                            f"{key_terms['termination']} termination clauses, "
@@ -113,8 +218,7 @@ class DocumentProcessor:
                            f"{key_terms['damages']} damages provisions.")
         
         # Estimate document length
-        word_count = len(text.split())
-        summary_parts.append(f"Document is approximately {word_count} words long.")
+        summary_parts.append(f"Document is approximately {terms.word_count} words long.")
         
         # Add risk assessment
         high_risk_count = sum(1 for term in ['liability', 'breach', 'damages'] if key_terms[term] > 0)
@@ -123,6 +227,7 @@ class DocumentProcessor:
         
         return " ".join(summary_parts)
     
+    @timed_stage('risks')
     def analyze_risks(self, clauses):
         """Analyze and categorize risks from extracted clauses"""
         risk_counts = {'high': 0, 'medium': 0, 'low': 0}
@@ -136,10 +241,103 @@ class DocumentProcessor:
         
         return risk_counts
 
-class MockLLM:
-    """Mock LLM for development when no local model is available"""
-    def __call__(self, prompt):
-        return "Mock response - please install LangChain and a local LLM model for full functionality."
+    def analyze_stream(self, segments, parent_sections=None):
+        """Run summary, clause and risk analysis over an iterable of text segments.
+
+        Segments are consumed as they are produced, so analysis of early pages
+        overlaps with extraction of later ones and the full text is never held.
+        With the SectionMap of a previous version, only sections that changed
+        since that version are classified.
+        """
+        analysis = DocumentAnalysis(self, parent_sections)
+        for segment in segments:
+            analysis.feed(segment.text, segment.page)
+        return analysis.finish()
+
+class DocumentAnalysis:
+    """Analysis state for a document fed one page or paragraph at a time.
+
+    The text is segmented into sections as it arrives and each completed
+    section is classified. Sections whose content hash appears in
+    parent_sections, the SectionMap of an earlier version, take their
+    clause type from it instead.
+    """
+    def __init__(self, processor, parent_sections=None):
+        self.processor = processor
+        self.term_counter = processor.term_counter()
+        self.clause_scanner = processor.clause_matcher.scanner()
+        self.section_map = SectionMap(clause_types_fingerprint(processor.clause_registry))
+        if parent_sections is not None and parent_sections.fingerprint != self.section_map.fingerprint:
+            parent_sections = None  # Classified with other clause types: nothing to reuse
+        self.parent_sections = parent_sections
+        self.sections_reused = 0
+        self.clauses = []
+        self.risk_counts = {'high': 0, 'medium': 0, 'low': 0}
+        self.text_length = 0
+        self.preamble = ''
+        self.page_index = PageIndex()
+        # Stage times accumulated over all pages, recorded once in finish()
+        self.timer = StageTimer()
+
+    def feed(self, text, page=1):
+        self.page_index.add(self.text_length, text, page)
+        if self.text_length < PREAMBLE_CHARS:
+            self.preamble += text[:PREAMBLE_CHARS - self.text_length]
+        self.text_length += len(text)
+        with self.timer.stage('summarize'):
+            self.term_counter.feed(text)
+        self._add_sections(self.clause_scanner.feed, text)
+
+    def finish(self):
+        """Flush pending state and return the summary, clauses and risks"""
+        with self.timer.stage('summarize'):
+            terms = self.term_counter.finish()
+            summary = self.processor.summary_from_terms(terms)
+        self._add_sections(self.clause_scanner.finish)
+        risks = dict(self.risk_counts)
+        risks['total'] = len(self.clauses)
+        self.timer.record()
+        total = len(self.section_map.sections)
+        return {
+            'summary': summary,
+            'terms': terms.to_dict(),
+            'clauses': self.clauses,
+            'risks': risks,
+            'parties': self.processor.extract_parties(self.preamble),
+            'text_length': self.text_length,
+            'page_index': self.page_index,
+            'sections': self.section_map,
+            'section_stats': {
+                'total': total,
+                'reused': self.sections_reused,
+                'reanalyzed': total - self.sections_reused
+            }
+        }
+
+    def _add_sections(self, scan, *args):
+        """Run a section scanner step, classify or look up the completed
+        sections and add their clauses and risks"""
+        matcher = self.processor.clause_matcher
+        registry = self.processor.clause_registry
+        with self.timer.stage('clauses'):
+            first_new = len(self.clauses)
+            for section in scan(*args):
+                digest = section_hash(section)
+                found, type_name = (self.parent_sections.lookup(digest) if self.parent_sections is not None
+                                    else (False, None))
+                if found:
+                    self.sections_reused += 1
+                    span = matcher.clause_span(section._replace(context=type_name)) if type_name else None
+                else:
+                    span = matcher.clause_span(section) if len(section.text) > 20 else None
+                self.section_map.add(digest, section.start, len(section.text),
+                                     span.clause_type['type'] if span is not None else None)
+                if span is not None:
+                    self.clauses.append(self.processor.clause_from_span(span, self.page_index))
+        with self.timer.stage('risks'):
+            for clause in self.clauses[first_new:]:
+                if clause['risk'] in self.risk_counts:
+                    self.risk_counts[clause['risk']] += 1
 
 # Global processor instance
 document_processor = DocumentProcessor()
\ No newline at end of file
@@ -0,0 +1,127 @@
+import gzip
+import hashlib
+import json
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CLAUSE_FIELDS = ('type', 'description', 'risk', 'content', 'section', 'start', 'end', 'page', 'line')
+RISK_LEVELS = ('high', 'medium', 'low')
+# Document-level parts of an analysis a page can include besides its clauses
+INCLUDABLE = ('summary', 'risks', 'terms')
+
+# Bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+
+
+def _list_arg(args, name):
+    """Comma-separated values of a query parameter that may also be repeated"""
+    return [value.strip() for raw in args.getlist(name) for value in raw.split(',') if value.strip()]
+
+
+def parse_query(args, default_limit=100, max_limit=1000):
+    """Validate the query parameters of a GET /analysis request.
+
+    Returns the normalized query, which also keys the response's ETag;
+    raises ValueError with a message for the client on bad input.
+    """
+    try:
+        offset = int(args.get('offset', 0))
+        limit = int(args.get('limit', default_limit))
+    except ValueError:
+        raise ValueError("offset and limit must be integers")
+    if offset < 0 or limit < 1:
+        raise ValueError("offset must be >= 0 and limit >= 1")
+
+    risks = sorted({risk.lower() for risk in _list_arg(args, 'risk')})
+    unknown = [risk for risk in risks if risk not in RISK_LEVELS]
+    if unknown:
+        raise ValueError(f"Unknown risk level {unknown[0]!r}; use {', '.join(RISK_LEVELS)}")
+    fields = _list_arg(args, 'fields') or list(CLAUSE_FIELDS)
+    unknown = [field for field in fields if field not in CLAUSE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown clause field {unknown[0]!r}; use {', '.join(CLAUSE_FIELDS)}")
+    include = sorted(set(_list_arg(args, 'include')))
+    unknown = [part for part in include if part not in INCLUDABLE]
+    if unknown:
+        raise ValueError(f"Cannot include {unknown[0]!r}; use {', '.join(INCLUDABLE)}")
+    encoding = args.get('format', 'full')
+    if encoding not in ('full', 'compact'):
+        raise ValueError("format must be full or compact")
+
+    return {
+        'offset': offset,
+        'limit': min(limit, max_limit),
+        'types': sorted({clause_type.lower() for clause_type in _list_arg(args, 'type')}),
+        'risks': risks,
+        'fields': list(dict.fromkeys(fields)),
+        'include': include,
+        'format': encoding
+    }
+
+
+def select_clauses(clauses, query):
+    """Return (number of matching clauses, the requested page of them)"""
+    types = set(query['types'])
+    risks = set(query['risks'])
+    if types or risks:
+        clauses = [clause for clause in clauses
+                   if (not types or clause['type'].lower() in types)
+                   and (not risks or clause.get('risk', 'low') in risks)]
+    return len(clauses), clauses[query['offset']:query['offset'] + query['limit']]
+
+
+def encode_clauses(clauses, fields, encoding):
+    """Project clauses onto fields; the compact encoding names the fields
+    once and sends each clause as a row of values"""
+    if encoding == 'compact':
+        return {'fields': fields, 'rows': [[clause.get(field) for field in fields] for clause in clauses]}
+    return [{field: clause.get(field) for field in fields} for clause in clauses]
+
+
+def analysis_page(analysis, query):
+    """Response body for one page of a stored analysis"""
+    matched, clauses = select_clauses(analysis['clauses'], query)
+    next_offset = query['offset'] + len(clauses)
+    body = {
+        'doc_id': analysis['doc_id'],
+        'filename': analysis['filename'],
+        'text_length': analysis['text_length'],
+        'total': len(analysis['clauses']),
+        'matched': matched,
+        'offset': query['offset'],
+        'limit': query['limit'],
+        'next_offset': next_offset if next_offset < matched else None,
+        'clauses': encode_clauses(clauses, query['fields'], query['format'])
+    }
+    for part in query['include']:
+        body[part] = analysis.get(part)
+    return body
+
+
+def page_etag(analysis, query, analyzer_version):
+    """Strong validator of a page before content coding.
+
+    Analyses are deterministic for a given upload and analyzer version, so
+    the page is identified without serializing it.
+    """
+    key = json.dumps([analysis['doc_id'], analyzer_version, analysis['filename'], query], sort_keys=True)
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=12).hexdigest()
+
+
+def choose_encoding(accept_encodings):
+    """Best content coding the client accepts: br when available, then gzip"""
+    offered = (['br'] if brotli is not None else []) + ['gzip']
+    return accept_encodings.best_match(offered) or 'identity'
+
+
+def encode_body(body, encoding):
+    """Serialize a page and apply the content coding"""
+    data = json.dumps(body, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    if len(data) < COMPRESS_MIN_BYTES or encoding == 'identity':
+        return data, 'identity'
+    if encoding == 'br':
+        return brotli.compress(data, quality=5), 'br'
+    return gzip.compress(data, compresslevel=6, mtime=0), 'gzip'
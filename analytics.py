@@ -0,0 +1,262 @@
+import os
+import sqlite3
+import threading
+import time
+
+RISK_LEVELS = ('high', 'medium', 'low')
+DIMENSIONS = ('clause_type', 'counterparty', 'month')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id TEXT PRIMARY KEY,
+    filename TEXT,
+    month TEXT NOT NULL,
+    analyzed_at REAL NOT NULL,
+    text_length INTEGER NOT NULL,
+    clauses INTEGER NOT NULL,
+    high INTEGER NOT NULL,
+    medium INTEGER NOT NULL,
+    low INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documents_month ON documents (month, analyzed_at);
+
+CREATE TABLE IF NOT EXISTS document_counterparties (
+    counterparty TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    PRIMARY KEY (counterparty, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS document_counterparties_doc ON document_counterparties (doc_id);
+
+CREATE TABLE IF NOT EXISTS document_clauses (
+    clause_type TEXT NOT NULL,
+    risk TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    clauses INTEGER NOT NULL,
+    PRIMARY KEY (clause_type, risk, doc_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS document_clauses_doc ON document_clauses (doc_id);
+
+-- Pre-aggregated counts per dimension value and risk level; risk 'all'
+-- rows count every document and clause of the value
+CREATE TABLE IF NOT EXISTS rollups (
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    risk TEXT NOT NULL,
+    documents INTEGER NOT NULL,
+    clauses INTEGER NOT NULL,
+    PRIMARY KEY (dimension, value, risk)
+) WITHOUT ROWID;
+"""
+
+
+def month_of(timestamp):
+    return time.strftime('%Y-%m', time.gmtime(timestamp))
+
+
+def _contributions(month, counterparties, clause_counts):
+    """Rollup increments of one document: (dimension, value, risk) ->
+    [documents, clauses]. clause_counts maps (clause type, risk) to a count."""
+    by_risk = {}
+    for (_, risk), count in clause_counts.items():
+        by_risk[risk] = by_risk.get(risk, 0) + count
+    total = sum(by_risk.values())
+
+    rows = {}
+
+    def add(dimension, value, risk, documents, clauses):
+        row = rows.setdefault((dimension, value, risk), [0, 0])
+        row[0] += documents
+        row[1] += clauses
+
+    for dimension, values in (('total', ['']), ('month', [month]), ('counterparty', counterparties)):
+        for value in values:
+            add(dimension, value, 'all', 1, total)
+            for risk, count in by_risk.items():
+                add(dimension, value, risk, 1, count)
+    types = {}
+    for (clause_type, risk), count in clause_counts.items():
+        add('clause_type', clause_type, risk, 1, count)
+        types[clause_type] = types.get(clause_type, 0) + count
+    for clause_type, count in types.items():
+        add('clause_type', clause_type, 'all', 1, count)
+    return rows
+
+
+class AnalyticsStore:
+    """Corpus-level clause and risk statistics in an SQLite database.
+
+    Each analyzed document is stored with its clause counts by type and
+    risk and its counterparties, and its contribution is added to rollup
+    tables in the same transaction. Dashboard queries read the rollups and
+    never rescan documents. Recording a document again replaces its earlier
+    contribution, so re-analysis does not double count.
+
+    The database runs in WAL mode with one connection per thread and
+    process, so serve.py workers can share it.
+    """
+
+    def __init__(self, path, own_parties=()):
+        self.path = path
+        # Parties that are us, not counterparties, compared case-insensitively
+        self.own_parties = {party.lower().strip(' .') for party in own_parties}
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = sqlite3.connect(path)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        # A connection opened before serve.py forked belongs to the master
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def counterparties(self, parties, counterparty=None):
+        """A document's counterparties: the one given at upload, otherwise
+        the parties named in it that are not our own"""
+        if counterparty:
+            return [counterparty.strip()]
+        return [party for party in parties if party.lower().strip(' .') not in self.own_parties]
+
+    def record(self, analysis, counterparty=None, analyzed_at=None):
+        """Store an analysis and add it to the rollups, replacing any earlier
+        version of the same doc_id"""
+        analyzed_at = analyzed_at if analyzed_at is not None else time.time()
+        month = month_of(analyzed_at)
+        counterparties = sorted(set(self.counterparties(analysis.get('parties', []), counterparty)))
+        clause_counts = {}
+        for clause in analysis['clauses']:
+            key = (clause['type'], clause.get('risk', 'low'))
+            clause_counts[key] = clause_counts.get(key, 0) + 1
+        risks = analysis['risks']
+        doc_id = analysis['doc_id']
+
+        connection = self._connection()
+        # IMMEDIATE takes the write lock up front, so concurrent workers
+        # cannot interleave their read-modify-write of the rollups
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            self._remove(connection, doc_id)
+            connection.execute(
+                "INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (doc_id, analysis.get('filename'), month, analyzed_at, analysis.get('text_length', 0),
+                 len(analysis['clauses']), risks.get('high', 0), risks.get('medium', 0), risks.get('low', 0))
+            )
+            connection.executemany("INSERT INTO document_counterparties VALUES (?, ?)",
+                                   [(party, doc_id) for party in counterparties])
+            connection.executemany("INSERT INTO document_clauses VALUES (?, ?, ?, ?)",
+                                   [(clause_type, risk, doc_id, count)
+                                    for (clause_type, risk), count in clause_counts.items()])
+            self._apply(connection, _contributions(month, counterparties, clause_counts), 1)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def _remove(self, connection, doc_id):
+        """Delete a stored document and subtract it from the rollups"""
+        row = connection.execute("SELECT month FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        if row is None:
+            return
+        counterparties = [party for party, in connection.execute(
+            "SELECT counterparty FROM document_counterparties WHERE doc_id = ?", (doc_id,))]
+        clause_counts = {(clause_type, risk): count for clause_type, risk, count in connection.execute(
+            "SELECT clause_type, risk, clauses FROM document_clauses WHERE doc_id = ?", (doc_id,))}
+        contributions = _contributions(row[0], counterparties, clause_counts)
+        self._apply(connection, contributions, -1)
+        connection.executemany(
+            "DELETE FROM rollups WHERE dimension = ? AND value = ? AND risk = ? AND documents <= 0",
+            list(contributions)
+        )
+        for table in ('documents', 'document_counterparties', 'document_clauses'):
+            connection.execute(f"DELETE FROM {table} WHERE doc_id = ?", (doc_id,))
+
+    def _apply(self, connection, contributions, sign):
+        connection.executemany(
+            "INSERT INTO rollups VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (dimension, value, risk) DO UPDATE SET "
+            "documents = documents + excluded.documents, clauses = clauses + excluded.clauses",
+            [(dimension, value, risk, sign * documents, sign * clauses)
+             for (dimension, value, risk), (documents, clauses) in contributions.items()]
+        )
+
+    def totals(self):
+        """Documents and clauses in the store, overall and per risk level"""
+        result = {'documents': 0, 'clauses': 0, 'risks': {risk: {'documents': 0, 'clauses': 0} for risk in RISK_LEVELS}}
+        for risk, documents, clauses in self._connection().execute(
+                "SELECT risk, documents, clauses FROM rollups WHERE dimension = 'total'"):
+            if risk == 'all':
+                result['documents'], result['clauses'] = documents, clauses
+            elif risk in result['risks']:
+                result['risks'][risk] = {'documents': documents, 'clauses': clauses}
+        return result
+
+    def risk_distribution(self, dimension, limit=100, prefix=None):
+        """Clause counts per risk level for each value of a dimension, largest
+        first. Each row also counts the documents with a clause of each
+        risk level. Months come newest first instead."""
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension {dimension!r}; use {', '.join(DIMENSIONS)}")
+        query = "SELECT value, risk, documents, clauses FROM rollups WHERE dimension = ?"
+        params = [dimension]
+        if prefix:
+            # A range on the primary key, e.g. the months of one year
+            query += " AND value >= ? AND value < ?"
+            params += [prefix, prefix + '￿']
+        rows = {}
+        for value, risk, documents, clauses in self._connection().execute(query, params):
+            row = rows.setdefault(value, {dimension: value, 'documents': 0, 'clauses': 0,
+                                          **{risk_level: 0 for risk_level in RISK_LEVELS},
+                                          'documents_by_risk': {}})
+            if risk == 'all':
+                row['documents'], row['clauses'] = documents, clauses
+            else:
+                row[risk] = clauses
+                row['documents_by_risk'][risk] = documents
+        if dimension == 'month':
+            ordered = sorted(rows.values(), key=lambda row: row['month'], reverse=True)
+        else:
+            ordered = sorted(rows.values(), key=lambda row: (-row['clauses'], row[dimension]))
+        return ordered[:limit]
+
+    def documents(self, clause_type=None, risk=None, counterparty=None, month=None, limit=100, offset=0):
+        """Documents matching the filters, newest first, for drilling down
+        from a dashboard bucket"""
+        query = ["SELECT d.doc_id, d.filename, d.month, d.analyzed_at, d.text_length,"
+                 " d.clauses, d.high, d.medium, d.low FROM documents d"]
+        where, params = [], []
+        if clause_type or risk:
+            if clause_type and risk:
+                query.append("JOIN document_clauses c ON c.doc_id = d.doc_id AND c.clause_type = ? AND c.risk = ?")
+                params += [clause_type, risk]
+            elif clause_type:
+                query.append("JOIN (SELECT DISTINCT doc_id FROM document_clauses WHERE clause_type = ?) c"
+                             " ON c.doc_id = d.doc_id")
+                params.append(clause_type)
+            else:
+                where.append(f"d.{risk} > 0" if risk in RISK_LEVELS else "0")
+        if counterparty:
+            query.append("JOIN document_counterparties p ON p.doc_id = d.doc_id AND p.counterparty = ?")
+            params.append(counterparty)
+        if month:
+            where.append("d.month = ?")
+            params.append(month)
+        if where:
+            query.append("WHERE " + " AND ".join(where))
+        query.append("ORDER BY d.analyzed_at DESC LIMIT ? OFFSET ?")
+        params += [limit, offset]
+        columns = ['doc_id', 'filename', 'month', 'analyzed_at', 'text_length', 'clauses', 'high', 'medium', 'low']
+        return [dict(zip(columns, row)) for row in self._connection().execute(' '.join(query), params)]
+
+    def stats(self):
+        totals = self.totals()
+        return {"path": self.path, "documents": totals['documents'], "clauses": totals['clauses']}
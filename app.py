@@ -1,34 +1,348 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+import hashlib
 import os
-import fitz  # PyMuPDF
-from docx import Document
-from ai_processor import document_processor
+import json
+import threading
+import time
+from admission import AdmissionController, AdmissionRejected, estimate_cost
+from ai_processor import document_processor, ANALYZER_VERSION
+import analysis_view
+from analytics import DIMENSIONS, RISK_LEVELS, AnalyticsStore
+from cache import AnalysisCache, AnswerCache, LRUCache, is_content_hash
+from extraction import document_format, estimated_page_count, iter_text
+from jobs import JobManager, run_upload_analysis
+import metrics
+from metrics import SlowRequestProfiler, StageTimer, timed
+from page_index import PageIndex
+from revisions import SectionMap, diff_clauses
+from sessions import SessionStore
+from upload_store import UploadBuffer, UploadStore
+from settings import get_setting
+from vector_index import VectorIndex, create_embedder
 
 app = Flask(__name__)
 CORS(app)
 
-UPLOAD_FOLDER = 'uploads'
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-def extract_text(file_path):
-    if file_path.endswith('.pdf'):
-        text = ""
-        with fitz.open(file_path) as doc:
-            for page in doc:
-                text += page.get_text()
-        return text
-    elif file_path.endswith('.docx'):
-        doc = Document(file_path)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
-    elif file_path.endswith('.txt'):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read()
+# Optional sampling profiler that saves the stacks of slow requests
+PROFILE_SLOW_REQUESTS_MS = get_setting('PROFILE_SLOW_REQUESTS_MS', None)
+slow_request_profiler = SlowRequestProfiler(
+    PROFILE_SLOW_REQUESTS_MS / 1000,
+    interval_seconds=get_setting('PROFILE_INTERVAL_MS', 5) / 1000,
+    output_dir=get_setting('PROFILE_DIR', 'profiles')
+) if PROFILE_SLOW_REQUESTS_MS else None
+
+UPLOAD_FOLDER = get_setting('UPLOAD_FOLDER', 'uploads')
+# Uploads are processed from memory; larger ones are spooled to a temporary file
+UPLOAD_SPOOL_BYTES = get_setting('UPLOAD_SPOOL_MB', 16) * 1024 * 1024
+
+# Optional content-addressed archive of uploaded files
+upload_store = UploadStore(
+    UPLOAD_FOLDER,
+    enabled=get_setting('PERSIST_UPLOADS', False),
+    max_bytes=get_setting('UPLOAD_MAX_MB', 1024) * 1024 * 1024,
+    max_age_seconds=get_setting('UPLOAD_RETENTION_DAYS', 30) * 24 * 3600
+)
+
+# Repeat uploads of the same bytes are answered from this cache
+analysis_cache = AnalysisCache(
+    get_setting('CACHE_DIR', 'analysis_cache'),
+    ANALYZER_VERSION,
+    memory_entries=get_setting('CACHE_MEMORY_ENTRIES', 64),
+    max_disk_bytes=get_setting('CACHE_MAX_DISK_MB', 256) * 1024 * 1024
+)
+
+# Section hashes and clause types of analyzed documents, reused when a
+# revised version is uploaded with parent_doc_id
+section_cache = AnalysisCache(
+    get_setting('SECTION_CACHE_DIR', 'section_cache'),
+    ANALYZER_VERSION,
+    memory_entries=get_setting('CACHE_MEMORY_ENTRIES', 64),
+    max_disk_bytes=get_setting('SECTION_CACHE_MAX_DISK_MB', 128) * 1024 * 1024
+)
+
+# Answers to repeated /chat questions, dropped when a document is re-analyzed
+answer_cache = AnswerCache(
+    max_entries=get_setting('ANSWER_CACHE_ENTRIES', 1024),
+    ttl_seconds=get_setting('ANSWER_CACHE_TTL_SECONDS', 3600)
+)
+
+# Extracted text of uploaded documents, looked up by doc_id from /chat
+session_store = SessionStore(
+    get_setting('SESSION_DIR', 'sessions'),
+    max_memory_bytes=get_setting('SESSION_MEMORY_MB', 256) * 1024 * 1024,
+    spill_threshold_bytes=get_setting('SESSION_SPILL_KB', 512) * 1024
+)
+# Expired sessions are rebuilt from stored uploads one at a time
+session_restore_lock = threading.Lock()
+
+# Extraction and analysis in request threads wait for capacity by their
+# estimated cost in pages; beyond the queue depth uploads get 429
+admission = AdmissionController(
+    capacity=get_setting('ADMISSION_CAPACITY_PAGES', 400),
+    max_queue=get_setting('ADMISSION_MAX_QUEUE', 16),
+    max_wait_seconds=get_setting('ADMISSION_MAX_WAIT_SECONDS', 30)
+)
+
+# Async uploads run extraction and analysis on a local worker pool
+job_manager = JobManager(
+    backend=get_setting('JOB_BACKEND', 'local'),
+    max_workers=get_setting('JOB_WORKERS', None)
+)
+
+# Clause and risk counts of every analyzed document with incrementally
+# maintained rollups, queried by the /analytics endpoints
+analytics_store = AnalyticsStore(
+    get_setting('ANALYTICS_DB', 'analytics.db'),
+    own_parties=get_setting('ANALYTICS_OWN_PARTIES', [])
+)
+ANALYTICS_MAX_LIMIT = get_setting('ANALYTICS_MAX_LIMIT', 1000)
+
+# Chunk embeddings of every analyzed document, searched by /search
+vector_index = VectorIndex(
+    get_setting('VECTOR_INDEX_DIR', 'vector_index'),
+    create_embedder(get_setting('EMBEDDING_MODEL', None), get_setting('EMBEDDING_DIM', 512))
+)
+
+# Serialized and compressed pages of GET /analysis, keyed by ETag and content coding
+analysis_page_cache = LRUCache(get_setting('ANALYSIS_PAGE_CACHE_ENTRIES', 128))
+ANALYSIS_PAGE_LIMIT = get_setting('ANALYSIS_PAGE_LIMIT', 100)
+ANALYSIS_PAGE_MAX_LIMIT = get_setting('ANALYSIS_PAGE_MAX_LIMIT', 1000)
+
+CHAT_TOP_K = get_setting('CHAT_TOP_K', 3)
+SEARCH_MAX_K = get_setting('SEARCH_MAX_K', 100)
+
+def configure_for_workers():
+    """Keep per-document state on disk so any worker process can serve any
+    doc_id or job id; called by serve.py before forking"""
+    session_store.spill_threshold_bytes = 0
+    job_manager.persist_to(get_setting('JOB_STATE_DIR', 'jobs'))
+    # Snapshots of a previous run's workers must not count towards this one
+    metrics.registry.share_to(get_setting('METRICS_DIR', 'metrics'), clear=True)
+
+def request_endpoint():
+    """Route pattern of the current request, used as a low-cardinality metric label"""
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+@app.before_request
+def start_request_metrics():
+    request.environ['legal_ai.started'] = time.perf_counter()
+    metrics.start_request()
+    metrics.REQUESTS_IN_FLIGHT.inc(endpoint=request_endpoint())
+    if slow_request_profiler is not None:
+        request.environ['legal_ai.profile'] = slow_request_profiler.begin()
+
+@app.after_request
+def add_server_timing(response):
+    started = request.environ.get('legal_ai.started', time.perf_counter())
+    elapsed = time.perf_counter() - started
+    timings = metrics.finish_request()
+    response.headers['Server-Timing'] = metrics.server_timing_header(timings, elapsed)
+    endpoint, method, status = request_endpoint(), request.method, response.status_code
+    if response.is_streamed:
+        # The body (e.g. /chat Server-Sent Events) is generated after the
+        # request ends; the request stays in flight until the stream closes
+        request.environ['legal_ai.streamed'] = True
+        token = request.environ.pop('legal_ai.profile', None)
+
+        def finish_stream():
+            metrics.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=method,
+                                            status=status)
+            metrics.REQUESTS_IN_FLIGHT.dec(endpoint=endpoint)
+            end_profile(token, method, endpoint)
+            metrics.registry.share()
+
+        response.call_on_close(finish_stream)
     else:
-        return "Unsupported file format"
+        metrics.REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=method, status=status)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    if request.environ.pop('legal_ai.streamed', False):
+        return  # Finished when the stream closes
+    metrics.REQUESTS_IN_FLIGHT.dec(endpoint=request_endpoint())
+    end_profile(request.environ.pop('legal_ai.profile', None), request.method, request_endpoint())
+    metrics.registry.share()
+
+def end_profile(token, method, endpoint):
+    """Stop sampling a request and keep its profile if it was slow"""
+    if token is None:
+        return
+    path = slow_request_profiler.end(token, f"{method} {endpoint}")
+    if path:
+        metrics.SLOW_REQUEST_PROFILES.inc(endpoint=endpoint)
+        print(f"🐢 Slow request profiled: {path}")
+
+def record_document_metrics(filename, size_bytes, analysis):
+    """Count a processed document, its bytes, pages and extracted characters"""
+    kind = document_format(filename).lstrip('.') or 'other'
+    page_numbers = analysis['page_index'].page_numbers
+    metrics.DOCUMENTS.inc(format=kind)
+    metrics.UPLOAD_BYTES.inc(size_bytes, format=kind)
+    metrics.PAGES.inc(page_numbers[-1] if page_numbers else 0, format=kind)
+    metrics.EXTRACTED_CHARS.inc(analysis['text_length'], format=kind)
+
+def tee_text(segments, *consumers):
+    """Pass segments through while handing their text to each consumer"""
+    for segment in segments:
+        for consume in consumers:
+            consume(segment.text)
+        yield segment
+
+def chunk_index_for(session):
+    """Return the session's BM25 chunk index, rebuilding it if it was not kept"""
+    index = session.get('chunk_index')
+    if index is None:
+        index = document_processor.build_chunk_index(session.text)
+        session.attach('chunk_index', index, index.size_bytes())
+        session_store.touch(session.doc_id)
+    return index
+
+def index_document(session):
+    """Add a document's chunks to the corpus-wide vector index"""
+    if vector_index.contains(session.doc_id):
+        return
+    chunk_index = chunk_index_for(session)
+    page_index = session.get('page_index')
+    chunks = []
+    for chunk_id, (start, end) in enumerate(chunk_index.spans):
+        chunks.append({
+            "chunk": chunk_id,
+            "start": start,
+            "end": end,
+            "page": page_index.locate(start)[0] if page_index is not None else None,
+            "text": session.slice(start, end)
+        })
+    with timed('embed'):
+        vector_index.add_document(session.doc_id, session.filename, chunks)
+
+def restore_session(doc_id, source, filename, summary):
+    """Re-extract the text and page index of an analyzed document whose
+    session expired; the analysis itself comes from the cache"""
+    writer = session_store.writer(doc_id, filename)
+    page_index = PageIndex()
+    for segment in iter_text(source, filename=filename):
+        writer.write(segment.text)
+        page_index.add(segment.offset, segment.text, segment.page)
+    session = writer.close()
+    session.attach('page_index', page_index, page_index.size_bytes())
+    session.attach('summary', summary, len(summary))
+    session_store.touch(doc_id)
+    index_document(session)
+    return session
+
+def restore_expired_session(doc_id):
+    """Session of a cached analysis rebuilt from the stored upload, or None"""
+    cached = analysis_cache.get(doc_id)
+    if cached is None or not upload_store.enabled:
+        return None
+    path = upload_store.path_for(doc_id, cached['filename'])
+    if not os.path.exists(path):
+        return None
+    with session_restore_lock:
+        session = session_store.get(doc_id)  # Restored by a concurrent request
+        if session is None:
+            print(f"Restoring session {doc_id[:12]} from the stored upload")
+            session = restore_session(doc_id, path, cached['filename'], cached['summary'])
+    return session
+
+def build_analysis_results(analysis, filename, doc_id):
+    return {
+        "summary": analysis['summary'],
+        "clauses": analysis['clauses'],
+        "risks": analysis['risks'],
+        "terms": analysis['terms'],
+        "parties": analysis['parties'],
+        "processed": True,
+        "filename": filename,
+        "doc_id": doc_id,
+        "text_length": analysis['text_length']
+    }
+
+def upload_response_body(analysis_results, revision=None):
+    body = {
+        "message": "File uploaded and processed successfully",
+        "doc_id": analysis_results['doc_id'],
+        "analysis_url": f"/analysis/{analysis_results['doc_id']}",
+        "analysis": analysis_results
+    }
+    if revision is not None:
+        body["revision"] = revision
+    return body
+
+def cached_upload_response(cached, filename, doc_id, revision=None):
+    return jsonify(upload_response_body(dict(cached, filename=filename, doc_id=doc_id), revision))
+
+def load_parent_version(parent_doc_id):
+    """Section map and clauses of the earlier version a revised upload
+    replaces, or None if either has expired or is unreadable"""
+    sections = section_cache.get(parent_doc_id)
+    analysis = analysis_cache.get(parent_doc_id)
+    if sections is None or analysis is None:
+        return None
+    try:
+        return {
+            "doc_id": parent_doc_id,
+            "sections": SectionMap.from_dict(sections),
+            "clauses": analysis['clauses']
+        }
+    except (KeyError, TypeError, ValueError) as e:
+        print(f"⚠️  Ignoring unreadable cache entries of {parent_doc_id[:12]}: {e}")
+        return None
+
+def revision_summary(parent, sections, clauses, section_stats=None):
+    """Clause diff against the parent version, plus section reuse counts
+    when the document was analyzed incrementally"""
+    revision = {
+        "parent_doc_id": parent['doc_id'],
+        "clause_diff": diff_clauses(parent['sections'], parent['clauses'], sections, clauses)
+    }
+    if section_stats is not None:
+        revision["sections"] = section_stats
+    return revision
+
+def admit_upload(upload, filename):
+    """Wait until the server has capacity to extract and analyze an upload;
+    raises AdmissionRejected when the queue is full or the wait too long"""
+    try:
+        pages = estimated_page_count(upload.source, filename)
+    except Exception:
+        pages = None  # Unreadable files are reported by the extraction itself
+    ticket = admission.acquire(estimate_cost(upload.size, pages))
+    metrics.record_stage('admission', ticket.wait_seconds)
+    return ticket
+
+def record_analytics(analysis_results, counterparty=None):
+    """Add an analysis to the corpus statistics; a failure there never fails the upload"""
+    try:
+        with timed('analytics'):
+            analytics_store.record(analysis_results, counterparty)
+    except Exception as e:
+        print(f"⚠️  Could not record analytics for {analysis_results['doc_id'][:12]}: {e}")
+
+def wants_async_upload():
+    value = request.args.get('async', request.form.get('async', ''))
+    return value.lower() in ('1', 'true', 'yes')
+
+def finish_async_upload(worker_result, filename, doc_id, size_bytes, parent=None, counterparty=None):
+    """Runs in the server process once a worker has analyzed an upload"""
+    analysis, text = worker_result
+    record_document_metrics(filename, size_bytes, analysis)
+    session = session_store.create(doc_id, filename, text)
+    session.attach('page_index', analysis['page_index'], analysis['page_index'].size_bytes())
+    session.attach('summary', analysis['summary'], len(analysis['summary']))
+    analysis_results = build_analysis_results(analysis, filename, doc_id)
+    analysis_cache.put(doc_id, analysis_results)
+    section_cache.put(doc_id, analysis['sections'].to_dict())
+    answer_cache.invalidate(doc_id)
+    index_document(session)
+    record_analytics(analysis_results, counterparty)
+    print(f"Async analysis finished for {filename}: {len(analysis['clauses'])} clauses")
+    revision = None
+    if parent is not None:
+        revision = revision_summary(parent, analysis['sections'], analysis['clauses'], analysis['section_stats'])
+    return upload_response_body(analysis_results, revision)
 
 @app.route('/upload', methods=['POST'])
 def upload_and_extract():
@@ -43,48 +357,246 @@ def upload_and_extract():
     
     print(f"Uploaded file: {filename}")
     
-    file_path = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(file_path)
-    print(f"Saved to: {file_path}")
+    # A revised version names the doc_id of the version it replaces
+    parent = None
+    parent_doc_id = request.args.get('parent_doc_id', request.form.get('parent_doc_id', ''))
+    if parent_doc_id and not is_content_hash(parent_doc_id):
+        return jsonify({"error": "parent_doc_id must be the doc_id /upload returned for the previous version"}), 400
+    # Overrides the counterparty named in the document for the analytics
+    counterparty = request.args.get('counterparty', request.form.get('counterparty', '')) or None
     
+    upload = UploadBuffer(file.stream, filename, UPLOAD_SPOOL_BYTES)
+    doc_id = upload.doc_id
+    release_upload = True
+    ticket = None
     try:
-        # Extract text from document
-        extracted_text = extract_text(file_path)
-        print(f"Text extraction done. Length: {len(extracted_text)}")
+        if parent_doc_id:
+            parent = load_parent_version(parent_doc_id)
+            if parent is None:
+                return jsonify({"error": "Unknown or expired parent_doc_id, please upload the previous version again"}), 404
+        cached = analysis_cache.get(doc_id)
+        revision = None
+        if cached is not None and parent is not None:
+            sections = section_cache.get(doc_id)
+            if sections is None:
+                cached = None  # Analyze again to recover the section map for the diff
+            else:
+                revision = revision_summary(parent, SectionMap.from_dict(sections), cached['clauses'])
+        if cached is not None and session_store.get(doc_id) is not None:
+            print(f"Analysis cache hit: {doc_id[:12]}")
+            return cached_upload_response(cached, filename, doc_id, revision)
+        
+        stored_path = upload_store.save(upload)
+        if stored_path:
+            print(f"Stored as: {stored_path}")
         
-        # Process with AI
-        print("Starting AI processing...")
+        if cached is not None and stored_path:
+            # Analysis is cached but the session expired: /chat restores it
+            # from the stored copy if the document is ever asked about
+            print(f"Analysis cache hit: {doc_id[:12]}, session restored on first chat")
+            return cached_upload_response(cached, filename, doc_id, revision)
         
-        # Generate document summary
-        summary = document_processor.summarize_document(extracted_text)
-        print("Summary generated")
+        if cached is not None:
+            # No stored copy to restore from later: re-extract the text now
+            print(f"Analysis cache hit: {doc_id[:12]}, restoring session")
+            ticket = admit_upload(upload, filename)
+            restore_session(doc_id, upload.source, filename, cached['summary'])
+            return cached_upload_response(cached, filename, doc_id, revision)
         
-        # Extract clauses
-        clauses = document_processor.extract_clauses(extracted_text)
-        print(f"Extracted {len(clauses)} clauses")
+        if wants_async_upload():
+            # The worker reads the stored copy or the spooled file, which the
+            # job now owns; small uploads are handed over as bytes
+            job_id = job_manager.submit(
+                run_upload_analysis, stored_path or upload.source, filename,
+                parent['sections'] if parent is not None else None,
+                on_success=lambda result: finish_async_upload(result, filename, doc_id, upload.size, parent, counterparty),
+                on_finish=upload.release
+            )
+            release_upload = False
+            print(f"Queued async analysis job {job_id}")
+            status_url = f"/jobs/{job_id}"
+            response = jsonify({
+                "message": "File accepted for processing",
+                "job_id": job_id,
+                "doc_id": doc_id,
+                "status_url": status_url,
+                "result_url": f"{status_url}/result"
+            })
+            response.status_code = 202
+            response.headers['Location'] = status_url
+            return response
         
-        # Analyze risks
-        risk_stats = document_processor.analyze_risks(clauses)
+        # Extract text page by page and analyze it as it streams in
+        ticket = admit_upload(upload, filename)
+        print("Starting streaming extraction and AI processing...")
+        writer = session_store.writer(doc_id, filename)
+        index_builder = document_processor.chunk_index_builder()
+        timer = StageTimer()
+        segments = tee_text(
+            timer.iterate('extract', iter_text(upload.source, filename=filename)),
+            writer.write, timer.wrap('index', index_builder.feed)
+        )
+        analysis = document_processor.analyze_stream(segments, parent['sections'] if parent is not None else None)
+        session = writer.close()
+        with timer.stage('index'):
+            chunk_index = index_builder.finish()
+        timer.record()
+        record_document_metrics(filename, upload.size, analysis)
+        session.attach('chunk_index', chunk_index, chunk_index.size_bytes())
+        session.attach('page_index', analysis['page_index'], analysis['page_index'].size_bytes())
+        session.attach('summary', analysis['summary'], len(analysis['summary']))
+        session_store.touch(doc_id)
+        print(f"Chunk index built: {chunk_index.stats()}")
+        print(f"Text extraction done. Length: {analysis['text_length']}")
+        print(f"Extracted {len(analysis['clauses'])} clauses")
         print("Risk analysis completed")
         
         # Prepare response
-        analysis_results = {
-            "summary": summary,
-            "clauses": clauses,
-            "risks": risk_stats,
-            "processed": True,
-            "filename": filename,
-            "text_length": len(extracted_text)
-        }
+        analysis_results = build_analysis_results(analysis, filename, doc_id)
+        analysis_cache.put(doc_id, analysis_results)
+        section_cache.put(doc_id, analysis['sections'].to_dict())
+        answer_cache.invalidate(doc_id)
+        index_document(session)
+        record_analytics(analysis_results, counterparty)
         
-        return jsonify({
-            "message": "File uploaded and processed successfully",
-            "analysis": analysis_results
-        })
+        if parent is not None:
+            stats = analysis['section_stats']
+            print(f"Revision of {parent['doc_id'][:12]}: reused {stats['reused']} of {stats['total']} sections")
+            revision = revision_summary(parent, analysis['sections'], analysis['clauses'], stats)
         
+        with timed('serialize'):
+            return jsonify(upload_response_body(analysis_results, revision))
+        
+    except AdmissionRejected as e:
+        print(f"🛑 Upload rejected, server at capacity: {admission.stats()['queued']} queued")
+        response = jsonify({"error": str(e), "retry_after": e.retry_after})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
     except Exception as e:
         print(f"ERROR: {e}")
         return jsonify({"error": str(e)}), 500
+    finally:
+        if ticket is not None:
+            admission.release(ticket)
+        if release_upload:
+            upload.release()
+
+class ChatRequestError(Exception):
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def resolve_chat_document(data):
+    """Find the document a chat request refers to"""
+    question = data.get('question', '')
+    doc_id = data.get('doc_id')
+    
+    if doc_id:
+        session = session_store.get(doc_id) or restore_expired_session(doc_id)
+        if session is None:
+            raise ChatRequestError("Unknown or expired doc_id, please upload the document again", 404)
+        summary = session.get('summary')
+        if summary is None:
+            # Sessions reopened from disk (e.g. by another worker) carry no summary
+            cached = analysis_cache.get(doc_id)
+            summary = cached['summary'] if cached else ''
+            session.attach('summary', summary, len(summary))
+        document = {"doc_hash": doc_id, "session": session, "summary": summary}
+    else:
+        # Older clients still post the whole document with each question
+        document_text = data.get('document_text', '')
+        if not document_text:
+            raise ChatRequestError("Question and doc_id (or document text) are required")
+        doc_hash = hashlib.sha256(document_text.encode('utf-8', 'surrogatepass')).hexdigest()
+        document = {"doc_hash": doc_hash, "document_text": document_text, "summary": ''}
+    
+    if not question:
+        raise ChatRequestError("Question and doc_id (or document text) are required")
+    document["question"] = question
+    return document
+
+def retrieve_context(chat):
+    """Add the excerpts that best match the question to a resolved chat request"""
+    session = chat.get('session')
+    if session is not None:
+        chunk_index = chunk_index_for(session)
+        page_index = session.get('page_index')
+        read_chunk = session.slice
+    else:
+        document_text = chat['document_text']
+        chunk_index = document_processor.build_chunk_index(document_text)
+        page_index = None
+        read_chunk = lambda start, end: document_text[start:end]
+    
+    hits = chunk_index.search(chat['question'], k=CHAT_TOP_K)
+    if not hits:
+        hits = [(0, 0.0)]
+    sources = []
+    context_parts = []
+    for chunk_id, score in hits:
+        start, end = chunk_index.spans[chunk_id]
+        context_parts.append(read_chunk(start, end))
+        source = {"chunk": chunk_id, "start": start, "end": end, "score": round(score, 4)}
+        if page_index is not None:
+            source["page"] = page_index.locate(start)[0]
+        sources.append(source)
+    
+    chat["context"] = "\n\n".join(context_parts)
+    chat["sources"] = sources
+    chat["retrieval"] = chunk_index.stats()
+    return chat
+
+def server_sent_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def stream_chat_response(chat, cached=None):
+    """Send answer tokens as Server-Sent Events while the model produces them"""
+    cancel_event = threading.Event()
+    if cached is None:
+        with timed('retrieve'):
+            retrieve_context(chat)
+    
+    def events():
+        started = time.perf_counter()
+        first_token_ms = None
+        if cached is not None:
+            words = cached['response'].split(' ')
+            tokens = iter([word if i == 0 else ' ' + word for i, word in enumerate(words)])
+            sources = cached['sources']
+            yield server_sent_event("sources", {"sources": sources, "cached": True})
+        else:
+            tokens = document_processor.stream_answer(chat['question'], chat['context'], chat['summary'], cancel_event)
+            sources = chat['sources']
+            yield server_sent_event("sources", {"sources": sources, "retrieval": chat['retrieval'], "cached": False})
+        answer = []
+        try:
+            for token in tokens:
+                if first_token_ms is None:
+                    first_token_ms = round((time.perf_counter() - started) * 1000, 3)
+                answer.append(token)
+                yield server_sent_event("token", {"token": token})
+            if cached is None:
+                metrics.record_stage('generate', time.perf_counter() - started)
+                answer_cache.put(chat['doc_hash'], chat['question'],
+                                 {"response": ''.join(answer), "sources": sources},
+                                 time.perf_counter() - started)
+            yield server_sent_event("done", {
+                "question": chat['question'],
+                "cached": cached is not None,
+                "time_to_first_token_ms": first_token_ms,
+                "total_ms": round((time.perf_counter() - started) * 1000, 3)
+            })
+        finally:
+            # Runs when the client disconnects too: stop generating for nobody
+            cancel_event.set()
+            if hasattr(tokens, 'close'):
+                tokens.close()
+    
+    response = Response(events(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @app.route('/chat', methods=['POST'])
 def chat_with_document():
@@ -94,44 +606,216 @@ def chat_with_document():
         if not data:
             return jsonify({"error": "No JSON data provided"}), 400
         
-        question = data.get('question', '')
-        document_text = data.get('document_text', '')
-        
-        if not question or not document_text:
-            return jsonify({"error": "Question and document text are required"}), 400
-        
-        # Create a simple Q&A prompt
-        qa_prompt = f"""
-        Based on the following legal document, answer this question: {question}
+        chat = resolve_chat_document(data)
+        cached = answer_cache.get(chat['doc_hash'], chat['question'])
+        if data.get('stream'):
+            return stream_chat_response(chat, cached)
+        if cached is not None:
+            return jsonify(dict(cached, question=chat['question'], cached=True))
         
-        Document text:
-        {document_text[:2000]}  # Limit text length
-        
-        Answer:
-        """
-        
-        # For now, return a mock response
-        # In a full implementation, you would use the LLM here
-        response = f"Based on your document analysis, here's what I found regarding '{question}': The document contains relevant information that addresses your query. For more detailed analysis, please ensure you have a local LLM model configured."
+        # Answer with the local LLM; the document summary forms the cached prompt prefix
+        with timed('retrieve'):
+            retrieve_context(chat)
+        started = time.perf_counter()
+        response = document_processor.answer_question(chat['question'], chat['context'], chat['summary'])
+        generation_seconds = time.perf_counter() - started
+        metrics.record_stage('generate', generation_seconds)
+        answer_cache.put(chat['doc_hash'], chat['question'],
+                         {"response": response, "sources": chat['sources']},
+                         generation_seconds)
         
         return jsonify({
             "response": response,
-            "question": question
+            "question": chat['question'],
+            "sources": chat['sources'],
+            "retrieval": chat['retrieval'],
+            "cached": False
         })
         
+    except ChatRequestError as e:
+        return jsonify({"error": str(e)}), e.status_code
     except Exception as e:
         print(f"Chat error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/search', methods=['GET', 'POST'])
+def search_documents():
+    """Find the passages most similar to a query across every analyzed document"""
+    data = request.get_json(silent=True) or {}
+    query = data.get('query', request.args.get('q', ''))
+    if not query:
+        return jsonify({"error": "Query is required"}), 400
+    try:
+        k = min(int(data.get('k', request.args.get('k', 10))), SEARCH_MAX_K)
+    except (TypeError, ValueError):
+        return jsonify({"error": "k must be an integer"}), 400
+    per_document = str(data.get('per_document', request.args.get('per_document', 'true'))).lower() not in ('0', 'false', 'no')
+    
+    results = vector_index.search(query, k=k, per_document=per_document)
+    return jsonify({
+        "query": query,
+        "results": results,
+        "search_ms": round(vector_index.last_search_seconds * 1000, 3)
+    })
+
+@app.route('/analysis/<doc_id>', methods=['GET'])
+def get_analysis(doc_id):
+    """Page through the clauses of an analyzed document.
+
+    Clauses can be filtered by type and risk and projected onto a subset of
+    fields; responses are compressed when the client accepts it and carry a
+    strong ETag, so unchanged pages revalidate with 304 Not Modified.
+    """
+    analysis = analysis_cache.get(doc_id)
+    if analysis is None:
+        return jsonify({"error": "Unknown or expired doc_id, please upload the document again"}), 404
+    try:
+        query = analysis_view.parse_query(request.args, ANALYSIS_PAGE_LIMIT, ANALYSIS_PAGE_MAX_LIMIT)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    etag = analysis_view.page_etag(analysis, query, ANALYZER_VERSION)
+    coding = analysis_view.choose_encoding(request.accept_encodings)
+    # A copy the client holds in either coding is still current
+    for candidate in (etag, f"{etag}-{coding}"):
+        if request.if_none_match.contains_weak(candidate):
+            response = Response(status=304)
+            response.set_etag(candidate)
+            break
+    else:
+        encoded = analysis_page_cache.get((etag, coding))
+        if encoded is None:
+            with timed('serialize'):
+                encoded = analysis_view.encode_body(analysis_view.analysis_page(analysis, query), coding)
+            analysis_page_cache.put((etag, coding), encoded)
+        data, applied = encoded
+        response = Response(data, mimetype='application/json')
+        if applied != 'identity':
+            response.headers['Content-Encoding'] = applied
+        response.set_etag(etag if applied == 'identity' else f"{etag}-{applied}")
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+def analytics_limit():
+    """limit and offset query parameters of the /analytics endpoints"""
+    try:
+        limit = int(request.args.get('limit', 100))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        raise ValueError("limit and offset must be integers")
+    if limit < 1 or offset < 0:
+        raise ValueError("limit must be >= 1 and offset >= 0")
+    return min(limit, ANALYTICS_MAX_LIMIT), offset
+
+@app.route('/analytics/summary', methods=['GET'])
+def analytics_summary():
+    """Documents and clauses across the corpus, overall and per risk level"""
+    started = time.perf_counter()
+    totals = analytics_store.totals()
+    return jsonify(dict(totals, query_ms=round((time.perf_counter() - started) * 1000, 3)))
+
+@app.route('/analytics/risk', methods=['GET'])
+def analytics_risk():
+    """Risk distribution by clause type, counterparty or month, read from
+    the rollups; prefix narrows the values, e.g. prefix=2026 for its months"""
+    by = request.args.get('by', 'clause_type')
+    if by not in DIMENSIONS:
+        return jsonify({"error": f"by must be one of {', '.join(DIMENSIONS)}"}), 400
+    try:
+        limit, _ = analytics_limit()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    started = time.perf_counter()
+    rows = analytics_store.risk_distribution(by, limit, request.args.get('prefix') or None)
+    return jsonify({
+        "by": by,
+        "rows": rows,
+        "query_ms": round((time.perf_counter() - started) * 1000, 3)
+    })
+
+@app.route('/analytics/documents', methods=['GET'])
+def analytics_documents():
+    """Documents behind a dashboard bucket: filter by clause_type, risk,
+    counterparty and month"""
+    risk = request.args.get('risk') or None
+    if risk is not None and risk not in RISK_LEVELS:
+        return jsonify({"error": f"risk must be one of {', '.join(RISK_LEVELS)}"}), 400
+    try:
+        limit, offset = analytics_limit()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    started = time.perf_counter()
+    documents = analytics_store.documents(
+        clause_type=request.args.get('clause_type') or None,
+        risk=risk,
+        counterparty=request.args.get('counterparty') or None,
+        month=request.args.get('month') or None,
+        limit=limit,
+        offset=offset
+    )
+    return jsonify({
+        "documents": documents,
+        "offset": offset,
+        "limit": limit,
+        "query_ms": round((time.perf_counter() - started) * 1000, 3)
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Stage latencies, request latencies and document counters in the Prometheus text format"""
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Report the status and page progress of an async upload job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    return jsonify(job)
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Return the analysis of a finished async upload job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job id"}), 404
+    if job['status'] == 'failed':
+        return jsonify({"error": job['error'], "job": job}), 500
+    if job['status'] != 'done':
+        return jsonify(job), 202
+    return jsonify(job_manager.result(job_id))
+
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
-    return jsonify({"status": "healthy", "ai_processor": "initialized"})
+    """Health check endpoint; reports "warming" until the AI processor is warm"""
+    ready = document_processor.ready
+    if not ready:
+        # serve.py warms up before forking; any other host warms up here
+        document_processor.warm_up_in_background()
+    return jsonify({
+        "status": "healthy" if ready else "warming",
+        "ready": ready,
+        "pid": os.getpid(),
+        "ai_processor": "initialized" if ready else "warming up",
+        "analysis_cache": analysis_cache.stats(),
+        "section_cache": section_cache.stats(),
+        "sessions": session_store.stats(),
+        "answer_cache": answer_cache.stats(),
+        "uploads": upload_store.stats(),
+        "vector_index": vector_index.stats(),
+        "jobs": job_manager.stats(),
+        "admission": admission.stats(),
+        "analytics": analytics_store.stats(),
+        "llm": document_processor.llm.stats() if document_processor.llm else None
+    })
 
 if __name__ == '__main__':
     # Initialize the AI processor
     print("Initializing AI Document Processor...")
+    document_processor.warm_up()
     document_processor.initialize_llm()
     print("AI Processor initialized successfully")
     
+    # Development server; use serve.py for multi-worker production serving
     app.run(debug=True, port=5000)
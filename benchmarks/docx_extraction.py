@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+DOCX extraction benchmark
+Compares the streaming reader in docx_reader.py with the python-docx path
+it replaced, on synthetic contracts of several sizes. Each case runs in a
+fresh process, since python-docx's lxml trees are allocated outside
+tracemalloc's view and RSS never shrinks within a process.
+
+Usage: python -m benchmarks.docx_extraction --pages 10 100 1000 [--repeat 5]
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+
+from benchmarks.run import run_case
+from benchmarks.synthetic import write_docx
+
+
+def python_docx_text(path):
+    """The former extraction path: python-docx's object model, paragraphs only"""
+    from docx import Document
+
+    return ''.join(paragraph.text + "\n" for paragraph in Document(path).paragraphs)
+
+
+def streaming_text(path):
+    from docx_reader import iter_docx_text
+
+    return ''.join(text for _, text in iter_docx_text(path))
+
+
+READERS = {'python-docx': python_docx_text, 'streaming': streaming_text}
+
+
+def _measure(reader, path, pages, repeat):
+    return run_case(f"{reader}[{pages}p]", lambda: READERS[reader](path), repeat=repeat, units=pages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DOCX text extraction")
+    parser.add_argument('--pages', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    print(f"{'case':<24} {'size':>9} {'p50 ms':>10} {'p99 ms':>10} {'throughput':>16} {'RSS growth':>11}")
+    with tempfile.TemporaryDirectory() as work_dir:
+        for pages in args.pages:
+            path = os.path.join(work_dir, f"contract-{pages}.docx")
+            write_docx(path, pages)
+            size_kb = os.path.getsize(path) / 1024
+            for reader in READERS:
+                with context.Pool(1) as pool:
+                    result = pool.apply(_measure, (reader, path, pages, args.repeat))
+                print(f"{result['case']:<24} {size_kb:>7.0f}KB {result['p50_ms']:>10.1f} {result['p99_ms']:>10.1f} "
+                      f"{result['throughput']:>8.1f} {result['unit']:<7} {result['rss_growth_mb']:>9.1f}MB", flush=True)
+
+
+if __name__ == "__main__":
+    main()
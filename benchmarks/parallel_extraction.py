@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Parallel PDF extraction benchmark
+Builds a synthetic PDF and reports pages per second as the number of
+extraction workers grows, checking that the reassembled text is identical.
+
+Usage: python -m benchmarks.parallel_extraction [--pages 1000] [--workers 1 2 4 8]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic import write_pdf
+from extraction import iter_text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel PDF extraction")
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'bundle.pdf')
+        write_pdf(path, args.pages)
+        print(f"{args.pages} pages, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+        reference = None
+        baseline = None
+        for workers in args.workers:
+            # Warm the pool so worker start-up is not counted
+            if workers > 1:
+                for _ in iter_text(path, workers=workers):
+                    break
+            started = time.perf_counter()
+            segments = list(iter_text(path, workers=workers))
+            elapsed = time.perf_counter() - started
+            text = ''.join(segment.text for segment in segments)
+            if reference is None:
+                reference = text
+            elif text != reference:
+                raise SystemExit(f"Text extracted with {workers} workers differs from the sequential result")
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {elapsed:>9.3f} {len(segments) / elapsed:>9.1f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Chat retrieval benchmark
+Measures BM25 chunk index build time and per-query lookup latency on
+synthetic contracts (target: sub-millisecond lookups at 500 pages).
+
+Usage: python -m benchmarks.retrieval [--pages 100 500]
+"""
+
+import argparse
+import statistics
+import time
+
+from ai_processor import DocumentProcessor
+from benchmarks.synthetic import contract_text
+
+QUESTIONS = [
+    "What is the termination notice period?",
+    "Who bears liability for indirect damages?",
+    "When is payment due?",
+    "Which law governs this agreement?",
+    "Who owns the intellectual property?",
+    "How long does the non-compete last?",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BM25 chunk retrieval")
+    parser.add_argument('--pages', type=int, nargs='+', default=[100, 500])
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    processor = DocumentProcessor()
+    print(f"chunk size {processor.chunk_size}, overlap {processor.chunk_overlap}")
+    print(f"{'pages':>6} {'chunks':>7} {'terms':>6} {'build ms':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for pages in args.pages:
+        text = contract_text(pages)
+        started = time.perf_counter()
+        index = processor.build_chunk_index(text)
+        build_ms = (time.perf_counter() - started) * 1000
+        latencies = []
+        for round_number in range(args.rounds):
+            index.search(QUESTIONS[round_number % len(QUESTIONS)], k=3)
+            latencies.append(index.last_query_seconds * 1000)
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"{pages:>6} {len(index.spans):>7} {len(index.postings):>6} {build_ms:>9.1f} "
+              f"{statistics.median(latencies):>8.3f} {p99:>8.3f} {latencies[-1]:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the Legal AI Assistant
+Times each DocumentProcessor stage and the /upload and /chat endpoints on
+synthetic TXT, DOCX and PDF contracts, reporting p50/p99 latency,
+throughput and peak RSS growth per case. Results can be saved as a
+baseline and later runs compared against it; the run fails when a case
+got slower than the threshold allows.
+
+Usage:
+  python -m benchmarks.run                              # 1, 10 and 100 pages
+  python -m benchmarks.run --pages 1 10 100 1000 --repeat 5
+  python -m benchmarks.run --save-baseline benchmarks/baseline.json
+  python -m benchmarks.run --compare benchmarks/baseline.json --threshold 0.10
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.synthetic import contract_text, write_document
+
+FORMATS = ['txt', 'docx', 'pdf']
+
+QUESTIONS = [
+    "When is payment due?",
+    "Who may terminate the agreement?",
+    "What is the cap on liability?",
+    "Which law governs this agreement?",
+    "How long do confidentiality obligations last?",
+]
+
+
+class RSSSampler:
+    """Tracks the peak resident set size of this process while a case runs.
+
+    Samples /proc/self/statm every few milliseconds on Linux; elsewhere it
+    falls back to the process-lifetime peak from getrusage.
+    """
+
+    def __init__(self, interval_seconds=0.002):
+        self.interval_seconds = interval_seconds
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current():
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError):
+            usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return usage if sys.platform == 'darwin' else usage * 1024
+
+    def __enter__(self):
+        self.start = self.peak = self.current()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+    def _sample(self):
+        while not self._stop.wait(self.interval_seconds):
+            self.peak = max(self.peak, self.current())
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def run_case(name, func, setup=None, repeat=5, warmup=1, units=1, unit='pages'):
+    """Time func(*setup()) repeat times after warmup untimed runs.
+
+    setup runs before every call and is not timed. units is the amount of
+    work per call, so throughput is reported in unit per second.
+    """
+    def arguments():
+        return setup() if setup is not None else ()
+
+    for _ in range(warmup):
+        func(*arguments())
+    gc.collect()
+    timings = []
+    with RSSSampler() as rss:
+        for _ in range(repeat):
+            args = arguments()
+            started = time.perf_counter()
+            func(*args)
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    p50 = percentile(timings, 0.5)
+    return {
+        "case": name,
+        "runs": repeat,
+        "p50_ms": round(p50 * 1000, 3),
+        "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+        "mean_ms": round(sum(timings) / len(timings) * 1000, 3),
+        "throughput": round(units / p50, 2) if p50 else 0.0,
+        "unit": f"{unit}/s",
+        "peak_rss_mb": round(rss.peak / 1024 / 1024, 1),
+        "rss_growth_mb": round((rss.peak - rss.start) / 1024 / 1024, 1)
+    }
+
+
+def quiet_case(*args, **kwargs):
+    """run_case with the app's progress prints discarded"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return run_case(*args, **kwargs)
+
+
+def processor_cases(pages_list, files, repeat):
+    """DocumentProcessor stages on the extracted text of each size"""
+    from ai_processor import DocumentProcessor, document_processor
+    from extraction import TextSegment, extract_text
+
+    for pages in pages_list:
+        for kind in FORMATS:
+            path = files[(kind, pages)]
+            yield run_case(f"extract_text[{kind},{pages}p]", lambda path=path: extract_text(path),
+                           repeat=repeat, units=pages)
+
+        text = contract_text(pages)
+        clauses = document_processor.extract_clauses(text)
+        # Fresh processors so the term vector cache does not answer repeat runs
+        yield run_case(f"summarize_document[{pages}p]", lambda processor: processor.summarize_document(text),
+                       setup=lambda: (DocumentProcessor(),), repeat=repeat, units=pages)
+        yield run_case(f"extract_clauses[{pages}p]", lambda: document_processor.extract_clauses(text),
+                       repeat=repeat, units=pages)
+        yield run_case(f"analyze_risks[{pages}p]", lambda: document_processor.analyze_risks(clauses),
+                       repeat=repeat, units=pages)
+        yield run_case(f"analyze_stream[{pages}p]",
+                       lambda: document_processor.analyze_stream([TextSegment(0, text, 1)]),
+                       repeat=repeat, units=pages)
+        yield run_case(f"build_chunk_index[{pages}p]", lambda: document_processor.build_chunk_index(text),
+                       repeat=repeat, units=pages)
+
+
+def endpoint_cases(pages_list, files, repeat, work_dir):
+    """/upload and /chat through Flask's test client"""
+    previous_dir = os.getcwd()
+    # The app creates its caches, sessions and indexes relative to the working directory
+    os.chdir(work_dir)
+    try:
+        import app as app_module
+
+        client = app_module.app.test_client()
+
+        def upload(data, filename):
+            response = client.post('/upload', data={'file': (io.BytesIO(data), filename)},
+                                   content_type='multipart/form-data')
+            if response.status_code != 200:
+                raise RuntimeError(f"/upload returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+            return response.get_json()['doc_id']
+
+        for pages in pages_list:
+            for kind in FORMATS:
+                with open(files[(kind, pages)], 'rb') as f:
+                    data = f.read()
+                filename = f"contract.{kind}"
+                variants = iter(range(10 ** 6))
+
+                def fresh_upload():
+                    # Unique bytes each run so the analysis cache never answers
+                    return (data + f"\n<!-- {next(variants)} -->".encode() if kind == 'txt'
+                            else _variant(kind, pages, next(variants), work_dir),)
+
+                yield quiet_case(f"upload[{kind},{pages}p]", lambda body: upload(body, filename),
+                                 setup=fresh_upload, repeat=repeat, units=pages)
+            with open(files[('pdf', pages)], 'rb') as f:
+                data = f.read()
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                doc_id = upload(data, 'contract.pdf')
+            yield quiet_case(f"upload_cached[pdf,{pages}p]", lambda: upload(data, 'contract.pdf'),
+                             repeat=repeat, units=pages)
+
+            questions = iter(range(10 ** 6))
+
+            def ask():
+                # A new question every run so the answer cache never answers
+                number = next(questions)
+                question = f"{QUESTIONS[number % len(QUESTIONS)]} variant {number}"
+                response = client.post('/chat', json={'question': question, 'doc_id': doc_id})
+                if response.status_code != 200:
+                    raise RuntimeError(f"/chat returned {response.status_code}")
+
+            yield quiet_case(f"chat[{pages}p]", ask, repeat=max(repeat, 20), units=1, unit='requests')
+        app_module.job_manager.shutdown()
+    finally:
+        os.chdir(previous_dir)
+
+
+def _variant(kind, pages, number, work_dir):
+    """Bytes of a same-sized document generated with another seed"""
+    path = os.path.join(work_dir, f"variant-{number}-{pages}.{kind}")
+    write_document(path, pages, seed=1000 + number)
+    with open(path, 'rb') as f:
+        data = f.read()
+    os.remove(path)
+    return data
+
+
+def compare(results, baseline, threshold, rss_threshold):
+    """Print the change of each case against the baseline; return the regressions"""
+    previous = {result['case']: result for result in baseline['results']}
+    regressions = []
+    print(f"\n{'case':<34} {'base p50':>10} {'p50':>10} {'change':>8}")
+    for result in results:
+        base = previous.get(result['case'])
+        if base is None or not base['p50_ms']:
+            continue
+        change = result['p50_ms'] / base['p50_ms'] - 1
+        flag = ''
+        if change > threshold:
+            flag = '  ❌ slower'
+            regressions.append(f"{result['case']}: p50 {base['p50_ms']} ms -> {result['p50_ms']} ms ({change:+.0%})")
+        # Small cases allocate too little for RSS to be meaningful
+        if base['rss_growth_mb'] >= 10 and result['rss_growth_mb'] > base['rss_growth_mb'] * (1 + rss_threshold):
+            flag += '  ❌ more memory'
+            regressions.append(f"{result['case']}: RSS growth {base['rss_growth_mb']} MB -> {result['rss_growth_mb']} MB")
+        print(f"{result['case']:<34} {base['p50_ms']:>10.3f} {result['p50_ms']:>10.3f} {change:>+7.1%}{flag}")
+    return regressions
+
+
+def main():
+    """Main benchmark function"""
+    parser = argparse.ArgumentParser(description="Benchmark document processing and API endpoints")
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', choices=['processor', 'endpoints'], help="Run one group of cases")
+    parser.add_argument('--save-baseline', metavar='PATH', help="Write the results to a baseline file")
+    parser.add_argument('--compare', metavar='PATH', help="Compare with a baseline file")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Fail when a case's p50 is this much slower than the baseline (0.10 = 10%%)")
+    parser.add_argument('--rss-threshold', type=float, default=0.25,
+                        help="Fail when a case's RSS growth is this much larger than the baseline")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        print(f"Generating synthetic contracts ({', '.join(map(str, args.pages))} pages)...")
+        files = {}
+        for pages in args.pages:
+            for kind in FORMATS:
+                files[(kind, pages)] = write_document(os.path.join(work_dir, f"contract-{pages}.{kind}"), pages)
+
+        print(f"{'case':<34} {'p50 ms':>10} {'p99 ms':>10} {'throughput':>18} {'peak RSS':>9} {'growth':>8}")
+        groups = []
+        if args.only in (None, 'processor'):
+            groups.append(processor_cases(args.pages, files, args.repeat))
+        if args.only in (None, 'endpoints'):
+            groups.append(endpoint_cases(args.pages, files, args.repeat, work_dir))
+        for group in groups:
+            for result in group:
+                results.append(result)
+                print(f"{result['case']:<34} {result['p50_ms']:>10.3f} {result['p99_ms']:>10.3f} "
+                      f"{result['throughput']:>10.1f} {result['unit']:<7} {result['peak_rss_mb']:>7.1f}MB "
+                      f"{result['rss_growth_mb']:>6.1f}MB", flush=True)
+
+    report = {
+        "created_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pages": args.pages,
+        "repeat": args.repeat,
+        "results": results
+    }
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✅ Baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('cpus') != report['cpus'] or baseline.get('python') != report['python']:
+            print(f"⚠️  Baseline was recorded with Python {baseline.get('python')} on {baseline.get('cpus')} CPUs")
+        regressions = compare(results, baseline, args.threshold, args.rss_threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond the threshold:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print("\n✅ No regressions beyond the threshold")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Synthetic contract generator
+Produces deterministic contract-like documents for benchmarks: numbered
+sections with headings, subclauses of the clause types the analyzer looks
+for, keyword-free boilerplate and, in DOCX files, a payment schedule table.
+The same pages and seed always give the same text in every format.
+
+Usage: python -m benchmarks.synthetic out/contract.pdf --pages 100 [--seed 7]
+"""
+
+import argparse
+import os
+import random
+
+# Characters of text per page, about one dense page of a printed agreement
+PAGE_CHARS = 2800
+
+PARTY_NAMES = [
+    ("Acme Holdings Inc.", "Northwind Supplies LLC"),
+    ("Globex Corporation", "Initech Services Ltd."),
+    ("Umbrella Health plc", "Stark Industrial GmbH"),
+    ("Wayne Logistics LLC", "Tyrell Systems Corp."),
+]
+
+# Headings and subclause templates per section type; most match a clause type
+SECTIONS = {
+    "Payment Terms": [
+        "The Customer shall pay each invoice within {days} days of the invoice date.",
+        "Late payments bear interest at {rate} percent per month until paid in full.",
+        "All fees are exclusive of taxes, which the Customer shall pay when due.",
+    ],
+    "Termination": [
+        "Either party may terminate this Agreement upon {days} days written notice.",
+        "The {party} may terminate immediately if the other party commits a material breach.",
+        "Termination does not affect rights and obligations accrued before the termination date.",
+    ],
+    "Limitation of Liability": [
+        "Neither party shall be liable for indirect, incidental or consequential damages.",
+        "The aggregate liability of the {party} shall not exceed the fees paid in the preceding {months} months.",
+        "Nothing in this Agreement limits liability for fraud or gross negligence.",
+    ],
+    "Indemnification": [
+        "The {party} shall indemnify and hold harmless the other party against third party claims.",
+        "The indemnification obligations under this section are capped at {amount} dollars.",
+    ],
+    "Confidentiality": [
+        "Each party shall keep the Confidential Information of the other party strictly confidential.",
+        "The obligations of confidentiality survive for {years} years after expiry of this Agreement.",
+        "Proprietary information may be disclosed only to employees with a need to know.",
+    ],
+    "Governing Law": [
+        "This Agreement is governed by the laws of the State of {state}.",
+        "The courts of {state} have exclusive jurisdiction over any dispute arising hereunder.",
+    ],
+    "Non-Compete": [
+        "During the term and for {months} months thereafter the {party} shall not engage in a competing business.",
+        "This non-compete covenant applies within a radius of {miles} miles of any Customer site.",
+    ],
+    "Intellectual Property": [
+        "All intellectual property developed under this Agreement vests in the {party}.",
+        "Each party retains ownership of its pre-existing patents, copyrights and trademarks.",
+    ],
+    "Definitions": [
+        "Capitalised terms used in this Agreement have the meanings given in this section.",
+        "Words in the singular include the plural and references to persons include companies.",
+    ],
+    "Notices": [
+        "Notices shall be in writing and delivered by hand or by recorded delivery to the addresses above.",
+        "A notice is deemed received two business days after posting.",
+    ],
+    "Force Majeure": [
+        "Neither party is responsible for delays caused by events beyond its reasonable control.",
+        "The affected party shall promptly inform the other party of any such event.",
+    ],
+    "Miscellaneous": [
+        "This Agreement constitutes the entire agreement between the parties on its subject matter.",
+        "No amendment is effective unless made in writing and signed by both parties.",
+        "If any provision is held invalid, the remaining provisions continue in full force.",
+    ],
+}
+
+# Keyword-free sentences padding subclauses to realistic length
+BOILERPLATE = [
+    "The parties shall act in good faith in performing their obligations.",
+    "Headings are for convenience only and do not affect interpretation.",
+    "Each party shall bear its own costs in connection with this section.",
+    "The obligations in this section apply to each affiliate of the parties.",
+    "References to a statute include that statute as amended from time to time.",
+    "The Supplier shall maintain adequate records of the services performed.",
+]
+
+STATES = ["California", "New York", "Delaware", "Texas", "Illinois"]
+
+
+def _fill(template, rng, parties):
+    return template.format(
+        days=rng.choice([15, 30, 45, 60, 90]),
+        rate=rng.choice([1, 1.5, 2]),
+        party=rng.choice(["Customer", "Supplier"]),
+        months=rng.choice([6, 12, 18, 24]),
+        amount=rng.choice(["50,000", "250,000", "1,000,000"]),
+        years=rng.choice([2, 3, 5]),
+        state=rng.choice(STATES),
+        miles=rng.choice([25, 50, 100]),
+    )
+
+
+def contract_pages(pages, seed=42):
+    """Return the text of each page of a deterministic synthetic contract.
+
+    Each page is about PAGE_CHARS characters of numbered sections such as
+    "7. Termination" with subclauses "7.1", "7.2"... Sections continue
+    across page breaks the way they do in real agreements.
+    """
+    rng = random.Random(seed)
+    parties = PARTY_NAMES[seed % len(PARTY_NAMES)]
+    headings = list(SECTIONS)
+    result = []
+    current = [f"MASTER SERVICES AGREEMENT\n\nThis Agreement is made between {parties[0]} "
+               f"(the \"Customer\") and {parties[1]} (the \"Supplier\").\n"]
+    length = len(current[0])
+    section = 0
+    while len(result) < pages:
+        section += 1
+        heading = rng.choice(headings)
+        blocks = [f"\n{section}. {heading}\n"]
+        for subclause in range(1, rng.randint(2, 4) + 1):
+            sentences = [_fill(rng.choice(SECTIONS[heading]), rng, parties)]
+            sentences += rng.sample(BOILERPLATE, rng.randint(1, 3))
+            blocks.append(f"\n{section}.{subclause} {' '.join(sentences)}\n")
+        for block in blocks:
+            if length + len(block) > PAGE_CHARS and length > 0:
+                result.append(''.join(current))
+                current, length = [], 0
+                if len(result) == pages:
+                    break
+            current.append(block)
+            length += len(block)
+    return result
+
+
+def contract_text(pages, seed=42):
+    """The whole synthetic contract as one string"""
+    return ''.join(contract_pages(pages, seed))
+
+
+def payment_schedule(seed=42, rows=6):
+    """Rows of the payment schedule table included in DOCX documents"""
+    rng = random.Random(seed)
+    return [("Milestone", "Due date", "Amount")] + [
+        (f"Milestone {index}", f"{rng.randint(1, 28):02d}/{index:02d}/2026", f"${rng.randint(5, 90) * 1000:,}")
+        for index in range(1, rows + 1)
+    ]
+
+
+def write_txt(path, pages, seed=42):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(contract_text(pages, seed))
+
+
+def write_docx(path, pages, seed=42):
+    """Write the contract as DOCX: one paragraph per line, a page break between
+    pages and a payment schedule table after the first page"""
+    from docx import Document
+    from docx.enum.text import WD_BREAK
+
+    document = Document()
+    for number, page in enumerate(contract_pages(pages, seed)):
+        paragraph = None
+        for line in page.split('\n'):
+            if line:
+                paragraph = document.add_paragraph(line)
+        if number == 0:
+            schedule = payment_schedule(seed)
+            table = document.add_table(rows=len(schedule), cols=len(schedule[0]))
+            for row, values in zip(table.rows, schedule):
+                for cell, value in zip(row.cells, values):
+                    cell.text = value
+        if paragraph is not None and number < pages - 1:
+            paragraph.add_run().add_break(WD_BREAK.PAGE)
+    document.save(path)
+
+
+def write_pdf(path, pages, seed=42):
+    """Write the contract as a PDF with one synthetic page per PDF page"""
+    import fitz  # PyMuPDF
+
+    with fitz.open() as doc:
+        for page_text in contract_pages(pages, seed):
+            page = doc.new_page()
+            page.insert_textbox(fitz.Rect(40, 40, 570, 800), page_text, fontsize=7)
+        doc.save(path, garbage=1, deflate=True)
+
+
+WRITERS = {'.txt': write_txt, '.docx': write_docx, '.pdf': write_pdf}
+
+
+def write_document(path, pages, seed=42):
+    """Write a synthetic contract in the format given by the path's extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f"Unsupported format {extension}; use one of {', '.join(WRITERS)}")
+    WRITERS[extension](path, pages, seed)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic contract")
+    parser.add_argument('path', help="Output file; .txt, .docx or .pdf")
+    parser.add_argument('--pages', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    write_document(args.path, args.pages, args.seed)
+    print(f"✅ Wrote {args.pages} pages to {args.path} ({os.path.getsize(args.path):,} bytes)")
+
+
+if __name__ == "__main__":
+    main()
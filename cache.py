@@ -0,0 +1,260 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Keys of the analysis caches are SHA-256 hex digests of uploads; anything
+# else (a client-supplied "../..") must never reach a file path
+CONTENT_HASH_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+
+def is_content_hash(value):
+    return isinstance(value, str) and CONTENT_HASH_PATTERN.fullmatch(value) is not None
+
+
+class LRUCache:
+    """Thread-safe in-memory mapping that evicts the least recently used entry"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._entries.pop(key, default)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class AnalysisCache:
+    """Content-addressed cache of /upload analysis results.
+
+    Entries are keyed by the SHA-256 of the uploaded bytes plus the analyzer
+    version, so changing the analysis code never serves stale results. A
+    small in-memory LRU tier sits in front of a JSON-file tier on disk; the
+    disk tier is trimmed oldest-first once it grows past max_disk_bytes.
+    """
+
+    def __init__(self, cache_dir, version, memory_entries=64, max_disk_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.max_disk_bytes = max_disk_bytes
+        self.memory = LRUCache(memory_entries)
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    def key_for(self, content_hash):
+        return f"{content_hash}-{self.version}"
+
+    def get(self, content_hash):
+        """Return the cached analysis for a content hash, or None"""
+        if not is_content_hash(content_hash):
+            self._record(miss=True)
+            return None
+        key = self.key_for(content_hash)
+        analysis = self.memory.get(key)
+        if analysis is not None:
+            self._record(memory_hit=True)
+            return analysis
+
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                analysis = json.load(f)
+            os.utime(path)  # Keep recently used files away from eviction
+        except (OSError, ValueError):
+            self._record(miss=True)
+            return None
+
+        self.memory.put(key, analysis)
+        self._record(disk_hit=True)
+        return analysis
+
+    def put(self, content_hash, analysis):
+        """Store an analysis in both tiers"""
+        if not is_content_hash(content_hash):
+            raise ValueError(f"Not a content hash: {content_hash!r}")
+        key = self.key_for(content_hash)
+        self.memory.put(key, analysis)
+
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        data = json.dumps(analysis).encode('utf-8')
+        try:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  Could not write analysis cache entry: {e}")
+            return
+
+        with self._lock:
+            self._disk_bytes += len(data) - old_size
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._evict()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self.memory),
+                "disk_bytes": self._disk_bytes
+            }
+
+    def _record(self, memory_hit=False, disk_hit=False, miss=False):
+        with self._lock:
+            if miss:
+                self.misses += 1
+                return
+            self.hits += 1
+            if memory_hit:
+                self.memory_hits += 1
+            if disk_hit:
+                self.disk_hits += 1
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _disk_entries(self):
+        """List (mtime, path, size) for every cache file on disk"""
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith('.json'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def _evict(self):
+        """Delete least recently used files until the disk tier fits its budget"""
+        with self._lock:
+            entries = sorted(self._disk_entries())
+            total = sum(size for _, _, size in entries)
+            # Trim to 90% of the budget so eviction does not run on every put
+            target = self.max_disk_bytes * 0.9
+            for _, path, size in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+            self._disk_bytes = total
+
+
+class AnswerCache:
+    """LRU cache of /chat answers with a time-to-live.
+
+    Keyed by document hash plus the normalized question, so rephrasings
+    that differ only in case, spacing or punctuation share an entry. All
+    answers for a document can be invalidated when it is re-analyzed. Each
+    entry remembers how long the LLM took to produce it, so hits report the
+    generation time they saved.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._entries = OrderedDict()
+        self._keys_by_doc = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize_question(question):
+        words = re.findall(r"[a-z0-9']+", question.lower())
+        return ' '.join(words)
+
+    def get(self, doc_hash, question):
+        """Return the cached answer payload, or None"""
+        key = (doc_hash, self.normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['expires_at'] <= time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry['generation_seconds']
+            return entry['payload']
+
+    def put(self, doc_hash, question, payload, generation_seconds):
+        key = (doc_hash, self.normalize_question(question))
+        with self._lock:
+            self._entries[key] = {
+                'payload': payload,
+                'generation_seconds': generation_seconds,
+                'expires_at': time.time() + self.ttl_seconds
+            }
+            self._entries.move_to_end(key)
+            self._keys_by_doc.setdefault(doc_hash, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, doc_hash):
+        """Drop every cached answer for a document"""
+        with self._lock:
+            for key in list(self._keys_by_doc.get(doc_hash, ())):
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "saved_llm_seconds": round(self.saved_seconds, 3)
+            }
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        keys = self._keys_by_doc.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_doc[key[0]]
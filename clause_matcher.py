@@ -0,0 +1,334 @@
+import re
+from collections import namedtuple
+
+# Default clause types recognised by the document processor. Keywords are
+# plain phrases; they are matched case-insensitively on word boundaries and
+# any space inside a phrase matches a run of whitespace.
+DEFAULT_CLAUSE_TYPES = [
+    {
+        'type': 'Termination',
+        'keywords': ['termination', 'terminate', 'terminated', 'terminates',
+                     'end', 'cancel', 'cancellation', 'cancelled'],
+        'risk': 'medium'
+    },
+    {
+        'type': 'Liability',
+        'keywords': ['liability', 'liabilities', 'liable', 'damages',
+                     'indemnification', 'indemnify'],
+        'risk': 'high'
+    },
+    {
+        'type': 'Payment',
+        'keywords': ['payment', 'payments', 'pay', 'invoice', 'invoices',
+                     'due', 'terms'],
+        'risk': 'low'
+    },
+    {
+        'type': 'Confidentiality',
+        'keywords': ['confidential', 'confidentiality', 'secret', 'secrets',
+                     'proprietary'],
+        'risk': 'medium'
+    },
+    {
+        'type': 'Governing Law',
+        'keywords': ['governing law', 'jurisdiction', 'venue', 'applicable law'],
+        'risk': 'low'
+    },
+    {
+        'type': 'Non-Compete',
+        'keywords': ['non-compete', 'non compete', 'noncompete',
+                     'non-competition', 'non competition', 'noncompetition',
+                     'restrictive covenant', 'restrictive covenants'],
+        'risk': 'high'
+    },
+    {
+        'type': 'Intellectual Property',
+        'keywords': ['intellectual property', 'ip', 'patent', 'patents',
+                     'copyright', 'copyrights', 'trademark', 'trademarks'],
+        'risk': 'medium'
+    }
+]
+
+# A section starts at a line opening with a section number such as "7.",
+# "12.3", "4.2.1", "IV." or "Section 12" followed by a capitalised word.
+# Unnumbered text is divided into paragraphs at blank lines and at line
+# breaks after a full stop, colon or semicolon that precede a capital letter.
+SECTION_PATTERN = re.compile(
+    r'^[ \t]*(?P<number>(?i:section|article)[ \t]+(?:\d+(?:\.\d+)*|[IVXLC]+)\.?|\d+\.(?:\d+\.?)*|[IVXLC]+\.)'
+    r'[ \t]+(?=[A-Z(\"“])(?P<title>[^\n]*)'
+    r'|(?P<paragraph_break>\n[ \t]*(?=\n)|(?<=[.:;])[ \t]*\n(?=[ \t]*[A-Z(]))',
+    re.MULTILINE
+)
+
+# Numbered sections run to the next section number; past this length they
+# are also split at paragraph breaks so no section grows without bound
+SECTION_MAX_CHARS = 4000
+
+# Heading titles are short and capitalise every word but "of", "and"...
+HEADING_MAX_WORDS = 8
+
+Section = namedtuple('Section', ['start', 'end', 'number', 'context', 'text'])
+
+ClauseSpan = namedtuple('ClauseSpan', ['start', 'end', 'clause_type', 'text', 'section'], defaults=[None])
+
+
+def normalize_keyword(keyword):
+    """Lower-case a keyword and collapse internal whitespace"""
+    return ' '.join(keyword.lower().split())
+
+
+def build_trie_pattern(keywords):
+    """Build a regex alternation shaped like a trie of the given keywords.
+
+    Shared prefixes are factored out ("pay", "payment", "payments" becomes
+    pay(?:ment(?:s)?)?), so the regex engine walks each candidate position
+    once instead of retrying every keyword in turn.
+    """
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in normalize_keyword(keyword):
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def render(node):
+        optional = '' in node
+        branches = []
+        for char in sorted(key for key in node if key):
+            atom = r'\s+' if char == ' ' else re.escape(char)
+            branches.append(atom + render(node[char]))
+        if not branches:
+            return ''
+        if len(branches) == 1 and not optional:
+            return branches[0]
+        body = '(?:' + '|'.join(branches) + ')'
+        return body + '?' if optional else body
+
+    return render(trie)
+
+
+class ClauseTypeRegistry:
+    """Pluggable set of clause types the matcher looks for"""
+
+    def __init__(self, clause_types=None):
+        self._types = {}
+        self.version = 0
+        for clause_type in (DEFAULT_CLAUSE_TYPES if clause_types is None else clause_types):
+            self.register(clause_type['type'], clause_type['keywords'], clause_type.get('risk', 'low'))
+
+    def register(self, name, keywords, risk='low'):
+        """Add or replace a clause type"""
+        keywords = [normalize_keyword(keyword) for keyword in keywords if keyword.strip()]
+        if not keywords:
+            raise ValueError(f"Clause type '{name}' needs at least one keyword")
+        self._types[name] = {'type': name, 'keywords': keywords, 'risk': risk}
+        self.version += 1
+
+    def unregister(self, name):
+        """Remove a clause type if it is registered"""
+        if self._types.pop(name, None) is not None:
+            self.version += 1
+
+    def get(self, name):
+        return self._types.get(name)
+
+    def __iter__(self):
+        return iter(list(self._types.values()))
+
+    def __len__(self):
+        return len(self._types)
+
+
+def number_parts(number):
+    """Levels of a section number: "Section 12.3" -> ('12', '3')"""
+    if number[0] in 'SsAa':
+        number = number.split(None, 1)[1]
+    return tuple(part for part in number.split('.') if part)
+
+
+def is_heading(title):
+    """Whether the text after a section number is a heading such as
+    "Termination" or "Limitation of Liability" rather than a sentence"""
+    words = title.split()
+    return (0 < len(words) <= HEADING_MAX_WORDS
+            and all(word[0].isupper() for word in words if len(word) > 3 and word[0].isalpha()))
+
+
+class ClauseMatcher:
+    """Section-aware clause classifier.
+
+    A ClauseScanner segments a document into numbered sections, or
+    paragraphs where there is no numbering, in one regex pass. Each section
+    is then classified once: by the clause type of its heading or the
+    heading of an enclosing section ("12. Termination" covers 12.1, 12.2...),
+    otherwise by the clause type whose keywords it contains most often.
+    Keywords of all clause types are compiled into one trie-shaped regex,
+    cached until the registry changes. Work and output are linear in the
+    length of the document, however dense the keywords.
+    """
+
+    def __init__(self, registry=None):
+        self.registry = registry if registry is not None else ClauseTypeRegistry()
+        self._compiled_version = None
+        self._pattern = None
+        self._keyword_types = {}
+
+    def compile(self):
+        """Return the compiled keyword pattern and keyword -> clause types map"""
+        if self._compiled_version != self.registry.version:
+            keyword_types = {}
+            for clause_type in self.registry:
+                for keyword in clause_type['keywords']:
+                    types = keyword_types.setdefault(keyword, [])
+                    if clause_type not in types:
+                        types.append(clause_type)
+            keywords_pattern = build_trie_pattern(keyword_types) if keyword_types else '(?!)'
+            self._pattern = re.compile(rf'\b(?:{keywords_pattern})\b', re.IGNORECASE)
+            self._keyword_types = keyword_types
+            self._compiled_version = self.registry.version
+        return self._pattern, self._keyword_types
+
+    def scanner(self):
+        """Create an incremental section scanner for text that arrives in pieces"""
+        return ClauseScanner(self)
+
+    def classify(self, section):
+        """Clause type of a section, or None"""
+        if section.context is not None:
+            clause_type = self.registry.get(section.context)
+            if clause_type is not None:
+                return clause_type
+        return self.classify_text(section.text)
+
+    def classify_text(self, text):
+        """Clause type with the most keyword hits in text, the earliest on ties"""
+        pattern, keyword_types = self.compile()
+        counts = {}
+        for match in pattern.finditer(text):
+            for clause_type in keyword_types.get(normalize_keyword(match.group()), ()):
+                counts[clause_type['type']] = counts.get(clause_type['type'], 0) + 1
+        if not counts:
+            return None
+        return self.registry.get(max(counts, key=counts.get))
+
+    def clause_span(self, section):
+        """The section as a ClauseSpan if it is a clause, otherwise None"""
+        clause_type = self.classify(section)
+        if clause_type is None:
+            return None
+        return ClauseSpan(section.start, section.end, clause_type, section.text, section.number)
+
+    def find_spans(self, text):
+        """Return the clause spans of a complete text, one per classified section"""
+        spans = (self.clause_span(section) for section in self.scanner().finish(text))
+        return [span for span in spans if span is not None]
+
+
+class ClauseScanner:
+    """Incremental section segmentation of a ClauseMatcher.
+
+    A section boundary is only acted on once all the text its pattern looks
+    at has arrived: boundaries ending by the last line break of the input
+    so far are taken, the rest of the input is scanned again from a cursor
+    when more text comes. The tail keeps one character before the cursor,
+    for the lookbehind and line-start anchor. The result equals segmenting
+    the concatenated input in one piece. Text of a section that is still
+    open is held until the next section starts. Offsets in the returned
+    Sections are absolute positions in the concatenated input; their text
+    has surrounding whitespace removed.
+    """
+
+    def __init__(self, matcher):
+        self.matcher = matcher
+        self._tail = ''
+        self._tail_offset = 0
+        self._cursor = 0
+        # Pieces without a line break, which cannot decide any boundary yet
+        self._pending = []
+        self._pieces = []
+        self._open_length = 0
+        self._open_start = 0
+        self._open_number = None
+        self._open_context = None
+        # (number parts, clause type name) of the headings enclosing the open section
+        self._headings = []
+
+    def feed(self, text):
+        """Consume a piece of text and return the sections it completed"""
+        if '\n' not in text:
+            self._pending.append(text)
+            return []
+        self._tail += ''.join(self._pending) + text
+        self._pending = []
+        return self._scan(self._tail.rfind('\n'))
+
+    def finish(self, text=''):
+        """Consume the last piece of text and return the remaining sections"""
+        self._tail += ''.join(self._pending) + text
+        self._pending = []
+        sections = self._scan(len(self._tail), final=True)
+        self._close('', sections)
+        return sections
+
+    def _scan(self, limit, final=False):
+        """Act on the boundaries from the cursor that end by limit"""
+        sections = []
+        tail = self._tail
+        position = resume = self._cursor
+        for match in SECTION_PATTERN.finditer(tail, self._cursor):
+            if match.end() > limit:
+                break
+            if match.start('paragraph_break') == -1:
+                self._close(tail[position:match.start()], sections)
+                position = match.start()
+                self._open_section(self._tail_offset + position, match.group('number'), match.group('title'))
+            elif self._open_number is None or self._open_length + match.start() - position > SECTION_MAX_CHARS:
+                self._close(tail[position:match.start()], sections)
+                position = match.end()
+                # A long numbered section continues as unnumbered paragraphs under the same heading
+                self._open_start = self._tail_offset + position
+                self._open_number = None
+            resume = match.end()
+        if final:
+            resume = len(tail)
+        else:
+            # A break may still start in the blanks before the last line
+            # break; scanning resumes there, before it or after the last boundary
+            undecided = limit
+            while undecided > 0 and tail[undecided - 1] in ' \t':
+                undecided -= 1
+            resume = max(resume, undecided)
+        self._pieces.append(tail[position:resume])
+        self._open_length += resume - position
+        keep = max(0, resume - 1)
+        self._tail = tail[keep:]
+        self._tail_offset += keep
+        self._cursor = resume - keep
+        return sections
+
+    def _close(self, text, sections):
+        if self._pieces:
+            text = ''.join(self._pieces) + text
+            self._pieces = []
+        self._open_length = 0
+        body = text.strip()
+        if body:
+            start = self._open_start + len(text) - len(text.lstrip())
+            sections.append(Section(start, start + len(body), self._open_number, self._open_context, body))
+
+    def _open_section(self, start, number, title):
+        parts = number_parts(number)
+        while self._headings:
+            enclosing = self._headings[-1][0]
+            if len(enclosing) < len(parts) and parts[:len(enclosing)] == enclosing:
+                break
+            self._headings.pop()
+        context = next((name for _, name in reversed(self._headings) if name is not None), None)
+        if is_heading(title):
+            clause_type = self.matcher.classify_text(title)
+            if clause_type is not None:
+                context = clause_type['type']
+            self._headings.append((parts, context))
+        self._open_start = start
+        self._open_number = number
+        self._open_context = context
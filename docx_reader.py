@@ -0,0 +1,226 @@
+import io
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+APP_PAGES = '{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}Pages'
+MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+
+# Elements whose children are the top-level blocks of a part; cleared as
+# blocks are consumed so memory does not grow with the document
+CONTAINERS = {W + 'body', W + 'hdr', W + 'ftr', W + 'footnotes', W + 'endnotes'}
+
+# Run content that is not in a w:t element
+RUN_TEXT = {W + 'tab': '\t', W + 'cr': '\n', W + 'noBreakHyphen': '-'}
+
+NOTE_REFERENCES = {W + 'footnoteReference': 'footnote', W + 'endnoteReference': 'endnote'}
+
+PART_NUMBER = re.compile(r'word/(header|footer)(\d*)\.xml$')
+
+# Uncompressed bytes of word/document.xml per page, a low estimate for
+# files that record no page count or a stale one
+DOCUMENT_XML_BYTES_PER_PAGE = 4096
+
+# Marks a page break between blocks in the output of _iter_blocks
+PAGE_BREAK = object()
+
+
+def iter_docx_text(source):
+    """Yield (page, text) for a DOCX file given as a path or as its bytes.
+
+    Reads word/document.xml straight from the archive with incremental XML
+    parsing instead of building python-docx's object model. Paragraphs and
+    table rows are yielded in document order; cells of a row are separated
+    by tabs. Footnotes and endnotes follow the paragraph that refers to
+    them, header text comes first and footer text last, each distinct
+    header or footer once. Pages are counted from explicit page breaks.
+    """
+    with zipfile.ZipFile(source if isinstance(source, str) else io.BytesIO(source)) as archive:
+        names = archive.namelist()
+        notes = {}
+        for kind in ('footnote', 'endnote'):
+            part = f'word/{kind}s.xml'
+            if part in names:
+                notes.update(_read_notes(archive, part, kind))
+
+        headers, footers = _header_footer_parts(names)
+        seen = set()
+        for text in _iter_unique_parts(archive, headers, notes, seen):
+            yield 1, text
+
+        page = 1
+        for block in _iter_blocks(archive, 'word/document.xml', notes):
+            if block is PAGE_BREAK:
+                page += 1
+            else:
+                yield page, block
+
+        for text in _iter_unique_parts(archive, footers, notes, seen):
+            yield page, text
+
+
+def docx_page_count(source):
+    """Pages of a DOCX file without parsing its body: the count Word saved
+    in docProps/app.xml, or an estimate from the uncompressed size of
+    word/document.xml when that is higher. Files written by other tools
+    often carry a stale count."""
+    with zipfile.ZipFile(source if isinstance(source, str) else io.BytesIO(source)) as archive:
+        recorded = 0
+        try:
+            pages = ET.fromstring(archive.read('docProps/app.xml')).find(APP_PAGES)
+            if pages is not None and pages.text:
+                recorded = int(pages.text)
+        except (KeyError, ValueError, ET.ParseError):
+            pass
+        try:
+            estimated = archive.getinfo('word/document.xml').file_size // DOCUMENT_XML_BYTES_PER_PAGE + 1
+        except KeyError:
+            estimated = 1
+        return max(recorded, estimated)
+
+
+def _header_footer_parts(names):
+    """Header and footer part names, each in numeric order"""
+    parts = {'header': [], 'footer': []}
+    for name in names:
+        match = PART_NUMBER.match(name)
+        if match:
+            parts[match.group(1)].append((int(match.group(2) or 0), name))
+    return [name for _, name in sorted(parts['header'])], [name for _, name in sorted(parts['footer'])]
+
+
+def _iter_unique_parts(archive, names, notes, seen):
+    """Text of header or footer parts, skipping parts repeating one seen before"""
+    for name in names:
+        blocks = [block for block in _iter_blocks(archive, name, notes) if block is not PAGE_BREAK]
+        text = ''.join(blocks)
+        if text.strip() and text not in seen:
+            seen.add(text)
+            yield from blocks
+
+
+def _read_notes(archive, part, kind):
+    """Map (kind, id) to the text of each footnote or endnote"""
+    notes = {}
+    note_id = None
+    paragraphs = []
+    for event, elem, paragraph in _iter_events(archive, part):
+        if event == 'start':
+            if elem.tag == W + kind:
+                note_id = elem.get(W + 'id')
+                paragraphs = []
+        elif elem.tag == W + kind:
+            text = ''.join(paragraphs)
+            if text.strip():
+                notes[(kind, note_id)] = text
+        elif paragraph is not None:
+            paragraphs.append(paragraph['text'] + '\n')
+    return notes
+
+
+def _iter_events(archive, part):
+    """iterparse a part, yielding (event, element, paragraph) where
+    paragraph is the run text, page breaks and note references collected
+    for a w:p element when it ends, and None otherwise.
+
+    Paragraph state is kept on a stack, since text boxes nest paragraphs
+    inside the runs of another. Content under mc:Fallback duplicates the
+    preferred mc:Choice and is skipped.
+    """
+    with archive.open(part) as stream:
+        paragraphs = []
+        run_depth = 0
+        skip_depth = 0
+        depth = 0
+        container_depth = None
+        container = None
+        for event, elem in ET.iterparse(stream, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'start':
+                depth += 1
+                if tag == MC_FALLBACK or skip_depth:
+                    skip_depth += 1
+                    continue
+                if tag == W + 'p':
+                    paragraphs.append({'parts': [], 'page_breaks_before': 0, 'page_breaks': 0, 'notes': []})
+                elif tag == W + 'r':
+                    run_depth += 1
+                elif tag in CONTAINERS:
+                    container, container_depth = elem, depth
+                yield event, elem, None
+                continue
+
+            depth -= 1
+            if skip_depth:
+                skip_depth -= 1
+                if tag == MC_FALLBACK:
+                    elem.clear()
+                continue
+            paragraph = None
+            if paragraphs:
+                current = paragraphs[-1]
+                if run_depth:
+                    if tag == W + 't':
+                        current['parts'].append(elem.text or '')
+                    elif tag in RUN_TEXT:
+                        current['parts'].append(RUN_TEXT[tag])
+                    elif tag == W + 'br':
+                        if elem.get(W + 'type') == 'page':
+                            current['page_breaks'] += 1
+                        else:
+                            current['parts'].append('\n')
+                    elif tag in NOTE_REFERENCES:
+                        current['notes'].append((NOTE_REFERENCES[tag], elem.get(W + 'id')))
+                if tag == W + 'pageBreakBefore' and elem.get(W + 'val') not in ('0', 'false', 'off'):
+                    current['page_breaks_before'] = 1
+            if tag == W + 'r':
+                run_depth -= 1
+            elif tag == W + 'p':
+                paragraph = paragraphs.pop()
+                paragraph['text'] = ''.join(paragraph.pop('parts'))
+            yield event, elem, paragraph
+            if depth == container_depth:
+                # A top-level block is done: drop it and everything it held
+                container.clear()
+
+
+def _iter_blocks(archive, part, notes):
+    """Yield the text blocks of a part in document order, with PAGE_BREAK
+    markers between pages"""
+    table_depth = 0
+    cell = []
+    row = []
+    pending_notes = []
+    for event, elem, paragraph in _iter_events(archive, part):
+        tag = elem.tag
+        if event == 'start':
+            if tag == W + 'tbl':
+                table_depth += 1
+            continue
+
+        if paragraph is not None:
+            for _ in range(paragraph['page_breaks_before']):
+                yield PAGE_BREAK
+            referenced = [notes[key] for key in paragraph['notes'] if key in notes]
+            if table_depth:
+                # Paragraphs of a cell, including those of nested tables, are joined into one cell
+                if paragraph['text']:
+                    cell.append(paragraph['text'])
+                pending_notes.extend(referenced)
+            else:
+                yield paragraph['text'] + '\n'
+                yield from referenced
+            for _ in range(paragraph['page_breaks']):
+                yield PAGE_BREAK
+        elif tag == W + 'tc' and table_depth == 1:
+            row.append(' '.join(cell))
+            cell = []
+        elif tag == W + 'tr' and table_depth == 1:
+            if any(row):
+                yield '\t'.join(row) + '\n'
+            row = []
+            yield from pending_notes
+            pending_notes = []
+        elif tag == W + 'tbl':
+            table_depth -= 1
@@ -0,0 +1,150 @@
+import fitz  # PyMuPDF
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from docx_reader import docx_page_count, iter_docx_text
+from settings import get_setting
+
+TXT_BLOCK_SIZE = 64 * 1024
+
+# PDFs with at least this many pages are extracted on a process pool
+PARALLEL_PAGE_THRESHOLD = get_setting('PARALLEL_PAGE_THRESHOLD', 200)
+PARALLEL_WORKERS = get_setting('PARALLEL_WORKERS', None)
+# Pages per task handed to a worker; small enough to stream results in order
+PARALLEL_BATCH_PAGES = get_setting('PARALLEL_BATCH_PAGES', 25)
+
+# A piece of extracted text: its absolute character offset in the document,
+# the text itself and the 1-based page it came from (DOCX pages are counted
+# from explicit page breaks; TXT files carry no pagination, so everything is
+# reported as page 1).
+TextSegment = namedtuple('TextSegment', ['offset', 'text', 'page'])
+
+
+def iter_text(source, workers=None, filename=None):
+    """Yield the document text as TextSegments, page by page or paragraph by paragraph.
+
+    source is a file path or the file's bytes; for bytes, filename gives the
+    format. Large PDFs are extracted in parallel when workers is None and
+    the page count reaches PARALLEL_PAGE_THRESHOLD, or whenever workers > 1
+    is given; pages are still yielded in order with the same offsets.
+    """
+    offset = 0
+    for page, text in _iter_raw_text(source, workers, filename):
+        if text:
+            yield TextSegment(offset, text, page)
+            offset += len(text)
+
+
+def document_format(source, filename=None):
+    """File extension ('.pdf', '.docx', '.txt'...) of a path or named upload"""
+    name = filename if filename is not None else source
+    return os.path.splitext(name)[1].lower() if isinstance(name, str) else ''
+
+
+def _open_pdf(source):
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype='pdf')
+
+
+def _iter_raw_text(source, workers=None, filename=None):
+    kind = document_format(source, filename)
+    if kind == '.pdf':
+        with _open_pdf(source) as doc:
+            total = doc.page_count
+            if workers is None:
+                workers = default_workers() if total >= PARALLEL_PAGE_THRESHOLD else 1
+            if workers <= 1:
+                for page_number, page in enumerate(doc, start=1):
+                    yield page_number, page.get_text()
+                return
+        if isinstance(source, str):
+            yield from _iter_pdf_pages_parallel(source, total, workers)
+            return
+        # Workers open the PDF by path, so an in-memory upload goes to a
+        # temporary file for the duration of the extraction
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as f:
+            f.write(source)
+            f.flush()
+            yield from _iter_pdf_pages_parallel(f.name, total, workers)
+    elif kind == '.docx':
+        yield from iter_docx_text(source)
+    elif kind == '.txt':
+        if isinstance(source, str):
+            f = open(source, 'r', encoding='utf-8')
+        else:
+            f = io.TextIOWrapper(io.BytesIO(source), encoding='utf-8')
+        with f:
+            for block in iter(lambda: f.read(TXT_BLOCK_SIZE), ''):
+                yield 1, block
+    else:
+        yield 1, "Unsupported file format"
+
+
+def extract_text(source, filename=None):
+    """Extract the full document text in one string"""
+    return ''.join(segment.text for segment in iter_text(source, filename=filename))
+
+
+def page_count(source, filename=None):
+    """Number of pages for paginated formats, or None when unknown"""
+    if document_format(source, filename) == '.pdf':
+        with _open_pdf(source) as doc:
+            return doc.page_count
+    return None
+
+
+def estimated_page_count(source, filename=None):
+    """Page count of a PDF, or an estimate for a DOCX file taken without
+    parsing its body; None for other formats"""
+    if document_format(source, filename) == '.docx':
+        return docx_page_count(source)
+    return page_count(source, filename)
+
+
+def default_workers():
+    return PARALLEL_WORKERS or os.cpu_count() or 1
+
+
+def _extract_page_range(file_path, start, stop):
+    """Worker: open the PDF independently and return the text of pages [start, stop)"""
+    with fitz.open(file_path) as doc:
+        return [doc[index].get_text() for index in range(start, stop)]
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    """Return a process pool with the given worker count, reused across documents"""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _pool_workers = workers
+        return _pool
+
+
+def _iter_pdf_pages_parallel(file_path, total, workers, batch_pages=None):
+    """Extract page batches on a process pool and yield pages in document order"""
+    batch_pages = batch_pages or PARALLEL_BATCH_PAGES
+    pool = _get_pool(workers)
+    futures = [
+        (start, pool.submit(_extract_page_range, file_path, start, min(start + batch_pages, total)))
+        for start in range(0, total, batch_pages)
+    ]
+    try:
+        for start, future in futures:
+            for index, text in enumerate(future.result()):
+                yield start + index + 1, text
+    finally:
+        for _, future in futures:
+            future.cancel()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion for the Legal AI Assistant
+Analyzes every supported document under a directory tree on a process pool
+and streams one JSON result per line. The output file doubles as the
+checkpoint: re-running with the same --output skips documents that are
+already in it, so an interrupted run resumes where it stopped. With
+--retry-errors the failed records are removed from the file before their
+documents are analyzed again, so each path keeps a single record.
+
+Usage: python ingest.py contracts/ --output results.jsonl --workers 8 [--analytics analytics.db]
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from ai_processor import document_processor, ANALYZER_VERSION
+from analytics import AnalyticsStore
+from extraction import iter_text
+from settings import get_setting
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+
+
+def find_documents(root):
+    """Return the relative paths of supported documents under root, sorted"""
+    documents = []
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if file_name.lower().endswith(SUPPORTED_EXTENSIONS):
+                documents.append(os.path.relpath(os.path.join(dir_path, file_name), root))
+    return documents
+
+
+def load_completed(output_path, retry_errors=False):
+    """Read the paths already recorded in the output file.
+
+    A partially written last line from an interrupted run is cut off so new
+    results are appended after the last complete record. When retrying
+    errors, the failed records are dropped from the file and their paths
+    are not reported as completed.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    valid_bytes = 0
+    failed = 0
+    with open(output_path, 'rb') as f:
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            valid_bytes += len(line)
+            if record.get('status') == 'ok' or not retry_errors:
+                completed.add(record['path'])
+            else:
+                failed += 1
+    if valid_bytes < os.path.getsize(output_path):
+        print(f"Discarding incomplete record at the end of {output_path}")
+        with open(output_path, 'r+b') as f:
+            f.truncate(valid_bytes)
+    if failed:
+        drop_failed_records(output_path)
+        print(f"Removed {failed} failed records from {output_path} to retry them")
+    return completed
+
+
+def drop_failed_records(output_path):
+    """Rewrite the output file with only its successful records"""
+    tmp_path = output_path + '.tmp'
+    with open(output_path, 'rb') as source, open(tmp_path, 'wb') as target:
+        for line in source:
+            if json.loads(line).get('status') == 'ok':
+                target.write(line)
+    os.replace(tmp_path, output_path)
+
+
+def analyze_file(job):
+    """Worker: analyze one document and return its JSONL record"""
+    root, relative_path = job
+    path = os.path.join(root, relative_path)
+    started = time.perf_counter()
+    try:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        # Documents are already spread over the pool, so extract each one serially
+        analysis = document_processor.analyze_stream(iter_text(path, workers=1))
+        return {
+            "path": relative_path,
+            "status": "ok",
+            "doc_id": digest.hexdigest(),
+            "analyzer_version": ANALYZER_VERSION,
+            "filename": os.path.basename(path),
+            "summary": analysis['summary'],
+            "clauses": analysis['clauses'],
+            "risks": analysis['risks'],
+            "parties": analysis['parties'],
+            "text_length": analysis['text_length'],
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+    except Exception as e:
+        return {
+            "path": relative_path,
+            "status": "error",
+            "error": str(e),
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:d}:{minutes:02d}:{seconds:02d}"
+
+
+def main():
+    """Main ingestion function"""
+    parser = argparse.ArgumentParser(description="Analyze a directory tree of contracts into JSONL")
+    parser.add_argument('root', help="Directory to scan for PDF, DOCX and TXT files")
+    parser.add_argument('--output', '-o', default='ingest_results.jsonl', help="JSONL file to append results to")
+    parser.add_argument('--workers', '-w', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--retry-errors', action='store_true', help="Re-analyze documents that failed previously, replacing their records")
+    parser.add_argument('--analytics', metavar='DB', help="Also add each result to this analytics database")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        print(f"❌ Not a directory: {args.root}")
+        sys.exit(1)
+
+    documents = find_documents(args.root)
+    completed = load_completed(args.output, args.retry_errors)
+    pending = [path for path in documents if path not in completed]
+    print(f"📂 {len(documents)} documents found, {len(documents) - len(pending)} already done, "
+          f"{len(pending)} to analyze with {args.workers} workers")
+    if not pending:
+        return
+
+    # Only this process writes to the analytics database
+    analytics_store = AnalyticsStore(args.analytics, get_setting('ANALYTICS_OWN_PARTIES', [])) if args.analytics else None
+    started = time.time()
+    done = errors = 0
+    last_report = 0.0
+    with open(args.output, 'a', encoding='utf-8') as output, multiprocessing.Pool(args.workers) as pool:
+        jobs = [(args.root, path) for path in pending]
+        for record in pool.imap_unordered(analyze_file, jobs, chunksize=1):
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            done += 1
+            if analytics_store is not None and record['status'] == 'ok':
+                analytics_store.record(record)
+            if record['status'] != 'ok':
+                errors += 1
+                print(f"\n⚠️  {record['path']}: {record['error']}")
+
+            now = time.time()
+            if now - last_report >= 1 or done == len(pending):
+                last_report = now
+                rate = done / max(now - started, 1e-9)
+                eta = (len(pending) - done) / rate if rate else 0
+                print(f"\r{done}/{len(pending)} documents, {rate:.2f} docs/s, "
+                      f"{errors} errors, ETA {format_duration(eta)}", end="", flush=True)
+
+    print(f"\n✅ Finished in {format_duration(time.time() - started)}; results in {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from ai_processor import DocumentAnalysis, document_processor
+from extraction import iter_text, page_count
+
+# Set in each worker by the pool initializer
+_progress_queue = None
+
+
+def _init_worker(progress_queue):
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def report_progress(job_id, **fields):
+    """Send a progress update for a job from inside a worker"""
+    if _progress_queue is not None:
+        _progress_queue.put((job_id, fields))
+
+
+def run_upload_analysis(job_id, source, filename=None, parent_sections=None):
+    """Worker body of an async upload: extract and analyze one file, given
+    as a path or as its bytes plus filename. parent_sections is the
+    SectionMap of the version a revised document replaces.
+
+    Returns the analysis together with the extracted text so the server can
+    open a chat session for the document.
+    """
+    pages_total = page_count(source, filename)
+    report_progress(job_id, status='running', pages_done=0, pages_total=pages_total)
+    analysis = DocumentAnalysis(document_processor, parent_sections)
+    parts = []
+    last_page = 0
+    # The job pool is the unit of parallelism; a worker must not start its own pool
+    for segment in iter_text(source, filename=filename, workers=1):
+        analysis.feed(segment.text, segment.page)
+        parts.append(segment.text)
+        if segment.page != last_page:
+            last_page = segment.page
+            report_progress(job_id, pages_done=last_page)
+    result = analysis.finish()
+    report_progress(job_id, pages_done=pages_total or last_page)
+    return result, ''.join(parts)
+
+
+class JobManager:
+    """Runs upload analysis jobs on a local worker pool.
+
+    The 'local' backend uses a process pool owned by this server, so heavy
+    extraction never blocks a request thread and no external broker is
+    needed; 'thread' runs jobs on an in-process thread pool instead. Workers
+    push progress updates through a queue that a listener thread applies to
+    the job records. Finished jobs are kept up to max_finished_jobs.
+
+    With a state_dir, each job record is also written there as JSON, so any
+    server process sharing the directory can report on any job.
+    """
+
+    # Minimum seconds between progress writes of one job to state_dir
+    STATE_WRITE_INTERVAL = 0.5
+
+    def __init__(self, backend='local', max_workers=None, max_finished_jobs=1000, state_dir=None):
+        self.backend = backend
+        self.max_workers = max_workers
+        self.max_finished_jobs = max_finished_jobs
+        self.state_dir = None
+        self._state_writes = {}
+        if state_dir:
+            self.persist_to(state_dir)
+        self._executor = None
+        self._progress_queue = None
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args, on_success=None, on_finish=None):
+        """Queue func(job_id, *args) and return the new job id.
+
+        on_success, if given, is called in this process with the worker's
+        return value and its result becomes the job result. on_finish is
+        called afterwards whether the job succeeded or failed.
+        """
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": "queued",
+                "created_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "progress": {"pages_done": 0, "pages_total": None},
+                "error": None,
+                "result": None
+            }
+            self._trim()
+            self._write_state(self._jobs[job_id])
+        future = self._get_executor().submit(func, job_id, *args)
+        future.add_done_callback(lambda f: self._finish(job_id, f, on_success, on_finish))
+        return job_id
+
+    def persist_to(self, state_dir):
+        """Write job records to state_dir from now on"""
+        os.makedirs(state_dir, exist_ok=True)
+        self.state_dir = state_dir
+
+    def get(self, job_id):
+        """Return a snapshot of a job's status without its result"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                snapshot = {key: value for key, value in job.items() if key != "result"}
+                snapshot["progress"] = dict(job["progress"])
+                return snapshot
+        job = self._read_state(job_id)
+        if job is not None:
+            job.pop("result", None)
+        return job
+
+    def result(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job["result"]
+        job = self._read_state(job_id)
+        return job["result"] if job else None
+
+    def active(self):
+        """Number of jobs not yet done or failed"""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running"))
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+        return {"backend": self.backend, "jobs": counts}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.backend == 'thread':
+                    self._progress_queue = queue.Queue()
+                    executor_class, context_args = ThreadPoolExecutor, {}
+                else:
+                    # Spawned workers avoid forking a multi-threaded server
+                    context = multiprocessing.get_context('spawn')
+                    self._progress_queue = context.Queue()
+                    executor_class, context_args = ProcessPoolExecutor, {"mp_context": context}
+                self._executor = executor_class(
+                    max_workers=self.max_workers,
+                    initializer=_init_worker,
+                    initargs=(self._progress_queue,),
+                    **context_args
+                )
+                threading.Thread(target=self._listen, args=(self._progress_queue,), daemon=True).start()
+            return self._executor
+
+    def _listen(self, progress_queue):
+        while True:
+            try:
+                job_id, fields = progress_queue.get()
+            except (EOFError, OSError):
+                return
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job["status"] in ("done", "failed"):
+                    continue
+                started = fields.pop("status", None) == "running"
+                if started:
+                    job["status"] = "running"
+                    job["started_at"] = time.time()
+                job["progress"].update(fields)
+                self._write_state(job, force=started)
+
+    def _finish(self, job_id, future, on_success, on_finish=None):
+        error = future.exception()
+        result = None
+        if error is None:
+            try:
+                result = future.result()
+                if on_success is not None:
+                    result = on_success(result)
+            except Exception as e:
+                error = e
+        if error is not None:
+            print(f"Job {job_id} failed: {error}")
+        if on_finish is not None:
+            on_finish()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job["finished_at"] = time.time()
+            if error is None:
+                job["status"] = "done"
+                job["result"] = result
+            else:
+                job["status"] = "failed"
+                job["error"] = str(error)
+            self._write_state(job, force=True)
+
+    def _trim(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in ("done", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+            self._state_writes.pop(job_id, None)
+            if self.state_dir is not None:
+                try:
+                    os.remove(self._state_path(job_id))
+                except OSError:
+                    pass
+
+    def _state_path(self, job_id):
+        return os.path.join(self.state_dir, f"{job_id}.json")
+
+    def _write_state(self, job, force=False):
+        """Write a job record to state_dir; progress-only updates are throttled"""
+        if self.state_dir is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._state_writes.get(job["id"], 0) < self.STATE_WRITE_INTERVAL:
+            return
+        self._state_writes[job["id"]] = now
+        path = self._state_path(job["id"])
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(job, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"⚠️  Could not write job state {job['id']}: {e}")
+
+    def _read_state(self, job_id):
+        if self.state_dir is None or os.path.basename(job_id) != job_id:
+            return None
+        try:
+            with open(self._state_path(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
@@ -0,0 +1,299 @@
+import hashlib
+import os
+import queue
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from cache import LRUCache
+
+# Sentences end at terminal punctuation or a blank line; single line breaks
+# from PDF wrapping do not split them
+SENTENCE_PATTERN = re.compile(r'(?:[^.!?\n]|\n(?!\s*\n))+(?:[.!?]+|$|(?=\n))')
+WORD_PATTERN = re.compile(r'[a-z0-9]+')
+
+QUESTION_STOP_WORDS = frozenset("""
+a an and are as at be by can do does for from has have how i in is it of on or
+the this that to was what when where which who whom why will with my our your
+""".split())
+
+
+def format_prompt(prefix, context, question):
+    """Lay out a request so the per-document prefix comes first"""
+    return f"{prefix}\nDocument excerpts:\n{context}\n\nQuestion: {question}\nAnswer:"
+
+
+class LLMBackend:
+    """Interface of an inference backend behind DocumentProcessor.llm.
+
+    A request is a (prefix, context, question) triple. The prefix holds the
+    document-level context (instructions and summary), which stays the same
+    across follow-up questions on one document; backends use that to avoid
+    re-encoding it. The context holds the excerpts retrieved for this
+    question.
+    """
+
+    name = "base"
+
+    def generate(self, prefix, context, question, max_tokens=256):
+        """Return (text, completion_tokens) for one request"""
+        raise NotImplementedError
+
+    def stream(self, prefix, context, question, max_tokens=256):
+        """Yield the answer piece by piece; backends that decode
+        incrementally override this to yield tokens as they are produced"""
+        text, _ = self.generate(prefix, context, question, max_tokens)
+        for position, word in enumerate(text.split(' ')):
+            yield word if position == 0 else ' ' + word
+
+    def stats(self):
+        return {}
+
+
+class LlamaCppBackend(LLMBackend):
+    """Local GGUF model served through llama-cpp-python.
+
+    The model is loaded once and kept warm. A RAM state cache stores the KV
+    state of evaluated prompts, so a follow-up question that shares the
+    document-context prefix only evaluates the new tokens.
+    """
+
+    name = "llama_cpp"
+
+    def __init__(self, model_path, n_ctx=4096, n_threads=None, prefix_cache_bytes=512 * 1024 * 1024):
+        from llama_cpp import Llama, LlamaRAMCache
+
+        self.model_path = model_path
+        self.model = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, verbose=False)
+        self.model.set_cache(LlamaRAMCache(capacity_bytes=prefix_cache_bytes))
+        self._lock = threading.Lock()
+
+    def generate(self, prefix, context, question, max_tokens=256):
+        with self._lock:
+            output = self.model(format_prompt(prefix, context, question), max_tokens=max_tokens, stop=["\nQuestion:"])
+        return output['choices'][0]['text'].strip(), output['usage']['completion_tokens']
+
+    def stream(self, prefix, context, question, max_tokens=256):
+        # Closing this generator (e.g. when the client disconnects) stops
+        # decoding and releases the model
+        with self._lock:
+            prompt = format_prompt(prefix, context, question)
+            for chunk in self.model(prompt, max_tokens=max_tokens, stop=["\nQuestion:"], stream=True):
+                yield chunk['choices'][0]['text']
+
+    def stats(self):
+        return {"model_path": self.model_path}
+
+
+class MockLLM(LLMBackend):
+    """Deterministic local stand-in model used when no GGUF model is available.
+
+    Answers extractively with the context sentences that share the most
+    words with the question, so the same input always gives the same output.
+    The split-up prefix sentences are cached per prefix, mirroring the
+    prefix cache of a real backend.
+    """
+
+    name = "mock"
+
+    def __init__(self, max_sentences=3, prefix_cache_entries=64):
+        self.max_sentences = max_sentences
+        self.prefix_cache = LRUCache(prefix_cache_entries)
+        self.prefix_hits = 0
+        self.prefix_misses = 0
+
+    def __call__(self, prompt):
+        return self.generate("", prompt, prompt)[0]
+
+    def generate(self, prefix, context, question, max_tokens=256):
+        sentences = self._encode_prefix(prefix) + self._encode(context)
+        question_words = set(WORD_PATTERN.findall(question.lower())) - QUESTION_STOP_WORDS
+        ranked = sorted(
+            ((len(question_words & words), -position, sentence) for position, (sentence, words) in enumerate(sentences)),
+            reverse=True
+        )
+        best = []
+        seen = set()
+        top_overlap = ranked[0][0] if ranked else 0
+        for overlap, position, sentence in ranked:
+            # Keep sentences that match more than half as well as the best one
+            if overlap == 0 or overlap * 2 <= top_overlap or len(best) == self.max_sentences:
+                break
+            if sentence not in seen:
+                seen.add(sentence)
+                best.append((-position, sentence))
+        if not best:
+            answer = "The document does not appear to address this question directly."
+        else:
+            # Quote the chosen sentences in document order
+            answer = " ".join(sentence for _, sentence in sorted(best))
+        words = answer.split()[:max_tokens]
+        return " ".join(words), len(words)
+
+    def stats(self):
+        return {"prefix_cache_hits": self.prefix_hits, "prefix_cache_misses": self.prefix_misses}
+
+    def _encode_prefix(self, prefix):
+        key = hashlib.sha1(prefix.encode('utf-8', 'surrogatepass')).hexdigest()
+        sentences = self.prefix_cache.get(key)
+        if sentences is not None:
+            self.prefix_hits += 1
+            return sentences
+        self.prefix_misses += 1
+        sentences = self._encode(prefix)
+        self.prefix_cache.put(key, sentences)
+        return sentences
+
+    def _encode(self, text):
+        """Split text into sentences paired with their word sets"""
+        sentences = []
+        for match in SENTENCE_PATTERN.finditer(text):
+            sentence = ' '.join(match.group(0).split())
+            if len(sentence) > 20:
+                sentences.append((sentence, set(WORD_PATTERN.findall(sentence.lower()))))
+        return sentences
+
+
+class QueuedLLM:
+    """Serializes concurrent requests onto one warm backend, grouped by prefix.
+
+    Requests are queued; a single worker thread takes the next request
+    together with up to max_group - 1 others already waiting, never waiting
+    for more to arrive, and runs them one after another with requests on
+    the same document prefix back to back, so the backend's prefix cache
+    still holds that prefix. The backend
+    decodes one sequence at a time; nothing is decoded in parallel. Queue
+    wait and generation throughput are recorded.
+    """
+
+    def __init__(self, backend, max_group=8):
+        self.backend = backend
+        self.max_group = max_group
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._queue_waits = deque(maxlen=1000)
+        self.requests = 0
+        self.groups = 0
+        self.completion_tokens = 0
+        self.generation_seconds = 0.0
+        self.stream_requests = 0
+        self.streams_cancelled = 0
+        self._first_token_times = deque(maxlen=1000)
+        threading.Thread(target=self._run, daemon=True).start()
+
+    @property
+    def name(self):
+        return self.backend.name
+
+    def __call__(self, prompt):
+        return self.generate("", prompt, prompt)
+
+    def generate(self, prefix, context, question, max_tokens=256):
+        """Queue a request and block until its answer is ready"""
+        future = Future()
+        self._queue.put((time.perf_counter(), (prefix, context, question), max_tokens, future))
+        return future.result()
+
+    def stream(self, prefix, context, question, max_tokens=256, cancel_event=None):
+        """Yield answer tokens as the backend produces them.
+
+        Streams bypass the queue. Generation stops when
+        cancel_event is set or when the consumer closes this generator.
+        """
+        started = time.perf_counter()
+        first_token = None
+        tokens = 0
+        cancelled = False
+        inner = self.backend.stream(prefix, context, question, max_tokens)
+        try:
+            for token in inner:
+                if cancel_event is not None and cancel_event.is_set():
+                    cancelled = True
+                    break
+                if first_token is None:
+                    first_token = time.perf_counter() - started
+                tokens += 1
+                yield token
+        except GeneratorExit:
+            cancelled = True
+            raise
+        finally:
+            inner.close()
+            with self._lock:
+                self.stream_requests += 1
+                self.streams_cancelled += cancelled
+                self.completion_tokens += tokens
+                self.generation_seconds += time.perf_counter() - started
+                if first_token is not None:
+                    self._first_token_times.append(first_token)
+
+    def stats(self):
+        with self._lock:
+            waits = sorted(self._queue_waits)
+            first_tokens = sorted(self._first_token_times)
+            stats = {
+                "backend": self.backend.name,
+                "requests": self.requests,
+                "groups": self.groups,
+                "avg_group_size": round(self.requests / self.groups, 2) if self.groups else 0.0,
+                "tokens_per_second": round(self.completion_tokens / self.generation_seconds, 1) if self.generation_seconds else 0.0,
+                "queue_wait_ms_avg": round(sum(waits) / len(waits) * 1000, 3) if waits else 0.0,
+                "queue_wait_ms_p95": round(waits[int(len(waits) * 0.95)] * 1000, 3) if waits else 0.0,
+                "queue_depth": self._queue.qsize(),
+                "stream_requests": self.stream_requests,
+                "streams_cancelled": self.streams_cancelled,
+                "time_to_first_token_ms_avg": round(sum(first_tokens) / len(first_tokens) * 1000, 3) if first_tokens else 0.0,
+                "time_to_first_token_ms_p95": round(first_tokens[int(len(first_tokens) * 0.95)] * 1000, 3) if first_tokens else 0.0
+            }
+        stats.update(self.backend.stats())
+        return stats
+
+    def _run(self):
+        while True:
+            group = [self._queue.get()]
+            # Only what is already queued: requests run one at a time, so
+            # waiting for more would only delay this one
+            while len(group) < self.max_group:
+                try:
+                    group.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._run_group(group)
+
+    def _run_group(self, group):
+        # Same prefixes next to each other; the stable sort keeps arrival order within a prefix
+        group.sort(key=lambda item: item[1][0])
+        with self._lock:
+            self.groups += 1
+        for queued_at, request, max_tokens, future in group:
+            started = time.perf_counter()
+            try:
+                text, tokens = self.backend.generate(*request, max_tokens=max_tokens)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            with self._lock:
+                self.requests += 1
+                self._queue_waits.append(started - queued_at)
+                self.completion_tokens += tokens
+                self.generation_seconds += time.perf_counter() - started
+            future.set_result(text)
+
+
+def create_backend(model_path=None, backend=None):
+    """Pick the inference backend: a llama.cpp model if one is configured and
+    loadable, otherwise the deterministic MockLLM"""
+    if backend == 'mock' or not model_path:
+        return MockLLM()
+    if not os.path.exists(model_path):
+        print(f"⚠️  Model file not found: {model_path}")
+        return MockLLM()
+    try:
+        return LlamaCppBackend(model_path)
+    except ImportError:
+        print("⚠️  llama-cpp-python is not installed")
+    except Exception as e:
+        print(f"⚠️  Could not load model {model_path}: {e}")
+    return MockLLM()
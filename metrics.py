@@ -0,0 +1,453 @@
+"""
+Lightweight in-process metrics for the Legal AI Assistant
+Counters, gauges and histograms rendered in the Prometheus text format,
+per-request stage timings for the Server-Timing header, and an optional
+sampling profiler that keeps stack samples of slow requests only.
+"""
+
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond regex passes to long PDFs
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Metric:
+    """One named metric; samples are keyed by their label values"""
+
+    def __init__(self, registry, name, help_text, kind, labelnames=(), buckets=None):
+        self.registry = registry
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) if buckets else None
+        self.samples = {}
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.samples[key] = self.samples.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        with self.registry.lock:
+            self.samples[self._key(labels)] = value
+
+    def observe(self, value, **labels):
+        """Record a histogram observation: [per-bucket counts..., +Inf count, sum]"""
+        key = self._key(labels)
+        with self.registry.lock:
+            sample = self.samples.get(key)
+            if sample is None:
+                sample = self.samples[key] = [0] * (len(self.buckets) + 2)
+            for slot, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample[slot] += 1
+                    break
+            else:
+                sample[len(self.buckets)] += 1
+            sample[-1] += value
+
+
+class MetricsRegistry:
+    """Holds the metrics of one process.
+
+    With a shared_dir, snapshot() is also written there per process, and
+    render() merges the snapshots of every process that wrote to it, so a
+    scrape of any preforked worker reports the whole server. Counters and
+    histograms of exited processes are kept so totals never go backwards;
+    their gauges are dropped. retire() folds an exited process into one
+    retired snapshot, so recycled workers do not pile up files.
+    """
+
+    RETIRED_FILE = 'retired.json'
+
+    # Minimum seconds between snapshot writes of one process
+    SHARE_INTERVAL = 1.0
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = {}
+        self.shared_dir = None
+        self._last_share = 0.0
+        self._file_pid = None
+        self._file_name = None
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Metric(self, name, help_text, 'counter', labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(Metric(self, name, help_text, 'gauge', labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Metric(self, name, help_text, 'histogram', labelnames, buckets))
+
+    def share_to(self, shared_dir, clear=False):
+        """Publish this process's metrics in shared_dir from now on; clear
+        drops the snapshots a previous server run left there"""
+        os.makedirs(shared_dir, exist_ok=True)
+        if clear:
+            for entry in os.scandir(shared_dir):
+                if entry.name.endswith(('.json', '.tmp')):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+        self.shared_dir = shared_dir
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                name: [[list(key), value if not isinstance(value, list) else list(value)]
+                       for key, value in metric.samples.items()]
+                for name, metric in self.metrics.items()
+            }
+
+    def share(self, force=False):
+        """Write this process's snapshot to shared_dir, at most every SHARE_INTERVAL"""
+        if self.shared_dir is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_share < self.SHARE_INTERVAL:
+            return
+        self._last_share = now
+        if self._file_pid != os.getpid():
+            # Named by pid and start time, so a reused pid never takes over
+            # the file of an exited process
+            self._file_pid = os.getpid()
+            self._file_name = f"{self._file_pid}-{time.time_ns()}.json"
+        try:
+            _write_json(os.path.join(self.shared_dir, self._file_name), self.snapshot())
+        except OSError as e:
+            print(f"⚠️  Could not share metrics: {e}")
+
+    def retire(self, pid):
+        """Fold the counters and histograms of an exited process into the
+        retired snapshot and delete its file; called by serve.py's master
+        after reaping a worker"""
+        if self.shared_dir is None:
+            return
+        retired_path = os.path.join(self.shared_dir, self.RETIRED_FILE)
+        retired = _read_json(retired_path) or {'files': [], 'samples': {}}
+        samples = _decode(retired['samples'])
+        folded = []
+        for entry in os.scandir(self.shared_dir):
+            if not (entry.name.startswith(f"{pid}-") and entry.name.endswith('.json')):
+                continue
+            snapshot = _read_json(entry.path)
+            if snapshot is not None:
+                self._add_samples(samples, snapshot, gauges=False)
+            folded.append(entry)
+        if not folded:
+            return
+        # Readers skip the listed files, which may still exist when they scan
+        files = [name for name in retired['files'] if os.path.exists(os.path.join(self.shared_dir, name))]
+        try:
+            _write_json(retired_path, {'files': files + [entry.name for entry in folded], 'samples': _encode(samples)})
+            for entry in folded:
+                os.remove(entry.path)
+        except OSError as e:
+            print(f"⚠️  Could not retire metrics of process {pid}: {e}")
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        merged = self._merged_samples()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            for key, value in sorted(merged.get(name, {}).items()):
+                labels = list(zip(metric.labelnames, key))
+                if metric.kind != 'histogram':
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + ('+Inf',), value[:-1]):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(labels + [('le', _format_value(bound))])} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(value[-1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def _merged_samples(self):
+        if self.shared_dir is None:
+            return {name: {tuple(key): value for key, value in samples} for name, samples in self.snapshot().items()}
+        self.share(force=True)
+        merged = {}
+        retired = _read_json(os.path.join(self.shared_dir, self.RETIRED_FILE))
+        if retired is not None:
+            self._add_samples(merged, retired['samples'], gauges=False)
+        folded = set(retired['files']) if retired is not None else set()
+        for entry in os.scandir(self.shared_dir):
+            if not entry.name.endswith('.json') or entry.name == self.RETIRED_FILE or entry.name in folded:
+                continue
+            snapshot = _read_json(entry.path)
+            if snapshot is not None:
+                self._add_samples(merged, snapshot, gauges=_process_alive(int(entry.name.split('-')[0])))
+        return merged
+
+    def _add_samples(self, target, snapshot, gauges):
+        """Add a snapshot's samples to target, {name: {key: value}}"""
+        for name, samples in snapshot.items():
+            metric = self.metrics.get(name)
+            if metric is None or (metric.kind == 'gauge' and not gauges):
+                continue
+            values = target.setdefault(name, {})
+            for key, value in samples:
+                key = tuple(key)
+                if isinstance(value, list):
+                    current = values.get(key) or [0] * len(value)
+                    values[key] = [a + b for a, b in zip(current, value)]
+                else:
+                    values[key] = values.get(key, 0) + value
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, data):
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(path + '.tmp', path)
+
+
+def _encode(samples):
+    """{name: {key: value}} in the snapshot format, {name: [[key, value]]}"""
+    return {name: [[list(key), value] for key, value in values.items()] for name, values in samples.items()}
+
+
+def _decode(snapshot):
+    return {name: {tuple(key): value for key, value in values} for name, values in snapshot.items()}
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    'legal_ai_stage_seconds', 'Time spent in each processing stage per document or request', ['stage'])
+REQUEST_SECONDS = registry.histogram(
+    'legal_ai_request_seconds', 'HTTP request latency', ['endpoint', 'method', 'status'])
+REQUESTS_IN_FLIGHT = registry.gauge(
+    'legal_ai_requests_in_flight', 'Requests currently being handled', ['endpoint'])
+DOCUMENTS = registry.counter(
+    'legal_ai_documents_total', 'Documents extracted and analyzed', ['format'])
+UPLOAD_BYTES = registry.counter(
+    'legal_ai_upload_bytes_total', 'Bytes of uploaded documents analyzed', ['format'])
+PAGES = registry.counter(
+    'legal_ai_pages_total', 'Pages extracted (DOCX and TXT count as one)', ['format'])
+EXTRACTED_CHARS = registry.counter(
+    'legal_ai_extracted_chars_total', 'Characters of text extracted', ['format'])
+SLOW_REQUEST_PROFILES = registry.counter(
+    'legal_ai_slow_request_profiles_total', 'Slow requests whose stack samples were saved', ['endpoint'])
+
+_request = threading.local()
+
+
+def start_request():
+    """Begin collecting stage timings for the current thread's request"""
+    _request.timings = {}
+
+
+def finish_request():
+    """Stop collecting and return {stage: seconds} for the current request"""
+    timings = getattr(_request, 'timings', None) or {}
+    _request.timings = None
+    return timings
+
+
+def record_stage(stage, seconds):
+    """Observe a stage duration and add it to the current request's timings"""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = getattr(_request, 'timings', None)
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def timed_stage(stage):
+    """Decorator recording each call of a function as one stage observation"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class StageTimer:
+    """Accumulates time per stage over many short calls, e.g. one call per
+    page, and records each stage once per document"""
+
+    def __init__(self):
+        self.seconds = {}
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - started
+
+    def wrap(self, name, func):
+        """Return func with every call timed under the given stage"""
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    def iterate(self, name, iterable):
+        """Yield from iterable, timing only the work of producing each item"""
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - started
+                return
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - started
+            yield item
+
+    def record(self):
+        for name, seconds in self.seconds.items():
+            record_stage(name, seconds)
+        self.seconds = {}
+
+
+def server_timing_header(timings, total_seconds=None):
+    """Format stage timings as a Server-Timing header value"""
+    parts = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()]
+    if total_seconds is not None:
+        parts.append(f"total;dur={total_seconds * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class SlowRequestProfiler:
+    """Sampling profiler that keeps the stacks of slow requests only.
+
+    While enabled, one background thread samples the stack of every thread
+    that is inside a request every interval_seconds. When a request ends
+    faster than threshold_seconds its samples are dropped; otherwise they are
+    written to output_dir in the collapsed-stack format read by flamegraph.pl
+    and speedscope. Only the newest max_files profiles are kept.
+    """
+
+    def __init__(self, threshold_seconds, interval_seconds=0.005, output_dir='profiles', max_files=100):
+        self.threshold_seconds = threshold_seconds
+        self.interval_seconds = interval_seconds
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def begin(self):
+        """Start sampling the calling thread; returns a token for end()"""
+        thread_id = threading.get_ident()
+        samples = Counter()
+        with self._lock:
+            self._active[thread_id] = samples
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample, daemon=True)
+                self._thread.start()
+        return thread_id, samples, time.perf_counter()
+
+    def end(self, token, description):
+        """Stop sampling; save the profile if the request was slow and return its path"""
+        thread_id, samples, started = token
+        with self._lock:
+            self._active.pop(thread_id, None)
+        elapsed = time.perf_counter() - started
+        if elapsed < self.threshold_seconds or not samples:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        safe_description = ''.join(c if c.isalnum() else '_' for c in description).strip('_')
+        path = os.path.join(self.output_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{int(elapsed * 1000)}ms-{safe_description}.txt")
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        self._trim()
+        return path
+
+    def _sample(self):
+        while True:
+            time.sleep(self.interval_seconds)
+            with self._lock:
+                active = list(self._active.items())
+            if not active:
+                continue
+            frames = sys._current_frames()
+            for thread_id, samples in active:
+                frame = frames.get(thread_id)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                if stack:
+                    samples[';'.join(reversed(stack))] += 1
+
+    def _trim(self):
+        try:
+            entries = sorted(entry.path for entry in os.scandir(self.output_dir) if entry.name.endswith('.txt'))
+        except OSError:
+            return
+        for path in entries[:max(0, len(entries) - self.max_files)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
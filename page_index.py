@@ -0,0 +1,50 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class PageIndex:
+    """Compact page and line start offsets of a document.
+
+    Offsets are kept in typed arrays (8 bytes per entry) rather than lists of
+    dicts; a character offset is mapped to its page and line with two binary
+    searches.
+    """
+
+    def __init__(self):
+        self.page_starts = array('q')
+        self.page_numbers = array('q')
+        self.line_starts = array('q')
+
+    @classmethod
+    def from_text(cls, text, page=1):
+        index = cls()
+        index.add(0, text, page)
+        return index
+
+    def add(self, offset, text, page):
+        """Record a segment of text that starts at offset and belongs to page"""
+        if not self.page_numbers or self.page_numbers[-1] != page:
+            self.page_starts.append(offset)
+            self.page_numbers.append(page)
+            # A page always starts a new line, even if the previous page did
+            # not end with a newline
+            if not self.line_starts or self.line_starts[-1] != offset:
+                self.line_starts.append(offset)
+        elif not self.line_starts:
+            self.line_starts.append(offset)
+        position = text.find('\n')
+        while position != -1:
+            self.line_starts.append(offset + position + 1)
+            position = text.find('\n', position + 1)
+
+    def locate(self, offset):
+        """Return (page, line) of a character offset; lines are 1-based within the page"""
+        if not self.page_starts:
+            return 1, 1
+        page_slot = max(0, bisect_right(self.page_starts, offset) - 1)
+        line_slot = max(0, bisect_right(self.line_starts, offset) - 1)
+        first_line_slot = bisect_left(self.line_starts, self.page_starts[page_slot])
+        return self.page_numbers[page_slot], line_slot - first_line_slot + 1
+
+    def size_bytes(self):
+        return sum(len(values) * values.itemsize for values in (self.page_starts, self.page_numbers, self.line_starts))
@@ -0,0 +1,153 @@
+import heapq
+import math
+import re
+import sys
+import time
+from array import array
+from collections import Counter
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or that the
+this to was were will with shall any all such which who whom what when where
+how does do did under this these those than then there their they them
+""".split())
+
+
+def tokenize(text):
+    """Lower-case word tokens with stop words removed"""
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def chunk_spans(length, chunk_size, overlap):
+    """Yield (start, end) windows of chunk_size chars, each overlapping the last by overlap"""
+    step = max(1, chunk_size - overlap)
+    start = 0
+    while True:
+        end = min(start + chunk_size, length)
+        yield start, end
+        if end >= length:
+            break
+        start += step
+
+
+class ChunkIndex:
+    """BM25 inverted index over the overlapping chunks of one document.
+
+    BM25 weights are computed once at build time, so a query only sums the
+    precomputed weights of its terms' postings and picks the top k.
+    Chunk texts are not stored; callers slice them from the document text
+    using the recorded spans.
+    """
+
+    def __init__(self, spans, postings, build_seconds):
+        self.spans = spans
+        self.postings = postings
+        self.build_seconds = build_seconds
+        self.queries = 0
+        self.total_query_seconds = 0.0
+        self.last_query_seconds = 0.0
+
+    @classmethod
+    def build(cls, text, chunk_size, overlap):
+        builder = ChunkIndexBuilder(chunk_size, overlap)
+        builder.feed(text)
+        return builder.finish()
+
+    def search(self, query, k=3):
+        """Return the top-k (chunk_id, score) pairs for a query, best first"""
+        started = time.perf_counter()
+        scores = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            chunk_ids, weights = posting
+            for chunk_id, weight in zip(chunk_ids, weights):
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + weight
+        hits = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        self.last_query_seconds = time.perf_counter() - started
+        self.queries += 1
+        self.total_query_seconds += self.last_query_seconds
+        return hits
+
+    def size_bytes(self):
+        """Rough resident size of the spans and postings"""
+        size = sys.getsizeof(self.spans) + len(self.spans) * 64
+        for term, (chunk_ids, weights) in self.postings.items():
+            size += sys.getsizeof(term) + chunk_ids.buffer_info()[1] * chunk_ids.itemsize
+            size += weights.buffer_info()[1] * weights.itemsize + 64
+        return size
+
+    def stats(self):
+        return {
+            "chunks": len(self.spans),
+            "terms": len(self.postings),
+            "build_ms": round(self.build_seconds * 1000, 3),
+            "last_query_ms": round(self.last_query_seconds * 1000, 3),
+            "avg_query_ms": round(self.total_query_seconds / self.queries * 1000, 3) if self.queries else 0.0
+        }
+
+
+class ChunkIndexBuilder:
+    """Builds a ChunkIndex from text that arrives in pieces.
+
+    Produces the same windows as chunk_spans over the concatenated text: a
+    window is emitted as soon as text beyond its end has been seen, and the
+    final window is emitted by finish().
+    """
+
+    def __init__(self, chunk_size, overlap, k1=1.5, b=0.75):
+        self.chunk_size = chunk_size
+        self.step = max(1, chunk_size - overlap)
+        self.k1 = k1
+        self.b = b
+        self._buffer = ''
+        self._buffer_offset = 0
+        self._spans = []
+        self._lengths = []
+        self._term_counts = {}
+        self._build_seconds = 0.0
+
+    def feed(self, text):
+        started = time.perf_counter()
+        buffer = self._buffer + text
+        # Windows are cut at a cursor; the buffer is trimmed once per feed
+        position = 0
+        while len(buffer) - position > self.chunk_size:
+            self._add_chunk(buffer[position:position + self.chunk_size], self._buffer_offset + position)
+            position += self.step
+        self._buffer = buffer[position:]
+        self._buffer_offset += position
+        self._build_seconds += time.perf_counter() - started
+
+    def finish(self):
+        started = time.perf_counter()
+        if self._buffer or not self._spans:
+            self._add_chunk(self._buffer, self._buffer_offset)
+        self._buffer = ''
+
+        chunk_count = len(self._spans)
+        avg_length = (sum(self._lengths) / chunk_count) or 1.0
+        postings = {}
+        for term, counts in self._term_counts.items():
+            idf = math.log(1 + (chunk_count - len(counts) + 0.5) / (len(counts) + 0.5))
+            chunk_ids = array('I')
+            weights = array('f')
+            for chunk_id, tf in counts:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[chunk_id] / avg_length)
+                chunk_ids.append(chunk_id)
+                weights.append(idf * tf * (self.k1 + 1) / (tf + norm))
+            postings[term] = (chunk_ids, weights)
+        self._term_counts = {}
+        self._build_seconds += time.perf_counter() - started
+        return ChunkIndex(self._spans, postings, self._build_seconds)
+
+    def _add_chunk(self, text, start):
+        chunk_id = len(self._spans)
+        self._spans.append((start, start + len(text)))
+        tokens = tokenize(text)
+        self._lengths.append(len(tokens))
+        for term, tf in Counter(tokens).items():
+            self._term_counts.setdefault(term, []).append((chunk_id, tf))
@@ -0,0 +1,110 @@
+import difflib
+import hashlib
+import json
+
+
+def section_hash(section):
+    """Short content hash identifying a section across document versions.
+
+    The section number is left out so renumbered sections still match; the
+    heading context is included because it decides the clause type.
+    """
+    text = section.text
+    if section.number is not None and text.startswith(section.number):
+        text = text[len(section.number):]
+    key = f"{section.context or ''}\x00{text}"
+    return hashlib.blake2b(key.encode('utf-8', 'surrogatepass'), digest_size=8).hexdigest()
+
+
+def clause_types_fingerprint(registry):
+    """Hash of the registered clause types; stored clause results are only
+    reused by an analysis that looks for the same clause types"""
+    types = sorted((clause_type['type'], clause_type['risk'], clause_type['keywords']) for clause_type in registry)
+    return hashlib.sha1(json.dumps(types).encode('utf-8')).hexdigest()[:16]
+
+
+class SectionMap:
+    """Content hashes of a document's sections and the clause type of each.
+
+    A section that reappears anywhere in a later version of the document
+    reuses its clause type without being classified again. Stored as plain
+    JSON.
+    """
+
+    def __init__(self, fingerprint, sections=None):
+        self.fingerprint = fingerprint
+        # [hash, start, length, clause type name or None] per section, in document order
+        self.sections = sections if sections is not None else []
+        self._by_hash = None
+
+    def add(self, digest, start, length, clause_type):
+        self.sections.append([digest, start, length, clause_type])
+        if self._by_hash is not None:
+            self._by_hash.setdefault(digest, clause_type)
+
+    def lookup(self, digest):
+        """Return (found, clause type name) for a section with this hash"""
+        if self._by_hash is None:
+            self._by_hash = {}
+            for entry in self.sections:
+                self._by_hash.setdefault(entry[0], entry[3])
+        if digest in self._by_hash:
+            return True, self._by_hash[digest]
+        return False, None
+
+    def hashes(self):
+        return [entry[0] for entry in self.sections]
+
+    def clause_groups(self, clauses):
+        """Split a document's clause list, which is in document order, into
+        one list per section"""
+        groups = []
+        position = 0
+        for entry in self.sections:
+            count = 1 if entry[3] is not None else 0
+            groups.append(clauses[position:position + count])
+            position += count
+        return groups
+
+    def to_dict(self):
+        return {'fingerprint': self.fingerprint, 'sections': self.sections}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['fingerprint'], [list(entry) for entry in data['sections']])
+
+
+def diff_clauses(old_map, old_clauses, new_map, new_clauses):
+    """Clause-level differences between two versions of a document.
+
+    Sections are aligned by content hash. Clauses of unchanged sections are
+    unchanged; within a run of edited sections, clauses of the same type
+    are paired in order and reported as changed when their content
+    differs. Unpaired clauses are added or removed.
+    """
+    old_groups = old_map.clause_groups(old_clauses)
+    new_groups = new_map.clause_groups(new_clauses)
+    diff = {'added': [], 'removed': [], 'changed': [], 'unchanged': 0}
+    matcher = difflib.SequenceMatcher(None, old_map.hashes(), new_map.hashes(), autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        before = [clause for group in old_groups[old_start:old_end] for clause in group]
+        after = [clause for group in new_groups[new_start:new_end] for clause in group]
+        if tag == 'equal':
+            diff['unchanged'] += len(after)
+            continue
+        pending = {}
+        for clause in before:
+            pending.setdefault(clause['type'], []).append(clause)
+        for clause in after:
+            candidates = pending.get(clause['type'])
+            if not candidates:
+                diff['added'].append(clause)
+                continue
+            previous = candidates.pop(0)
+            if previous['content'] == clause['content']:
+                diff['unchanged'] += 1
+            else:
+                diff['changed'].append({'type': clause['type'], 'before': previous, 'after': clause})
+        for candidates in pending.values():
+            diff['removed'].extend(candidates)
+    return diff
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Production server for the Legal AI Assistant
+Loads the app and warms the document processor once in a master process,
+then forks worker processes that share the listening socket and, through
+copy-on-write, the loaded model and compiled patterns.
+
+Signals to the master:
+  SIGHUP           replace every worker with a fresh one (rolling restart)
+  SIGTERM, SIGINT  stop accepting connections, finish in-flight requests, exit
+  SIGTTIN, SIGTTOU add or remove one worker
+
+Code changes need a full restart: workers are forked from the preloaded master.
+
+Usage: python serve.py --workers 4 --port 5000
+"""
+
+import argparse
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+
+from werkzeug.serving import make_server
+from werkzeug.wsgi import ClosingIterator
+
+import metrics
+from settings import get_setting
+
+
+# Signals the master handles; blocked around fork() so a worker signalled
+# before it installs its own handlers gets them once it is ready
+MASTER_SIGNALS = (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGTTIN, signal.SIGTTOU)
+
+
+class RequestBudget:
+    """WSGI middleware counting requests and shutting the worker down after
+    max_requests, so slow memory growth is bounded by recycling"""
+
+    def __init__(self, app, max_requests, on_exhausted):
+        self.app = app
+        self.max_requests = max_requests
+        self.on_exhausted = on_exhausted
+        self.handled = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        with self._lock:
+            self.handled += 1
+            self.in_flight += 1
+            exhausted = self.max_requests and self.handled == self.max_requests
+        if exhausted:
+            self.on_exhausted()
+        try:
+            response = self.app(environ, start_response)
+        except BaseException:
+            self._finish()
+            raise
+        # The server closes the response once the body is sent; closing the
+        # app's iterable runs its close hooks (e.g. streamed /chat metrics)
+        return ClosingIterator(response, self._finish)
+
+    def _finish(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+def run_worker(listener, host, port, max_requests, graceful_timeout):
+    """Body of a forked worker: serve requests on the inherited socket until told to stop"""
+    import app as app_module
+
+    stopping = threading.Event()
+    server = None
+
+    def stop(*_):
+        if not stopping.is_set():
+            stopping.set()
+            if server is not None:
+                threading.Thread(target=server.shutdown, daemon=True).start()
+
+    for signum in (signal.SIGHUP, signal.SIGTTIN, signal.SIGTTOU):
+        signal.signal(signum, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The master handles Ctrl+C
+    signal.signal(signal.SIGTERM, stop)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, MASTER_SIGNALS)
+
+    # Threads do not survive fork: start the per-process parts now
+    app_module.document_processor.initialize_llm()
+
+    if max_requests:
+        # Jitter so workers started together are not all recycled at once
+        max_requests += random.randint(0, max_requests // 10)
+    budget = RequestBudget(app_module.app, max_requests, stop)
+    server = make_server(host, port, budget, threaded=True, fd=listener.fileno())
+    if not stopping.is_set():  # Retired while starting up
+        server.serve_forever()
+
+    # Let in-flight requests and this worker's async jobs finish
+    deadline = time.monotonic() + graceful_timeout
+    while (budget.in_flight or app_module.job_manager.active()) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    app_module.job_manager.shutdown()
+    os._exit(0)
+
+
+class Master:
+    """Forks and supervises the worker processes"""
+
+    def __init__(self, listener, host, port, workers, max_requests, graceful_timeout):
+        self.listener = listener
+        self.host = host
+        self.port = port
+        self.worker_count = workers
+        self.max_requests = max_requests
+        self.graceful_timeout = graceful_timeout
+        self.workers = set()
+        self.retiring = set()
+        self.stopping = False
+        self._signals = []
+
+    def run(self):
+        for signum in MASTER_SIGNALS:
+            signal.signal(signum, lambda signum, frame: self._signals.append(signum))
+        self._spawn_missing()
+        print(f"✅ Serving on http://{self.host}:{self.port} with {self.worker_count} workers (master pid {os.getpid()})")
+
+        while self.workers or self.retiring:
+            while self._signals:
+                self._handle(self._signals.pop(0))
+            self._reap()
+            if not self.stopping:
+                self._spawn_missing()
+            time.sleep(0.2)
+        print("✅ All workers stopped")
+
+    def _handle(self, signum):
+        if signum in (signal.SIGTERM, signal.SIGINT):
+            if not self.stopping:
+                print("\n🛑 Stopping workers...")
+            self.stopping = True
+            self._retire(self.workers)
+        elif signum == signal.SIGHUP:
+            print("🔄 Replacing workers...")
+            old = set(self.workers)
+            self.workers.clear()
+            self._spawn_missing()
+            self._retire(old)
+        elif signum == signal.SIGTTIN:
+            self.worker_count += 1
+        elif signum == signal.SIGTTOU and self.worker_count > 1:
+            self.worker_count -= 1
+            self._retire({next(iter(self.workers))})
+
+    def _spawn_missing(self):
+        while len(self.workers) < self.worker_count:
+            signal.pthread_sigmask(signal.SIG_BLOCK, MASTER_SIGNALS)
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    run_worker(self.listener, self.host, self.port, self.max_requests, self.graceful_timeout)
+                finally:
+                    os._exit(1)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, MASTER_SIGNALS)
+            self.workers.add(pid)
+
+    def _retire(self, pids):
+        for pid in list(pids):
+            self.workers.discard(pid)
+            self.retiring.add(pid)
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                self.retiring.discard(pid)
+
+    def _reap(self):
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if pid in self.workers:
+                self.workers.discard(pid)
+                code = os.waitstatus_to_exitcode(status)
+                if code == 0:
+                    print(f"♻️  Worker {pid} recycled after its request budget")
+                else:
+                    print(f"⚠️  Worker {pid} exited with status {code}, restarting")
+            self.retiring.discard(pid)
+            metrics.registry.retire(pid)
+
+
+def main():
+    """Main serving function"""
+    parser = argparse.ArgumentParser(description="Serve the Legal AI Assistant API with preforked workers")
+    parser.add_argument('--host', default=get_setting('SERVER_HOST', '127.0.0.1'))
+    parser.add_argument('--port', type=int, default=get_setting('SERVER_PORT', 5000))
+    parser.add_argument('--workers', '-w', type=int, default=get_setting('SERVER_WORKERS', os.cpu_count() or 1))
+    parser.add_argument('--max-requests', type=int, default=get_setting('SERVER_MAX_REQUESTS', 1000),
+                        help="Recycle a worker after this many requests (0 disables recycling)")
+    parser.add_argument('--graceful-timeout', type=float, default=get_setting('SERVER_GRACEFUL_TIMEOUT', 30),
+                        help="Seconds a stopping worker waits for in-flight requests")
+    args = parser.parse_args()
+
+    if not hasattr(os, 'fork'):
+        print("❌ serve.py needs a Unix system with fork(); use python app.py instead")
+        sys.exit(1)
+
+    listener = socket.create_server((args.host, args.port), backlog=2048)
+    listener.set_inheritable(True)
+
+    print("Loading the app and warming the AI processor...")
+    import app as app_module
+    app_module.configure_for_workers()
+    app_module.document_processor.warm_up()
+    print("AI processor warm")
+
+    Master(listener, args.host, args.port, args.workers, args.max_requests, args.graceful_timeout).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import mmap
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+# Spilled texts are stored as UTF-32 so character offsets map directly to
+# byte offsets and any slice can be decoded without reading the whole file.
+SPILL_ENCODING = 'utf-32-le'
+SPILL_CHAR_BYTES = 4
+
+
+class DocumentSession:
+    """Extracted text and derived structures of one uploaded document.
+
+    Small texts live in memory; large ones are spilled to a file and read
+    through a memory map, so only the pages actually touched are resident.
+    Derived structures (indexes, term vectors...) are attached with an
+    estimated size so the store can account for them.
+    """
+
+    def __init__(self, doc_id, filename=None, text=None, spill_path=None):
+        self.doc_id = doc_id
+        self.filename = filename
+        self._text = text
+        self._spill_path = spill_path
+        self._mmap = None
+        self._data = {}
+        self._data_bytes = {}
+        if spill_path is not None:
+            with open(spill_path, 'rb') as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.length = len(self._mmap) // SPILL_CHAR_BYTES
+        else:
+            self.length = len(text)
+
+    @property
+    def spilled(self):
+        return self._mmap is not None
+
+    @property
+    def text(self):
+        """The full document text"""
+        if self._text is not None:
+            return self._text
+        return self.slice(0, self.length)
+
+    def slice(self, start, end):
+        """Return text[start:end] without materialising the whole document"""
+        if self._text is not None:
+            return self._text[start:end]
+        start = max(0, min(start, self.length))
+        end = max(start, min(end, self.length))
+        return self._mmap[start * SPILL_CHAR_BYTES:end * SPILL_CHAR_BYTES].decode(SPILL_ENCODING)
+
+    def attach(self, name, value, size_bytes):
+        """Store a derived structure alongside the text"""
+        self._data[name] = value
+        self._data_bytes[name] = size_bytes
+
+    def get(self, name, default=None):
+        return self._data.get(name, default)
+
+    def memory_bytes(self):
+        """Estimated resident size: in-memory text plus attached structures"""
+        text_bytes = sys.getsizeof(self._text) if self._text is not None else 0
+        return text_bytes + sum(self._data_bytes.values())
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class SessionWriter:
+    """Accumulates streamed text for a new session.
+
+    Text stays in memory until it passes the store's spill threshold; after
+    that every piece is appended straight to the spill file.
+    """
+
+    def __init__(self, store, doc_id, filename):
+        self.store = store
+        self.doc_id = doc_id
+        self.filename = filename
+        self._parts = []
+        self._length = 0
+        self._file = None
+        self._tmp_path = None
+
+    def write(self, text):
+        self._length += len(text)
+        if self._file is not None:
+            self._file.write(text.encode(SPILL_ENCODING))
+            return
+        self._parts.append(text)
+        if self._length * SPILL_CHAR_BYTES > self.store.spill_threshold_bytes:
+            self._tmp_path = f"{self.store.spill_path(self.doc_id)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            self._file = open(self._tmp_path, 'wb')
+            self._file.write(''.join(self._parts).encode(SPILL_ENCODING))
+            self._parts = []
+
+    def close(self):
+        """Finish writing and register the session with the store"""
+        if self._file is None:
+            session = DocumentSession(self.doc_id, self.filename, text=''.join(self._parts))
+        else:
+            self._file.close()
+            path = self.store.spill_path(self.doc_id)
+            os.replace(self._tmp_path, path)
+            session = DocumentSession(self.doc_id, self.filename, spill_path=path)
+        self.store.add(session)
+        return session
+
+
+class SessionStore:
+    """Memory-bounded LRU store of document sessions keyed by doc_id.
+
+    When the estimated resident size passes max_memory_bytes the least
+    recently used sessions are dropped. Spill files outlive their session,
+    so a spilled document can be reopened by doc_id after eviction; the
+    spill directory itself is trimmed oldest-first to max_spill_bytes.
+    """
+
+    def __init__(self, spill_dir, max_memory_bytes=256 * 1024 * 1024,
+                 spill_threshold_bytes=512 * 1024, max_spill_bytes=2 * 1024 * 1024 * 1024):
+        self.spill_dir = spill_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.spill_threshold_bytes = spill_threshold_bytes
+        self.max_spill_bytes = max_spill_bytes
+        self.evictions = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(spill_dir, exist_ok=True)
+
+    def spill_path(self, doc_id):
+        return os.path.join(self.spill_dir, f"{doc_id}.u32")
+
+    def writer(self, doc_id, filename=None):
+        """Start a session whose text will be streamed in with write()"""
+        return SessionWriter(self, doc_id, filename)
+
+    def create(self, doc_id, filename, text):
+        """Create a session from a complete text"""
+        writer = self.writer(doc_id, filename)
+        writer.write(text)
+        return writer.close()
+
+    def add(self, session):
+        with self._lock:
+            # Replaced or evicted sessions are not closed explicitly: a request
+            # may still hold one, and its memory map is released with it.
+            self._sessions.pop(session.doc_id, None)
+            self._sessions[session.doc_id] = session
+            self._evict()
+        if session.spilled:
+            self._trim_spill_dir()
+
+    def get(self, doc_id):
+        """Return the session for doc_id, reopening a spilled one if needed"""
+        with self._lock:
+            session = self._sessions.get(doc_id)
+            if session is not None:
+                self._sessions.move_to_end(doc_id)
+                return session
+        path = self.spill_path(doc_id)
+        if os.path.basename(doc_id) != doc_id or not os.path.exists(path):
+            return None
+        session = DocumentSession(doc_id, spill_path=path)
+        self.add(session)
+        return session
+
+    def __contains__(self, doc_id):
+        with self._lock:
+            return doc_id in self._sessions
+
+    def touch(self, doc_id):
+        """Re-account a session after structures were attached to it"""
+        with self._lock:
+            if doc_id in self._sessions:
+                self._sessions.move_to_end(doc_id)
+                self._evict()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "spilled": sum(1 for s in self._sessions.values() if s.spilled),
+                "memory_bytes": sum(s.memory_bytes() for s in self._sessions.values()),
+                "evictions": self.evictions
+            }
+
+    def _evict(self):
+        total = sum(s.memory_bytes() for s in self._sessions.values())
+        # Always keep the most recent session, even if it alone is over budget
+        while total > self.max_memory_bytes and len(self._sessions) > 1:
+            _, session = self._sessions.popitem(last=False)
+            total -= session.memory_bytes()
+            self.evictions += 1
+
+    def _trim_spill_dir(self):
+        entries = []
+        for entry in os.scandir(self.spill_dir):
+            if entry.name.endswith('.u32'):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        total = sum(size for _, _, size in entries)
+        for _, path, size in sorted(entries):
+            if total <= self.max_spill_bytes:
+                break
+            doc_id = os.path.basename(path)[:-len('.u32')]
+            if doc_id in self:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
@@ -0,0 +1,15 @@
+"""
+Runtime settings for the Legal AI Assistant.
+Values come from the optional config.py written by setup.py; anything not
+defined there falls back to the default given by the caller.
+"""
+
+try:
+    import config
+except ImportError:
+    config = None
+
+
+def get_setting(name, default):
+    """Return a setting from config.py, or the default when it is not set"""
+    return getattr(config, name, default)
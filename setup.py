@@ -93,15 +93,95 @@ def create_config():
 
 # Path to your local LLM model (optional)
 # MODEL_PATH = "models/llama-2-7b-chat.gguf"
+# Set to "mock" to always use the deterministic stand-in model
+# LLM_BACKEND = "mock"
+LLM_QUEUE_GROUP = 8  # Queued /chat requests ordered by document prefix, then run one at a time
+LLM_MAX_TOKENS = 256
+
+# Uploads are processed in memory; larger files are spooled to a temp file
+UPLOAD_SPOOL_MB = 16
+# Keep a content-addressed copy of each upload in UPLOAD_FOLDER
+PERSIST_UPLOADS = False
+UPLOAD_FOLDER = "uploads"
+UPLOAD_MAX_MB = 1024
+UPLOAD_RETENTION_DAYS = 30
 
 # Processing settings
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 
+# Analysis cache for repeat uploads
+CACHE_DIR = "analysis_cache"
+CACHE_MEMORY_ENTRIES = 64
+CACHE_MAX_DISK_MB = 256
+
+# Section hashes kept for incremental analysis of revised documents
+SECTION_CACHE_DIR = "section_cache"
+SECTION_CACHE_MAX_DISK_MB = 128
+
+# Paged clause results served by GET /analysis/<doc_id>
+ANALYSIS_PAGE_LIMIT = 100
+ANALYSIS_PAGE_MAX_LIMIT = 1000
+ANALYSIS_PAGE_CACHE_ENTRIES = 128  # Serialized, compressed pages kept in memory
+
+# Server-side document sessions used by /chat
+SESSION_DIR = "sessions"
+SESSION_MEMORY_MB = 256
+SESSION_SPILL_KB = 512
+
+# Number of BM25-ranked chunks used as /chat context
+CHAT_TOP_K = 3
+
+# Cache of answers to repeated /chat questions
+ANSWER_CACHE_ENTRIES = 1024
+ANSWER_CACHE_TTL_SECONDS = 3600
+
+# Corpus statistics served by the /analytics endpoints
+ANALYTICS_DB = "analytics.db"
+ANALYTICS_OWN_PARTIES = []  # Our own company names, never counted as counterparties
+ANALYTICS_MAX_LIMIT = 1000
+
+# Corpus-wide vector index used by /search
+VECTOR_INDEX_DIR = "vector_index"
+EMBEDDING_MODEL = None  # e.g. "all-MiniLM-L6-v2" with sentence-transformers installed
+EMBEDDING_DIM = 512  # Size of the offline hashed embeddings
+SEARCH_MAX_K = 100
+
+# Admission control of uploads analyzed in request threads, per server process
+ADMISSION_CAPACITY_PAGES = 400  # Estimated pages extracted and analyzed at once
+ADMISSION_MAX_QUEUE = 16  # Uploads waiting for capacity before new ones get 429
+ADMISSION_MAX_WAIT_SECONDS = 30
+
+# Async uploads (POST /upload?async=1): "local" process pool or "thread" pool
+JOB_BACKEND = "local"
+# JOB_WORKERS = 4
+# Job records shared by serve.py workers
+JOB_STATE_DIR = "jobs"
+
+# Save stack samples of requests slower than this (None disables profiling)
+PROFILE_SLOW_REQUESTS_MS = None
+PROFILE_INTERVAL_MS = 5
+PROFILE_DIR = "profiles"
+# Metrics shared by serve.py workers for /metrics
+METRICS_DIR = "metrics"
+
+# Production server (python serve.py)
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 5000
+# SERVER_WORKERS = 4  # Defaults to the CPU count
+SERVER_MAX_REQUESTS = 1000  # Recycle a worker after this many requests
+SERVER_GRACEFUL_TIMEOUT = 30
+
+# PDFs with at least this many pages are extracted on a process pool
+PARALLEL_PAGE_THRESHOLD = 200
+# PARALLEL_WORKERS = 4
+
 # Risk assessment thresholds
 HIGH_RISK_KEYWORDS = ["liability", "indemnification", "damages", "breach"]
 MEDIUM_RISK_KEYWORDS = ["termination", "confidentiality", "non-compete"]
 LOW_RISK_KEYWORDS = ["payment", "governing law", "jurisdiction"]
+# Risk keywords are also the vocabulary of the summary term counter
+TERM_VECTOR_CACHE_ENTRIES = 128
 """
     
     config_path = Path("config.py")
@@ -73,9 +73,11 @@ def start_backend():
     """Start the backend server"""
     print("\n🚀 Starting backend server...")
     try:
-        # Change to backend directory and start Flask app
+        # Multi-worker production server where fork() is available,
+        # otherwise the Flask development server
+        server_script = "serve.py" if hasattr(os, "fork") else "app.py"
         backend_process = subprocess.Popen(
-            [sys.executable, "app.py"],
+            [sys.executable, server_script],
             cwd="backend",
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE
@@ -0,0 +1,145 @@
+import re
+import string
+from collections import Counter
+
+from settings import get_setting
+
+# Terms reported in the document summary
+KEY_TERMS = ['payment', 'termination', 'liability', 'confidentiality', 'breach', 'damages']
+# Signals used to guess the document type
+DOC_TYPE_TERMS = ['agreement', 'contract', 'employment', 'lease']
+
+# Inflections counted as the same term ("payments", "party's")
+TERM_SUFFIXES = ['', 's', 'es', "'s"]
+
+TOKEN_STRIP_CHARS = string.punctuation + '“”‘’«»'
+
+
+def default_vocabulary():
+    """Vocabulary built from the summary terms and the config.py risk keyword lists"""
+    return TermVocabulary({
+        'key': KEY_TERMS,
+        'doc_type': DOC_TYPE_TERMS,
+        'high_risk': get_setting('HIGH_RISK_KEYWORDS', ["liability", "indemnification", "damages", "breach"]),
+        'medium_risk': get_setting('MEDIUM_RISK_KEYWORDS', ["termination", "confidentiality", "non-compete"]),
+        'low_risk': get_setting('LOW_RISK_KEYWORDS', ["payment", "governing law", "jurisdiction"])
+    })
+
+
+class TermVocabulary:
+    """Named groups of terms to count; a term is a single word or a two-word phrase"""
+
+    def __init__(self, groups):
+        self.groups = {name: [' '.join(term.lower().split()) for term in terms] for name, terms in groups.items()}
+        self.terms = sorted({term for terms in self.groups.values() for term in terms})
+        # Surface form (after stripping punctuation) -> canonical term
+        self.word_forms = {}
+        # (term, pattern) for phrases; patterns start with a literal so the
+        # regex engine can skip ahead with a fast substring search
+        self.phrase_patterns = []
+        suffixes = '|'.join(re.escape(suffix) for suffix in TERM_SUFFIXES if suffix)
+        for term in self.terms:
+            words = term.split()
+            if len(words) == 1:
+                for suffix in TERM_SUFFIXES:
+                    self.word_forms.setdefault(term + suffix, term)
+            else:
+                pattern = r'\s+'.join(re.escape(word) for word in words) + rf'(?:{suffixes})?\b'
+                self.phrase_patterns.append((term, re.compile(pattern)))
+
+
+class TermVector:
+    """Word count and term frequencies of one document"""
+
+    def __init__(self, vocabulary, word_count, counts):
+        self.vocabulary = vocabulary
+        self.word_count = word_count
+        self.counts = counts
+
+    def count(self, term):
+        return self.counts.get(term, 0)
+
+    def contains(self, term):
+        return self.counts.get(term, 0) > 0
+
+    def group_counts(self, group):
+        return {term: self.counts.get(term, 0) for term in self.vocabulary.groups[group]}
+
+    def group_total(self, group):
+        return sum(self.group_counts(group).values())
+
+    def to_dict(self):
+        return {
+            'word_count': self.word_count,
+            'counts': dict(self.counts),
+            'risk_terms': {
+                'high': self.group_total('high_risk'),
+                'medium': self.group_total('medium_risk'),
+                'low': self.group_total('low_risk')
+            }
+        }
+
+
+class TermCounter:
+    """Single-pass tokenizer and term counter.
+
+    Each piece of text is lower-cased and split once and token frequencies
+    are accumulated in a Counter. Vocabulary words are resolved against the
+    distinct tokens only at the end, so matching cost does not grow with
+    document length or vocabulary size. Phrases, usually only a handful,
+    are counted with one literal-prefixed search each. The trailing partial
+    word of a piece is carried into the next.
+    """
+
+    def __init__(self, vocabulary):
+        self.vocabulary = vocabulary
+        self.word_count = 0
+        self._tokens = Counter()
+        self._phrase_counts = Counter()
+        self._last_token = None
+        self._carry = ''
+
+    def feed(self, text):
+        text = self._carry + text
+        cut = len(text)
+        while cut > 0 and not text[cut - 1].isspace():
+            cut -= 1
+        self._count(text[:cut])
+        self._carry = text[cut:]
+
+    def finish(self):
+        """Count any carried text and return the document's TermVector"""
+        self._count(self._carry)
+        self._carry = ''
+
+        counts = dict.fromkeys(self.vocabulary.terms, 0)
+        word_forms = self.vocabulary.word_forms
+        for token, frequency in self._tokens.items():
+            term = word_forms.get(token.strip(TOKEN_STRIP_CHARS))
+            if term is not None:
+                counts[term] += frequency
+        for term, frequency in self._phrase_counts.items():
+            counts[term] += frequency
+        return TermVector(self.vocabulary, self.word_count, counts)
+
+    def _count(self, text):
+        lowered = text.lower()
+        tokens = lowered.split()
+        if not tokens:
+            return
+        self.word_count += len(tokens)
+        self._tokens.update(tokens)
+        if self.vocabulary.phrase_patterns:
+            # Prefix the previous piece's last word so phrases split across pieces are found
+            prefix_length = 0
+            if self._last_token is not None:
+                lowered = self._last_token + ' ' + lowered
+                prefix_length = len(self._last_token) + 1
+            for term, pattern in self.vocabulary.phrase_patterns:
+                for match in pattern.finditer(lowered):
+                    start = match.start()
+                    if start > 0 and lowered[start - 1].isalnum():
+                        continue
+                    if match.end() > prefix_length:
+                        self._phrase_counts[term] += 1
+        self._last_token = tokens[-1]
@@ -0,0 +1,21 @@
+import os
+import sys
+
+# The modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(scope='session')
+def app_module(tmp_path_factory):
+    """The Flask app, with its caches, sessions and databases in a scratch
+    directory; app.py creates them relative to the working directory"""
+    previous = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('app'))
+    try:
+        import app
+        yield app
+        app.job_manager.shutdown()
+    finally:
+        os.chdir(previous)
@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected, estimate_cost
+from benchmarks.synthetic import write_docx, write_txt
+from docx_reader import docx_page_count
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_estimate_cost():
+    assert estimate_cost(100, 5) == 5.0
+    assert estimate_cost(100) == 1.0
+    assert estimate_cost(30000) == 10.0
+    # Large files weigh by size when they have few pages
+    assert estimate_cost(10 * 1024 * 1024, 2) == 40.0
+
+
+def test_admits_within_capacity():
+    controller = AdmissionController(capacity=10, max_queue=0)
+    first = controller.acquire(6)
+    second = controller.acquire(4)
+    with pytest.raises(AdmissionRejected) as rejected:
+        controller.acquire(1)
+    assert rejected.value.retry_after >= 1
+    controller.release(first)
+    controller.release(second)
+    # A job larger than the capacity runs alone
+    controller.release(controller.acquire(50))
+    assert controller.stats()['admitted'] == 3
+    assert controller.stats()['rejected'] == 1
+    assert controller.stats()['in_use'] == 0
+
+
+def test_rejects_beyond_queue():
+    controller = AdmissionController(capacity=1, max_queue=1, max_wait_seconds=5)
+    ticket = controller.acquire(1)
+    waiter = threading.Thread(target=lambda: controller.release(controller.acquire(1)))
+    waiter.start()
+    wait_until(lambda: controller.stats()['queued'] == 1)
+    with pytest.raises(AdmissionRejected):
+        controller.acquire(1)
+    controller.release(ticket)
+    waiter.join(5)
+    assert controller.stats()['admitted'] == 2
+
+
+def test_times_out():
+    controller = AdmissionController(capacity=1, max_queue=4, max_wait_seconds=0.05)
+    ticket = controller.acquire(1)
+    with pytest.raises(AdmissionRejected):
+        controller.acquire(1)
+    assert controller.stats()['timed_out'] == 1
+    assert controller.stats()['queued'] == 0
+    controller.release(ticket)
+
+
+def test_admits_in_arrival_order():
+    controller = AdmissionController(capacity=10, max_queue=8, max_wait_seconds=5)
+    ticket = controller.acquire(8)
+    admitted = []
+
+    def job(name, cost):
+        held = controller.acquire(cost)
+        admitted.append(name)
+        controller.release(held)
+
+    # The small job would fit now but must not overtake the large one
+    large = threading.Thread(target=job, args=('large', 10))
+    large.start()
+    wait_until(lambda: controller.stats()['queued'] == 1)
+    small = threading.Thread(target=job, args=('small', 1))
+    small.start()
+    wait_until(lambda: controller.stats()['queued'] == 2)
+    assert admitted == []
+    controller.release(ticket)
+    large.join(5)
+    small.join(5)
+    assert admitted == ['large', 'small']
+
+
+def test_docx_page_count(tmp_path):
+    path = str(tmp_path / "contract.docx")
+    write_docx(path, 40)
+    # python-docx leaves the template's stale Pages of 1 in docProps/app.xml,
+    # so the count comes from the size of document.xml
+    assert 20 <= docx_page_count(path) <= 80
+
+
+def test_upload_answers_429_at_capacity(app_module, tmp_path, monkeypatch):
+    controller = AdmissionController(capacity=1, max_queue=0)
+    monkeypatch.setattr(app_module, 'admission', controller)
+    ticket = controller.acquire(1)
+    path = str(tmp_path / "busy.txt")
+    write_txt(path, 3, seed=7)
+    client = app_module.app.test_client()
+    try:
+        with open(path, 'rb') as f:
+            response = client.post('/upload', data={'file': (f, "busy.txt")})
+    finally:
+        controller.release(ticket)
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) >= 1
+    assert response.get_json()['retry_after'] == int(response.headers['Retry-After'])
+    assert controller.stats()['in_use'] == 0
+
+    with open(path, 'rb') as f:
+        assert client.post('/upload', data={'file': (f, "busy.txt")}).status_code == 200
+    assert controller.stats()['admitted'] == 2
@@ -0,0 +1,82 @@
+import hashlib
+import io
+import os
+
+from benchmarks.synthetic import contract_text
+from cache import AnalysisCache, LRUCache
+
+
+def content_hash(name):
+    return hashlib.sha256(name.encode()).hexdigest()
+
+
+def test_lru_cache_drops_the_least_recently_used():
+    cache = LRUCache(2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)
+    assert 'b' not in cache
+    assert cache.get('b', 'missing') == 'missing'
+    assert cache.pop('a') == 1
+    assert len(cache) == 1
+
+
+def test_memory_then_disk_tier(tmp_path):
+    doc = content_hash('doc')
+    cache = AnalysisCache(str(tmp_path), 'v1', memory_entries=1)
+    assert cache.get(doc) is None
+    cache.put(doc, {"clauses": [1, 2]})
+    assert cache.get(doc) == {"clauses": [1, 2]}
+
+    # A new process finds the entry on disk, then keeps it in memory
+    reopened = AnalysisCache(str(tmp_path), 'v1')
+    assert reopened.get(doc) == {"clauses": [1, 2]}
+    assert reopened.get(doc) == {"clauses": [1, 2]}
+    assert reopened.stats()['disk_hits'] == 1
+    assert reopened.stats()['memory_hits'] == 1
+    assert reopened.stats()['disk_bytes'] == os.path.getsize(tmp_path / f"{doc}-v1.json")
+    assert cache.stats()['hit_ratio'] == 0.5
+
+
+def test_new_analyzer_version_misses(tmp_path):
+    doc = content_hash('doc')
+    AnalysisCache(str(tmp_path), 'v1').put(doc, {"version": 1})
+    cache = AnalysisCache(str(tmp_path), 'v2')
+    assert cache.get(doc) is None
+    cache.put(doc, {"version": 2})
+    assert AnalysisCache(str(tmp_path), 'v1').get(doc) == {"version": 1}
+
+
+def test_corrupt_file_is_a_miss(tmp_path):
+    doc = content_hash('doc')
+    (tmp_path / f"{doc}-v1.json").write_text('{"trunc')
+    cache = AnalysisCache(str(tmp_path), 'v1')
+    assert cache.get(doc) is None
+    assert cache.stats()['misses'] == 1
+
+
+def test_disk_tier_evicts_oldest_files(tmp_path):
+    cache = AnalysisCache(str(tmp_path), 'v1', memory_entries=1, max_disk_bytes=3000)
+    docs = [content_hash(str(number)) for number in range(5)]
+    for number, doc in enumerate(docs):
+        cache.put(doc, {"text": "x" * 900})
+        os.utime(tmp_path / f"{doc}-v1.json", (number, number))
+    # The fourth put went over budget and trimmed to 90% of it
+    assert cache.stats()['disk_bytes'] <= 3000
+    remaining = AnalysisCache(str(tmp_path), 'v1')
+    assert [remaining.get(doc) is not None for doc in docs] == [False, False, True, True, True]
+    assert remaining.stats()['disk_bytes'] == cache.stats()['disk_bytes']
+
+
+def test_repeat_upload_is_served_from_the_cache(app_module):
+    client = app_module.app.test_client()
+    data = contract_text(2, seed=303).encode()
+    first = client.post('/upload', data={'file': (io.BytesIO(data), "first.txt")}).get_json()
+    hits = app_module.analysis_cache.stats()['hits']
+
+    second = client.post('/upload', data={'file': (io.BytesIO(data), "renamed.txt")}).get_json()
+    assert second['doc_id'] == first['doc_id'] == hashlib.sha256(data).hexdigest()
+    assert second['analysis']['filename'] == "renamed.txt"
+    assert second['analysis']['clauses'] == first['analysis']['clauses']
+    assert app_module.analysis_cache.stats()['hits'] > hits
@@ -0,0 +1,104 @@
+import gzip
+import json
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+import analysis_view
+from benchmarks.synthetic import write_txt
+
+
+@pytest.fixture(scope='module')
+def uploaded(app_module, tmp_path_factory):
+    """(test client, doc_id, full analysis) of an uploaded contract"""
+    path = str(tmp_path_factory.mktemp('contract') / "contract.txt")
+    write_txt(path, 20)
+    client = app_module.app.test_client()
+    with open(path, 'rb') as f:
+        response = client.post('/upload', data={'file': (f, "contract.txt")})
+    assert response.status_code == 200
+    doc_id = response.get_json()['doc_id']
+    return client, doc_id, app_module.analysis_cache.get(doc_id)
+
+
+def test_pages_cover_all_clauses(uploaded):
+    client, doc_id, analysis = uploaded
+    assert len(analysis['clauses']) > 5
+    clauses, offset = [], 0
+    while offset is not None:
+        body = client.get(f"/analysis/{doc_id}?limit=2&offset={offset}").get_json()
+        assert len(body['clauses']) <= 2
+        assert body['total'] == body['matched'] == len(analysis['clauses'])
+        clauses += body['clauses']
+        offset = body['next_offset']
+    assert clauses == [{field: clause.get(field) for field in analysis_view.CLAUSE_FIELDS}
+                       for clause in analysis['clauses']]
+
+
+def test_filters_and_fields(uploaded):
+    client, doc_id, analysis = uploaded
+    clause_type = analysis['clauses'][0]['type']
+    expected = [[clause['type'], clause['start']] for clause in analysis['clauses']
+                if clause['type'] == clause_type and clause['risk'] in ('high', 'medium')]
+    assert expected
+    body = client.get(f"/analysis/{doc_id}?type={clause_type.upper()}&risk=high,medium"
+                      f"&fields=type,start&format=compact&include=risks").get_json()
+    assert body['matched'] == len(expected)
+    assert body['clauses'] == {'fields': ['type', 'start'], 'rows': expected}
+    assert body['risks'] == analysis['risks']
+    assert 'summary' not in body
+
+
+@pytest.mark.parametrize('query', ['limit=0', 'offset=-1', 'limit=x', 'risk=severe', 'fields=text',
+                                   'include=sections', 'format=xml'])
+def test_bad_query(uploaded, query):
+    client, doc_id, _ = uploaded
+    response = client.get(f"/analysis/{doc_id}?{query}")
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_unknown_document(uploaded):
+    client, _, _ = uploaded
+    assert client.get("/analysis/0123456789abcdef").status_code == 404
+
+
+def test_etag_revalidates_with_304(uploaded):
+    client, doc_id, _ = uploaded
+    url = f"/analysis/{doc_id}?limit=3"
+    response = client.get(url)
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert client.get(url).headers['ETag'] == etag
+    assert client.get(f"/analysis/{doc_id}?limit=4").headers['ETag'] != etag
+
+    revalidated = client.get(url, headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+    assert revalidated.headers['ETag'] == etag
+    assert client.get(url, headers={'If-None-Match': '"stale"'}).status_code == 200
+
+
+def test_compressed_page_has_its_own_etag(uploaded):
+    client, doc_id, _ = uploaded
+    url = f"/analysis/{doc_id}?limit=1000"
+    plain = client.get(url)
+    compressed = client.get(url, headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in compressed.headers['Vary']
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
+    etag = compressed.headers['ETag']
+    assert etag == plain.headers['ETag'][:-1] + '-gzip"'
+    # Either representation revalidates, whatever the client now accepts
+    assert client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag}).status_code == 304
+    assert client.get(url, headers={'If-None-Match': plain.headers['ETag'],
+                                    'Accept-Encoding': 'gzip'}).status_code == 304
+
+
+def test_parse_query_normalizes():
+    query = analysis_view.parse_query(MultiDict([('type', 'Payment,termination'), ('type', 'payment'),
+                                                 ('fields', 'type,type,risk'), ('limit', '5000')]),
+                                      max_limit=1000)
+    assert query['types'] == ['payment', 'termination']
+    assert query['fields'] == ['type', 'risk']
+    assert query['limit'] == 1000
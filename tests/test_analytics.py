@@ -0,0 +1,100 @@
+import pytest
+
+from analytics import AnalyticsStore, month_of
+
+JANUARY = 1767225600  # 2026-01-01
+FEBRUARY = 1769904000  # 2026-02-01
+
+
+def analysis(doc_id, clauses, parties=()):
+    risks = {}
+    for _, risk in clauses:
+        risks[risk] = risks.get(risk, 0) + 1
+    return {'doc_id': doc_id, 'filename': f"{doc_id}.pdf", 'text_length': 100, 'parties': list(parties),
+            'clauses': [{'type': clause_type, 'risk': risk} for clause_type, risk in clauses], 'risks': risks}
+
+
+def recount(store):
+    """The rollups computed from scratch off the per-document tables"""
+    connection = store._connection()
+    rows = {}
+
+    def add(dimension, value, risk, doc_id, clauses):
+        row = rows.setdefault((dimension, value, risk), [set(), 0])
+        row[0].add(doc_id)
+        row[1] += clauses
+
+    for doc_id, month in connection.execute("SELECT doc_id, month FROM documents"):
+        clauses = list(connection.execute(
+            "SELECT clause_type, risk, clauses FROM document_clauses WHERE doc_id = ?", (doc_id,)))
+        parties = [party for party, in connection.execute(
+            "SELECT counterparty FROM document_counterparties WHERE doc_id = ?", (doc_id,))]
+        for dimension, values in (('total', ['']), ('month', [month]), ('counterparty', parties)):
+            for value in values:
+                add(dimension, value, 'all', doc_id, sum(count for _, _, count in clauses))
+                for clause_type, risk, count in clauses:
+                    add(dimension, value, risk, doc_id, count)
+        for clause_type, risk, count in clauses:
+            add('clause_type', clause_type, risk, doc_id, count)
+            add('clause_type', clause_type, 'all', doc_id, count)
+    return {key: (len(documents), clauses) for key, (documents, clauses) in rows.items()}
+
+
+def rollups(store):
+    return {(dimension, value, risk): (documents, clauses) for dimension, value, risk, documents, clauses
+            in store._connection().execute("SELECT * FROM rollups")}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AnalyticsStore(str(tmp_path / "analytics.db"), own_parties=["Acme Corp"])
+
+
+def test_record_adds_to_rollups(store):
+    store.record(analysis('a', [('Termination', 'high'), ('Payment', 'low'), ('Payment', 'low')],
+                          parties=['Acme Corp', 'Beta LLC']), analyzed_at=JANUARY)
+    store.record(analysis('b', [('Payment', 'medium')]), counterparty='Gamma Inc', analyzed_at=FEBRUARY)
+    assert rollups(store) == recount(store)
+    assert store.totals()['documents'] == 2
+    assert store.totals()['clauses'] == 4
+    assert store.totals()['risks']['low'] == {'documents': 1, 'clauses': 2}
+    payment = store.risk_distribution('clause_type')[0]
+    assert (payment['clause_type'], payment['documents'], payment['clauses']) == ('Payment', 2, 3)
+    assert payment['documents_by_risk'] == {'low': 1, 'medium': 1}
+    assert [row['counterparty'] for row in store.risk_distribution('counterparty')] == ['Beta LLC', 'Gamma Inc']
+
+
+def test_re_record_replaces_earlier_contribution(store):
+    store.record(analysis('a', [('Termination', 'high'), ('Liability', 'high')], parties=['Beta LLC']),
+                 analyzed_at=JANUARY)
+    store.record(analysis('b', [('Payment', 'low')], parties=['Beta LLC']), analyzed_at=JANUARY)
+    store.record(analysis('a', [('Payment', 'medium')], parties=['Delta plc']), analyzed_at=FEBRUARY)
+    assert rollups(store) == recount(store)
+    assert store.totals()['documents'] == 2
+    # Buckets only the earlier version contributed to are gone
+    assert ('clause_type', 'Termination', 'all') not in rollups(store)
+    assert ('counterparty', 'Beta LLC', 'all') in rollups(store)
+    assert [row['month'] for row in store.risk_distribution('month')] == [month_of(FEBRUARY), month_of(JANUARY)]
+
+    store.record(analysis('b', [('Payment', 'low')], parties=['Beta LLC']), analyzed_at=JANUARY)
+    assert rollups(store) == recount(store)
+    assert store.totals() == {'documents': 2, 'clauses': 2, 'risks': {
+        'high': {'documents': 0, 'clauses': 0},
+        'medium': {'documents': 1, 'clauses': 1},
+        'low': {'documents': 1, 'clauses': 1}}}
+
+
+def test_documents_drill_down(store):
+    store.record(analysis('a', [('Termination', 'high')], parties=['Beta LLC']), analyzed_at=JANUARY)
+    store.record(analysis('b', [('Termination', 'low')], parties=['Beta LLC']), analyzed_at=FEBRUARY)
+    store.record(analysis('c', [('Payment', 'high')]), counterparty='Gamma Inc', analyzed_at=FEBRUARY + 1)
+    assert [row['doc_id'] for row in store.documents(clause_type='Termination')] == ['b', 'a']
+    assert [row['doc_id'] for row in store.documents(risk='high')] == ['c', 'a']
+    assert [row['doc_id'] for row in store.documents(clause_type='Termination', risk='high')] == ['a']
+    assert [row['doc_id'] for row in store.documents(counterparty='Beta LLC', month=month_of(FEBRUARY))] == ['b']
+    assert [row['doc_id'] for row in store.documents(limit=1, offset=1)] == ['b']
+
+
+def test_unknown_dimension(store):
+    with pytest.raises(ValueError):
+        store.risk_distribution('filename')
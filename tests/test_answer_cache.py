@@ -0,0 +1,77 @@
+import io
+
+import cache
+from benchmarks.synthetic import contract_text
+from cache import AnswerCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def test_rephrasings_share_an_entry():
+    answers = AnswerCache()
+    answers.put('doc', "When is payment due?", {"response": "30 days"}, 2.5)
+    assert answers.get('doc', "  when IS payment   due ") == {"response": "30 days"}
+    assert answers.get('doc', "When is payment late?") is None
+    assert answers.get('other', "When is payment due?") is None
+    assert answers.stats() == {"hits": 1, "misses": 2, "hit_ratio": 0.333, "entries": 1, "saved_llm_seconds": 2.5}
+
+
+def test_entries_expire(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, 'time', clock)
+    answers = AnswerCache(ttl_seconds=60)
+    answers.put('doc', "q", {"response": "a"}, 1.0)
+    clock.now += 59
+    assert answers.get('doc', "q") == {"response": "a"}
+    clock.now += 1
+    assert answers.get('doc', "q") is None
+    assert answers.stats()['entries'] == 0
+
+
+def test_least_recently_used_answer_is_dropped():
+    answers = AnswerCache(max_entries=2)
+    answers.put('doc', "first", 1, 0)
+    answers.put('doc', "second", 2, 0)
+    answers.get('doc', "first")
+    answers.put('doc', "third", 3, 0)
+    assert answers.get('doc', "second") is None
+    assert answers.get('doc', "first") == 1
+    assert answers.get('doc', "third") == 3
+
+
+def test_invalidate_drops_only_that_document():
+    answers = AnswerCache()
+    answers.put('doc', "a", 1, 0)
+    answers.put('doc', "b", 2, 0)
+    answers.put('other', "a", 3, 0)
+    answers.invalidate('doc')
+    answers.invalidate('unknown')
+    assert answers.get('doc', "a") is None
+    assert answers.get('doc', "b") is None
+    assert answers.get('other', "a") == 3
+    # An invalidated document can be cached again
+    answers.put('doc', "a", 4, 0)
+    assert answers.get('doc', "a") == 4
+
+
+def test_repeated_chat_question_is_answered_from_the_cache(app_module):
+    client = app_module.app.test_client()
+    text = contract_text(2, seed=1313)
+    doc_id = client.post('/upload', data={'file': (io.BytesIO(text.encode()), "answers.txt")}).get_json()['doc_id']
+
+    first = client.post('/chat', json={'doc_id': doc_id, 'question': "Who pays the invoices?"}).get_json()
+    second = client.post('/chat', json={'doc_id': doc_id, 'question': "who pays the invoices"}).get_json()
+    assert first['cached'] is False
+    assert second['cached'] is True
+    assert second['response'] == first['response']
+    assert second['question'] == "who pays the invoices"
+
+    app_module.answer_cache.invalidate(doc_id)
+    third = client.post('/chat', json={'doc_id': doc_id, 'question': "Who pays the invoices?"}).get_json()
+    assert third['cached'] is False
@@ -0,0 +1,66 @@
+import pytest
+
+from ai_processor import document_processor
+from benchmarks import run, synthetic
+from benchmarks.synthetic import contract_pages, contract_text, write_document
+from extraction import extract_text
+
+
+def test_contract_is_deterministic():
+    pages = contract_pages(5, seed=7)
+    assert pages == contract_pages(5, seed=7)
+    assert pages != contract_pages(5, seed=8)
+    assert len(pages) == 5
+    assert all(0 < len(page) <= synthetic.PAGE_CHARS for page in pages)
+    assert contract_text(5, seed=7) == ''.join(pages)
+    # A longer contract starts with the same pages
+    assert contract_pages(8, seed=7)[:5] == pages
+
+
+def test_contract_has_the_clause_types_the_analyzer_looks_for():
+    clauses = document_processor.extract_clauses(contract_text(10))
+    assert len({clause['type'] for clause in clauses}) >= 5
+
+
+def test_formats_carry_the_same_text(tmp_path):
+    text = contract_text(2)
+    assert extract_text(write_document(str(tmp_path / "c.txt"), 2)) == text
+    docx_text = extract_text(write_document(str(tmp_path / "c.docx"), 2))
+    for line in text.split('\n'):
+        assert line in docx_text
+    pdf_text = extract_text(write_document(str(tmp_path / "c.pdf"), 2))
+    assert "MASTER SERVICES AGREEMENT" in pdf_text
+    with pytest.raises(ValueError):
+        write_document(str(tmp_path / "c.rtf"), 2)
+
+
+def test_run_case_times_each_call_after_warmup():
+    calls = []
+    result = run.run_case("case", lambda value: calls.append(value), setup=lambda: (len(calls),),
+                          repeat=4, warmup=2, units=10)
+    assert calls == [0, 1, 2, 3, 4, 5]
+    assert result['case'] == "case"
+    assert result['runs'] == 4
+    assert result['p50_ms'] <= result['p99_ms']
+    assert result['unit'] == "pages/s"
+    assert result['peak_rss_mb'] > 0
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert run.percentile(values, 0.5) == 51
+    assert run.percentile(values, 0.99) == 100
+    assert run.percentile([3], 0.99) == 3
+
+
+def test_compare_reports_regressions(capsys):
+    def result(case, p50, growth=0):
+        return {"case": case, "p50_ms": p50, "rss_growth_mb": growth}
+
+    baseline = {"results": [result("fast", 10.0), result("steady", 10.0), result("memory", 10.0, 20)]}
+    regressions = run.compare([result("fast", 12.0), result("steady", 10.5), result("memory", 10.0, 30),
+                               result("new", 5.0)], baseline, threshold=0.10, rss_threshold=0.25)
+    assert len(regressions) == 2
+    assert regressions[0].startswith("fast: p50 10.0 ms -> 12.0 ms")
+    assert regressions[1] == "memory: RSS growth 20 MB -> 30 MB"
+    assert "new" not in capsys.readouterr().out
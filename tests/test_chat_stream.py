@@ -0,0 +1,85 @@
+import io
+import json
+
+import pytest
+
+from benchmarks.synthetic import contract_text
+
+
+def parse_events(response):
+    """Read and close a streamed response, returning its (event, data) pairs"""
+    with response:
+        body = response.get_data(as_text=True)
+    events = []
+    for block in body.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.split('\n'))
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+@pytest.fixture(scope='module')
+def doc_id(app_module):
+    client = app_module.app.test_client()
+    response = client.post('/upload', data={'file': (io.BytesIO(contract_text(2, seed=1212).encode()), "stream.txt")})
+    return response.get_json()['doc_id']
+
+
+def test_answer_is_streamed_as_events(app_module, doc_id):
+    client = app_module.app.test_client()
+    response = client.post('/chat', json={'doc_id': doc_id, 'question': "What is the notice period?", 'stream': True})
+    assert response.mimetype == 'text/event-stream'
+    assert response.headers['Cache-Control'] == 'no-cache'
+    events = parse_events(response)
+
+    names = [name for name, _ in events]
+    assert names[0] == 'sources' and names[-1] == 'done'
+    assert set(names[1:-1]) == {'token'}
+    sources, done = events[0][1], events[-1][1]
+    assert sources['cached'] is False
+    assert sources['sources']
+    assert done['cached'] is False
+    assert done['question'] == "What is the notice period?"
+    assert done['time_to_first_token_ms'] <= done['total_ms']
+
+    # The streamed answer is cached and replayed token by token
+    answer = ''.join(data['token'] for name, data in events if name == 'token')
+    replay = parse_events(client.post('/chat', json={'doc_id': doc_id, 'question': "what is the notice period",
+                                                      'stream': True}))
+    assert replay[0][1] == {"sources": sources['sources'], "cached": True}
+    assert ''.join(data['token'] for name, data in replay if name == 'token') == answer
+    assert replay[-1][1]['cached'] is True
+    plain = client.post('/chat', json={'doc_id': doc_id, 'question': "What is the notice period?"}).get_json()
+    assert plain['cached'] is True
+    assert plain['response'] == answer
+
+
+def test_closed_stream_cancels_generation(app_module, doc_id, monkeypatch):
+    state = {}
+
+    def stream_answer(question, context, summary="", cancel_event=None):
+        state['cancel_event'] = cancel_event
+        try:
+            for number in range(1000):
+                yield f" token{number}"
+        finally:
+            state['closed'] = True
+
+    monkeypatch.setattr(app_module.document_processor, 'stream_answer', stream_answer)
+    client = app_module.app.test_client()
+    response = client.post('/chat', json={'doc_id': doc_id, 'question': "Stream then hang up?", 'stream': True},
+                           buffered=False)
+    chunks = response.response
+    assert next(chunks).startswith(b"event: sources")
+    assert next(chunks) == b'event: token\ndata: {"token": " token0"}\n\n'
+    response.close()
+    assert state['cancel_event'].is_set()
+    assert state['closed']
+    # An interrupted answer is not cached
+    assert app_module.answer_cache.get(doc_id, "Stream then hang up?") is None
+
+
+def test_unknown_document_is_not_streamed(app_module):
+    client = app_module.app.test_client()
+    response = client.post('/chat', json={'doc_id': "0" * 64, 'question': "Anything?", 'stream': True})
+    assert response.status_code == 404
+    assert 'error' in response.get_json()
@@ -0,0 +1,69 @@
+import pytest
+
+from benchmarks.synthetic import contract_text
+from clause_matcher import ClauseMatcher, ClauseTypeRegistry, build_trie_pattern
+
+
+def span_types(matcher, text):
+    return [(span.section, span.clause_type['type']) for span in matcher.find_spans(text)]
+
+
+def test_trie_pattern_factors_shared_prefixes():
+    assert build_trie_pattern(['pay', 'payment', 'payments']) == 'pay(?:ment(?:s)?)?'
+    assert build_trie_pattern(['governing law']) == r'governing\s+law'
+
+
+def test_spans_never_overlap():
+    text = contract_text(30)
+    spans = ClauseMatcher().find_spans(text)
+    assert len(spans) > 50
+    for previous, span in zip(spans, spans[1:]):
+        assert previous.end <= span.start
+    for span in spans:
+        assert text[span.start:span.end] == span.text
+
+
+def test_one_span_per_section_of_the_most_frequent_type():
+    text = ("1. The supplier is liable for damages and must indemnify the customer, "
+            "even after termination.\n"
+            "2. Payment of each invoice is due in 30 days; confidential invoices stay secret.\n"
+            "3. Payment terms and confidentiality, one keyword each.\n")
+    assert span_types(ClauseMatcher(), text) == [('1.', 'Liability'), ('2.', 'Payment'), ('3.', 'Payment')]
+
+
+def test_heading_decides_the_type_of_its_subsections():
+    text = ("12. Termination\n"
+            "12.1 Either party may end this agreement on notice.\n"
+            "12.2 Unpaid invoices remain due and payment terms survive.\n"
+            "13. Payment\n"
+            "13.1 The customer shall pay each invoice.\n")
+    assert span_types(ClauseMatcher(), text) == [
+        ('12.', 'Termination'), ('12.1', 'Termination'), ('12.2', 'Termination'),
+        ('13.', 'Payment'), ('13.1', 'Payment')]
+
+
+def test_registry_changes_recompile():
+    registry = ClauseTypeRegistry([{'type': 'Payment', 'keywords': ['invoice']}])
+    matcher = ClauseMatcher(registry)
+    text = "The invoices go to the escrow agent.\n"
+    assert span_types(matcher, text) == []
+    registry.register('Escrow', ['escrow agent', 'escrow'], 'medium')
+    assert span_types(matcher, text) == [(None, 'Escrow')]
+    # On a tie the type found first in the text wins
+    registry.register('Payment', ['invoice', 'invoices'])
+    assert span_types(matcher, text) == [(None, 'Payment')]
+    registry.unregister('Payment')
+    assert span_types(matcher, text) == [(None, 'Escrow')]
+    with pytest.raises(ValueError):
+        registry.register('Empty', [' '])
+
+
+def test_scanner_does_not_rescan_consumed_text():
+    lines = contract_text(50).splitlines(True)
+    scanner = ClauseMatcher().scanner()
+    longest = max(map(len, lines))
+    for line in lines:
+        scanner.feed(line)
+        # Only the undecided end of the input is kept for the next scan
+        assert len(scanner._tail) <= longest + 1
+        assert scanner._cursor <= 1
@@ -0,0 +1,70 @@
+import random
+
+import pytest
+
+from ai_processor import document_processor
+from benchmarks.synthetic import contract_text, write_document
+from clause_matcher import ClauseMatcher
+from extraction import TextSegment, iter_text
+
+UNNUMBERED = [
+    "Either party may terminate this agreement on notice.\n",
+    "The supplier is liable for all damages.\n",
+    "All information exchanged is confidential.\n",
+    "Payment is due within 30 days of invoice.\n",
+]
+
+
+def stream_sections(matcher, pieces):
+    scanner = matcher.scanner()
+    sections = []
+    for piece in pieces:
+        sections += scanner.feed(piece)
+    return sections + scanner.finish()
+
+
+def stream_spans(matcher, pieces):
+    spans = (matcher.clause_span(section) for section in stream_sections(matcher, pieces))
+    return [span for span in spans if span is not None]
+
+
+@pytest.mark.parametrize('kind', ['txt', 'docx', 'pdf'])
+def test_streamed_spans_equal_full_text(tmp_path, kind):
+    path = write_document(str(tmp_path / f"contract.{kind}"), 30)
+    segments = [segment.text for segment in iter_text(path, workers=1)]
+    matcher = ClauseMatcher()
+    assert len(segments) > 1
+    assert stream_spans(matcher, segments) == matcher.find_spans(''.join(segments))
+
+
+@pytest.mark.parametrize('text', [
+    contract_text(5),
+    ''.join(UNNUMBERED),
+    "a.\n \n\t\nB text;\n  (c) item: \nD end.  \n\n\n" * 20,
+    ("word " * 1000 + ".\nNext paragraph here.\n") * 3,
+])
+def test_any_split_gives_the_same_sections(text):
+    matcher = ClauseMatcher()
+    full = matcher.scanner().finish(text)
+    rng = random.Random(7)
+    for _ in range(50):
+        cuts = sorted(rng.sample(range(1, len(text)), rng.randint(1, 30)))
+        pieces = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+        assert stream_sections(matcher, pieces) == full
+    assert stream_sections(matcher, text.splitlines(True)) == full
+
+
+def test_paragraph_breaks_at_segment_boundaries():
+    segments = [TextSegment(sum(map(len, UNNUMBERED[:index])), text, 1) for index, text in enumerate(UNNUMBERED)]
+    streamed = [clause['type'] for clause in document_processor.analyze_stream(segments)['clauses']]
+    assert streamed == ['Termination', 'Liability', 'Confidentiality', 'Payment']
+    assert streamed == [clause['type'] for clause in document_processor.extract_clauses(''.join(UNNUMBERED))]
+
+
+def test_blank_line_between_pages():
+    pages = ["The customer may terminate this agreement at any time.\n",
+             "\nThe supplier is liable for damages caused.\n"]
+    segments = [TextSegment(0, pages[0], 1), TextSegment(len(pages[0]), pages[1], 2)]
+    clauses = document_processor.analyze_stream(segments)['clauses']
+    assert [clause['type'] for clause in clauses] == ['Termination', 'Liability']
+    assert [clause['page'] for clause in clauses] == [1, 2]
@@ -0,0 +1,63 @@
+import io
+import zipfile
+
+from docx import Document
+from docx.enum.text import WD_BREAK
+
+from benchmarks.synthetic import write_docx
+from docx_reader import iter_docx_text
+
+NAMESPACES = ('xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+              'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"')
+
+
+def docx_bytes(document):
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def test_paragraphs_match_python_docx(tmp_path):
+    path = str(tmp_path / "contract.docx")
+    write_docx(path, 5)
+    blocks = list(iter_docx_text(path))
+    paragraphs = [text for _, text in blocks if '\t' not in text]
+    assert paragraphs == [paragraph.text + "\n" for paragraph in Document(path).paragraphs]
+    assert "Milestone\tDue date\tAmount\n" in [text for _, text in blocks]
+    assert sorted({page for page, _ in blocks}) == [1, 2, 3, 4, 5]
+
+
+def test_tables_headers_footers_and_page_breaks():
+    document = Document()
+    document.sections[0].header.paragraphs[0].text = "HEADER"
+    document.sections[0].footer.paragraphs[0].text = "FOOTER"
+    document.add_paragraph("Before")
+    run = document.add_paragraph("Tab").add_run()
+    run.add_tab()
+    run.add_text("x")
+    run.add_break(WD_BREAK.PAGE)
+    table = document.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = "a"
+    table.cell(0, 1).add_table(rows=1, cols=1).cell(0, 0).text = "nested"
+    document.add_paragraph("After").paragraph_format.page_break_before = True
+    assert list(iter_docx_text(docx_bytes(document))) == [
+        (1, "HEADER\n"), (1, "Before\n"), (1, "Tab\tx\n"), (2, "a\tnested\n"), (3, "After\n"), (3, "FOOTER\n")
+    ]
+
+
+def test_footnotes_follow_their_paragraph_and_fallback_is_skipped():
+    body = (f'<w:document {NAMESPACES}><w:body>'
+            '<w:p><w:r><w:t>Pay in 30 days.</w:t></w:r><w:r><w:footnoteReference w:id="2"/></w:r></w:p>'
+            '<w:p><w:r><mc:AlternateContent><mc:Choice><w:t>choice</w:t></mc:Choice>'
+            '<mc:Fallback><w:t>fallback</w:t></mc:Fallback></mc:AlternateContent></w:r></w:p>'
+            '</w:body></w:document>')
+    notes = (f'<w:footnotes {NAMESPACES}><w:footnote w:id="2">'
+             '<w:p><w:r><w:t>Business days.</w:t></w:r></w:p></w:footnote></w:footnotes>')
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('word/document.xml', body)
+        archive.writestr('word/footnotes.xml', notes)
+    assert list(iter_docx_text(buffer.getvalue())) == [
+        (1, "Pay in 30 days.\n"), (1, "Business days.\n"), (1, "choice\n")
+    ]
+
@@ -0,0 +1,111 @@
+import pytest
+
+import extraction
+from benchmarks.synthetic import write_docx, write_pdf, write_txt
+from extraction import extract_text, iter_text, page_count
+
+
+def assert_contiguous(segments):
+    offset = 0
+    for segment in segments:
+        assert segment.offset == offset
+        assert segment.text
+        offset += len(segment.text)
+
+
+def test_txt_is_read_in_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(extraction, 'TXT_BLOCK_SIZE', 1000)
+    path = str(tmp_path / "contract.txt")
+    write_txt(path, 5)
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+
+    segments = list(iter_text(path))
+    assert len(segments) == -(-len(text) // 1000)
+    assert_contiguous(segments)
+    assert ''.join(segment.text for segment in segments) == text
+    assert {segment.page for segment in segments} == {1}
+    with open(path, 'rb') as f:
+        assert list(iter_text(f.read(), filename="upload.TXT")) == segments
+
+
+def test_pdf_is_extracted_page_by_page(tmp_path):
+    path = str(tmp_path / "contract.pdf")
+    write_pdf(path, 4)
+    segments = list(iter_text(path))
+    assert [segment.page for segment in segments] == [1, 2, 3, 4]
+    assert_contiguous(segments)
+    assert "MASTER SERVICES AGREEMENT" in segments[0].text
+    assert page_count(path) == 4
+    with open(path, 'rb') as f:
+        data = f.read()
+    assert list(iter_text(data, filename="contract.pdf")) == segments
+    assert page_count(data, "contract.pdf") == 4
+    assert extract_text(path) == ''.join(segment.text for segment in segments)
+
+
+def test_docx_pages_follow_page_breaks(tmp_path):
+    path = str(tmp_path / "contract.docx")
+    write_docx(path, 3)
+    segments = list(iter_text(path))
+    assert_contiguous(segments)
+    assert [segments[0].page, segments[-1].page] == [1, 3]
+    assert [segment.page for segment in segments] == sorted(segment.page for segment in segments)
+    assert page_count(path) is None
+
+
+def test_extraction_is_lazy(tmp_path):
+    path = str(tmp_path / "contract.pdf")
+    write_pdf(path, 3)
+    segments = iter_text(path)
+    assert next(segments).page == 1
+    segments.close()
+
+
+def test_unsupported_format():
+    assert extract_text(b"data", filename="notes.rtf") == "Unsupported file format"
+    assert page_count(b"data", "notes.rtf") is None
+
+
+@pytest.fixture(scope='module')
+def large_pdf(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('pdf') / "large.pdf")
+    write_pdf(path, 12)
+    yield path
+    if extraction._pool is not None:
+        extraction._pool.shutdown()
+        extraction._pool = None
+
+
+def test_parallel_pages_match_serial_extraction(large_pdf, monkeypatch):
+    monkeypatch.setattr(extraction, 'PARALLEL_BATCH_PAGES', 5)
+    serial = list(iter_text(large_pdf, workers=1))
+    assert len(serial) == 12
+    assert list(iter_text(large_pdf, workers=2)) == serial
+    with open(large_pdf, 'rb') as f:
+        assert list(iter_text(f.read(), workers=2, filename="large.pdf")) == serial
+
+
+def test_page_threshold_selects_the_pool(large_pdf, monkeypatch):
+    calls = []
+    parallel = extraction._iter_pdf_pages_parallel
+
+    def spy(file_path, total, workers, batch_pages=None):
+        calls.append((total, workers))
+        return parallel(file_path, total, workers, batch_pages)
+
+    monkeypatch.setattr(extraction, '_iter_pdf_pages_parallel', spy)
+    monkeypatch.setattr(extraction, 'PARALLEL_WORKERS', 2)
+    monkeypatch.setattr(extraction, 'PARALLEL_PAGE_THRESHOLD', 13)
+    list(iter_text(large_pdf))
+    assert calls == []
+    monkeypatch.setattr(extraction, 'PARALLEL_PAGE_THRESHOLD', 12)
+    list(iter_text(large_pdf))
+    assert calls == [(12, 2)]
+
+
+def test_pool_is_reused_across_documents(large_pdf):
+    list(iter_text(large_pdf, workers=2))
+    pool = extraction._pool
+    list(iter_text(large_pdf, workers=2))
+    assert extraction._pool is pool
@@ -0,0 +1,52 @@
+import json
+import sys
+
+import ingest
+from benchmarks.synthetic import write_pdf, write_txt
+
+
+def read_records(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def write_records(path, records, tail=''):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(''.join(json.dumps(record) + "\n" for record in records) + tail)
+
+
+def test_load_completed_cuts_incomplete_record(tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    records = [{'path': 'a.txt', 'status': 'ok'}, {'path': 'b.pdf', 'status': 'error', 'error': 'bad'}]
+    write_records(output, records, tail='{"path": "c.t')
+    assert ingest.load_completed(output) == {'a.txt', 'b.pdf'}
+    assert read_records(output) == records
+
+
+def test_retry_errors_drops_failed_records(tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    write_records(output, [{'path': 'a.txt', 'status': 'ok'}, {'path': 'b.pdf', 'status': 'error', 'error': 'bad'},
+                           {'path': 'c.txt', 'status': 'ok'}])
+    assert ingest.load_completed(output, retry_errors=True) == {'a.txt', 'c.txt'}
+    assert [record['path'] for record in read_records(output)] == ['a.txt', 'c.txt']
+    assert not (tmp_path / "results.jsonl.tmp").exists()
+
+
+def test_retried_run_keeps_one_record_per_path(tmp_path, monkeypatch):
+    root = tmp_path / "contracts"
+    root.mkdir()
+    write_txt(str(root / "good.txt"), 2)
+    (root / "broken.pdf").write_bytes(b"not a pdf")
+    output = str(tmp_path / "results.jsonl")
+
+    def run(*flags):
+        monkeypatch.setattr(sys, 'argv', ['ingest.py', str(root), '--output', output, '--workers', '1', *flags])
+        ingest.main()
+        return {record['path']: record['status'] for record in read_records(output)}
+
+    assert run() == {'good.txt': 'ok', 'broken.pdf': 'error'}
+    assert run('--retry-errors') == {'good.txt': 'ok', 'broken.pdf': 'error'}
+    assert len(read_records(output)) == 2
+    write_pdf(str(root / "broken.pdf"), 1)
+    assert run('--retry-errors') == {'good.txt': 'ok', 'broken.pdf': 'ok'}
+    assert len(read_records(output)) == 2
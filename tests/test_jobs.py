@@ -0,0 +1,143 @@
+import io
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import jobs
+from benchmarks.synthetic import contract_text
+from extraction import TextSegment
+from jobs import JobManager
+
+
+def wait_for(manager, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while manager.get(job_id)['status'] in ('queued', 'running'):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return manager.get(job_id)
+
+
+def paged_job(job_id, pages, release):
+    jobs.report_progress(job_id, status='running', pages_done=0, pages_total=pages)
+    for page in range(1, pages + 1):
+        jobs.report_progress(job_id, pages_done=page)
+    release.wait(5)
+    return pages * 10
+
+
+def failing_job(job_id):
+    raise ValueError("unreadable file")
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = JobManager(backend='thread', max_workers=2, max_finished_jobs=2, state_dir=str(tmp_path / 'jobs'))
+    yield manager
+    manager.shutdown()
+
+
+def test_job_reports_progress_and_result(manager):
+    release = threading.Event()
+    finished = []
+    job_id = manager.submit(paged_job, 3, release, on_success=lambda pages: {"pages": pages},
+                            on_finish=lambda: finished.append(True))
+    deadline = time.monotonic() + 5
+    while manager.get(job_id)['progress']['pages_done'] != 3:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    job = manager.get(job_id)
+    assert job['status'] == 'running'
+    assert job['progress'] == {'pages_done': 3, 'pages_total': 3}
+    assert 'result' not in job
+    assert manager.active() == 1
+
+    release.set()
+    job = wait_for(manager, job_id)
+    assert job['status'] == 'done'
+    assert manager.result(job_id) == {"pages": 30}
+    assert finished == [True]
+    assert manager.active() == 0
+
+
+def test_failed_job_keeps_the_error(manager):
+    job_id = manager.submit(failing_job)
+    job = wait_for(manager, job_id)
+    assert job['status'] == 'failed'
+    assert job['error'] == "unreadable file"
+    assert manager.stats() == {"backend": "thread", "jobs": {"failed": 1}}
+
+
+def test_other_processes_read_jobs_from_state_dir(manager):
+    release = threading.Event()
+    release.set()
+    job_id = manager.submit(paged_job, 1, release)
+    wait_for(manager, job_id)
+
+    other = JobManager(backend='thread', state_dir=manager.state_dir)
+    assert other.get(job_id)['status'] == 'done'
+    assert other.result(job_id) == 10
+    assert other.get('../' + job_id) is None
+    assert other.get('unknown') is None
+
+
+def test_finished_jobs_are_trimmed(manager):
+    release = threading.Event()
+    release.set()
+    job_ids = []
+    for _ in range(4):
+        job_ids.append(manager.submit(paged_job, 1, release))
+        wait_for(manager, job_ids[-1])
+    # Trimming happens on submit, so the newest job is kept on top of the limit
+    assert [manager.get(job_id) is not None for job_id in job_ids] == [False, True, True, True]
+    assert not os.path.exists(os.path.join(manager.state_dir, f"{job_ids[0]}.json"))
+    with open(os.path.join(manager.state_dir, f"{job_ids[-1]}.json"), encoding='utf-8') as f:
+        assert json.load(f)['status'] == 'done'
+
+
+def test_upload_analysis_does_not_start_a_nested_pool(monkeypatch):
+    calls = []
+
+    def fake_iter_text(source, workers=None, filename=None):
+        calls.append(workers)
+        yield TextSegment(0, "Payment is due within thirty days.\n", 1)
+        yield TextSegment(35, "Either party may terminate this agreement.\n", 2)
+
+    monkeypatch.setattr(jobs, 'iter_text', fake_iter_text)
+    monkeypatch.setattr(jobs, 'page_count', lambda source, filename=None: 2)
+    progress = []
+    monkeypatch.setattr(jobs, 'report_progress', lambda job_id, **fields: progress.append(fields))
+
+    analysis, text = jobs.run_upload_analysis('job', b'%PDF', 'contract.pdf')
+    assert calls == [1]
+    assert text.startswith("Payment is due")
+    assert analysis['text_length'] == len(text)
+    assert progress[0] == {'status': 'running', 'pages_done': 0, 'pages_total': 2}
+    assert progress[-1] == {'pages_done': 2}
+
+
+def test_async_upload_and_job_routes(app_module, monkeypatch):
+    manager = JobManager(backend='thread')
+    monkeypatch.setattr(app_module, 'job_manager', manager)
+    client = app_module.app.test_client()
+    text = contract_text(3, seed=606)
+    try:
+        response = client.post('/upload?async=1', data={'file': (io.BytesIO(text.encode()), "async.txt")})
+        assert response.status_code == 202
+        body = response.get_json()
+        assert response.headers['Location'] == body['status_url'] == f"/jobs/{body['job_id']}"
+
+        job = wait_for(manager, body['job_id'])
+        assert job['status'] == 'done'
+        assert client.get(body['status_url']).get_json()['status'] == 'done'
+        result = client.get(body['result_url']).get_json()
+        assert result['doc_id'] == body['doc_id']
+        assert app_module.analysis_cache.get(body['doc_id']) is not None
+        assert app_module.session_store.get(body['doc_id']) is not None
+    finally:
+        manager.shutdown()
+
+    assert client.get('/jobs/unknown').status_code == 404
+    assert client.get('/jobs/unknown/result').status_code == 404
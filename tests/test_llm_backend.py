@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+from llm_backend import LLMBackend, MockLLM, QueuedLLM
+
+PREFIX = ("This Agreement is made between Acme Corp and Beta LLC. "
+          "Either party may terminate this Agreement with thirty days written notice. "
+          "Payment is due within sixty days of the invoice date.")
+
+
+def test_mock_llm_is_deterministic():
+    question = "How can a party terminate the agreement?"
+    first = MockLLM().generate(PREFIX, "", question)
+    second = MockLLM().generate(PREFIX, "", question)
+    assert first == second
+    assert "terminate" in first[0]
+    assert first[1] == len(first[0].split())
+
+
+def test_mock_llm_respects_max_tokens():
+    text, tokens = MockLLM().generate(PREFIX, "", "When is payment due?", max_tokens=4)
+    assert tokens == 4
+    assert len(text.split()) == 4
+
+
+def test_mock_llm_prefix_cache_hits():
+    llm = MockLLM()
+    llm.generate(PREFIX, "", "When is payment due?")
+    llm.generate(PREFIX, "", "Who are the parties?")
+    llm.generate("Another document.", "", "Who are the parties?")
+    assert llm.stats() == {"prefix_cache_hits": 1, "prefix_cache_misses": 2}
+
+
+class RecordingBackend(LLMBackend):
+    """Answers with its input, fails on request, and blocks until released"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+
+    def generate(self, prefix, context, question, max_tokens=256):
+        self.release.wait(5)
+        self.calls.append((prefix, question, max_tokens))
+        if question == "fail":
+            raise RuntimeError("model error")
+        return f"{prefix}:{question}", 1
+
+
+def run_concurrently(llm, requests):
+    results = [None] * len(requests)
+
+    def ask(index, prefix, question, max_tokens):
+        try:
+            results[index] = llm.generate(prefix, "", question, max_tokens=max_tokens)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=ask, args=(index, *request)) for index, request in enumerate(requests)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_queue_returns_each_caller_its_own_result():
+    backend = RecordingBackend()
+    llm = QueuedLLM(backend, max_group=8)
+    requests = [("a", "q0", 10), ("b", "q1", 20), ("a", "q2", 30), ("b", "q3", 40)]
+    threads, results = run_concurrently(llm, requests)
+    backend.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == [f"{prefix}:{question}" for prefix, question, _ in requests]
+    # Each request ran with its own token budget
+    assert sorted(max_tokens for _, _, max_tokens in backend.calls) == [10, 20, 30, 40]
+
+
+def test_queue_groups_requests_by_prefix():
+    backend = RecordingBackend()
+    llm = QueuedLLM(backend, max_group=8)
+    # Park the worker on one request so the rest queue up as one group
+    first, _ = run_concurrently(llm, [("z", "first", 8)])
+    while llm._queue.qsize():
+        time.sleep(0.01)
+    requests = [("b", "q0", 8), ("a", "q1", 8), ("b", "q2", 8), ("a", "q3", 8)]
+    threads, results = run_concurrently(llm, requests)
+    while llm._queue.qsize() < len(requests):
+        time.sleep(0.01)
+    backend.release.set()
+    for thread in first + threads:
+        thread.join(5)
+    assert [question for _, question, _ in backend.calls] == ["first", "q1", "q3", "q0", "q2"]
+    assert llm.stats()["groups"] == 2
+
+
+def test_queue_error_fails_only_its_request():
+    backend = RecordingBackend()
+    llm = QueuedLLM(backend, max_group=8)
+    threads, results = run_concurrently(llm, [("a", "q0", 8), ("a", "fail", 8), ("a", "q2", 8)])
+    backend.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results[0] == "a:q0"
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == "a:q2"
+    assert llm.stats()["requests"] == 2
+    with pytest.raises(RuntimeError):
+        llm.generate("a", "", "fail")
+
+
+def test_a_lone_request_does_not_wait_for_a_group():
+    llm = QueuedLLM(MockLLM())
+    for _ in range(20):
+        llm.generate(PREFIX, "", "When is payment due?")
+    stats = llm.stats()
+    assert stats["groups"] == 20
+    # Formerly every request waited 10 ms for others to join
+    assert stats["queue_wait_ms_avg"] < 5
@@ -0,0 +1,68 @@
+from ai_processor import document_processor
+from extraction import TextSegment
+from page_index import PageIndex
+
+PAGES = ["Title\nPayment terms\n", "Termination\nNotice\nLiability", "\nLast page"]
+
+
+def build(pages):
+    index, offset = PageIndex(), 0
+    for number, text in enumerate(pages, start=1):
+        index.add(offset, text, number)
+        offset += len(text)
+    return index, ''.join(pages)
+
+
+def expected_location(pages, offset):
+    """(page, line) of offset, counted the slow way"""
+    start = 0
+    for number, text in enumerate(pages, start=1):
+        if offset < start + len(text) or number == len(pages):
+            return number, text[:offset - start].count('\n') + 1
+        start += len(text)
+
+
+def test_locate_matches_the_text():
+    index, text = build(PAGES)
+    for offset in range(len(text)):
+        assert index.locate(offset) == expected_location(PAGES, offset), offset
+
+
+def test_page_without_trailing_newline_starts_a_new_line():
+    index, text = build(PAGES)
+    second = len(PAGES[0])
+    third = second + len(PAGES[1])
+    assert index.locate(third - 1) == (2, 3)
+    # The third page starts with a newline of its own: its first line is empty
+    assert index.locate(third) == (3, 1)
+    assert index.locate(third + 1) == (3, 2)
+
+
+def test_segments_of_one_page_accumulate():
+    index = PageIndex()
+    index.add(0, "First\n", 1)
+    index.add(6, "Second\nThird", 1)
+    assert index.locate(8) == (1, 2)
+    assert index.locate(14) == (1, 3)
+    assert list(index.page_numbers) == [1]
+
+
+def test_empty_index_and_offsets_past_the_end():
+    assert PageIndex().locate(10) == (1, 1)
+    index = PageIndex.from_text("a\nb\n", page=4)
+    assert index.locate(100) == (4, 3)
+
+
+def test_size_is_eight_bytes_per_entry():
+    index, _ = build(PAGES)
+    entries = len(index.page_starts) + len(index.page_numbers) + len(index.line_starts)
+    assert index.size_bytes() == entries * 8
+
+
+def test_clauses_carry_their_page_and_line():
+    text = "Cover page\n\n" + "\n".join(["Filler line."] * 5) + "\n"
+    clause = "Payment shall be made within thirty days of the invoice date.\n"
+    analysis = document_processor.analyze_stream([TextSegment(0, text, 1), TextSegment(len(text), clause, 2)])
+    payment = [c for c in analysis['clauses'] if c['start'] >= len(text)]
+    assert payment
+    assert (payment[0]['page'], payment[0]['line']) == (2, 1)
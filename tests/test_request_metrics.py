@@ -0,0 +1,160 @@
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from werkzeug.serving import make_server
+
+import metrics
+import serve
+
+
+def in_flight(endpoint):
+    return metrics.REQUESTS_IN_FLIGHT.samples.get((endpoint,), 0)
+
+
+def latency(endpoint, status=200):
+    """(count, sum) of the request latency histogram for a POST endpoint"""
+    sample = metrics.REQUEST_SECONDS.samples.get((endpoint, 'POST', str(status)))
+    return (sum(sample[:-1]), sample[-1]) if sample else (0, 0.0)
+
+
+def test_streamed_chat_is_in_flight_until_the_stream_closes(app_module):
+    client = app_module.app.test_client()
+    document = "The supplier may terminate this agreement on thirty days notice. " * 20
+    before = latency('/chat')
+
+    response = client.post('/chat', json={'document_text': document, 'question': "How can the supplier terminate?",
+                                          'stream': True}, buffered=False)
+    assert response.status_code == 200
+    # The handler has returned but no token has been generated yet
+    assert in_flight('/chat') == 1
+    assert latency('/chat') == before
+
+    body = b''.join(response.response)
+    response.close()
+    assert b'event: done' in body
+    assert in_flight('/chat') == 0
+    count, seconds = latency('/chat')
+    assert count == before[0] + 1
+    assert seconds > before[1]
+
+
+def test_plain_request_is_recorded_at_teardown(app_module):
+    client = app_module.app.test_client()
+    before = latency('/chat', 400)
+    assert client.post('/chat', json={'question': "Anything?"}).status_code == 400
+    assert in_flight('/chat') == 0
+    assert latency('/chat', 400)[0] == before[0] + 1
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_streamed_chat_metrics_under_serve_py(app_module, monkeypatch):
+    """The same check through serve.py's stack: a real werkzeug server
+    running the app behind RequestBudget"""
+    release = threading.Event()
+
+    def stream_answer(question, context, summary="", cancel_event=None):
+        release.wait(5)
+        yield "Thirty"
+        yield " days."
+
+    monkeypatch.setattr(app_module.document_processor, 'stream_answer', stream_answer)
+    budget = serve.RequestBudget(app_module.app, 0, on_exhausted=lambda: None)
+    server = make_server('127.0.0.1', 0, budget, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        before = latency('/chat')
+        connection = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+        connection.request('POST', '/chat', json.dumps({
+            'document_text': "Either party may end this agreement on thirty days notice.",
+            'question': "What notice period applies under serve.py?", 'stream': True
+        }), {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        assert response.status == 200
+        assert response.readline().startswith(b'event: sources')
+        assert in_flight('/chat') == 1
+        assert budget.in_flight == 1
+        time.sleep(0.05)
+        release.set()
+        body = response.read()
+        connection.close()
+        assert b'Thirty' in body and b'event: done' in body
+
+        wait_until(lambda: in_flight('/chat') == 0 and budget.in_flight == 0)
+        count, seconds = latency('/chat')
+        assert count == before[0] + 1
+        # The latency covers the generation, not just the handler
+        assert seconds - before[1] >= 0.05
+    finally:
+        release.set()
+        server.shutdown()
+        server.server_close()
+
+
+def shared_registry():
+    registry = metrics.MetricsRegistry()
+    registry.counter('test_total', 'Test counter', ['kind'])
+    registry.gauge('test_in_flight', 'Test gauge')
+    registry.histogram('test_seconds', 'Test histogram', buckets=(1.0,))
+    return registry
+
+
+def exited_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def write_snapshot(directory, pid, count, gauge):
+    with open(os.path.join(directory, f"{pid}-1.json"), 'w', encoding='utf-8') as f:
+        json.dump({'test_total': [[['a'], count]], 'test_in_flight': [[[], gauge]],
+                   'test_seconds': [[[], [count, 0, 0.5 * count]]]}, f)
+
+
+def test_shared_metrics_keep_counters_of_exited_workers(tmp_path):
+    directory = str(tmp_path)
+    registry = shared_registry()
+    registry.share_to(directory)
+    registry.metrics['test_total'].inc(kind='a')
+    registry.metrics['test_in_flight'].inc()
+    dead = exited_pid()
+    write_snapshot(directory, dead, 5, 3)
+
+    def rendered():
+        return [line for line in registry.render().splitlines() if not line.startswith('#')]
+
+    expected = ['test_total{kind="a"} 6', 'test_in_flight 1', 'test_seconds_bucket{le="1.0"} 5',
+                'test_seconds_bucket{le="+Inf"} 5', 'test_seconds_sum 2.5', 'test_seconds_count 5']
+    assert rendered() == expected
+
+    registry.retire(dead)
+    assert sorted(os.listdir(directory)) == sorted(['retired.json', registry._file_name])
+    assert rendered() == expected
+    # A second exited worker is folded into the same file
+    other = exited_pid()
+    write_snapshot(directory, other, 1, 1)
+    registry.retire(other)
+    assert rendered()[0] == 'test_total{kind="a"} 7'
+    assert len(os.listdir(directory)) == 2
+
+
+def test_a_new_server_run_starts_from_zero(tmp_path):
+    directory = str(tmp_path)
+    write_snapshot(directory, exited_pid(), 5, 0)
+    with open(os.path.join(directory, 'retired.json'), 'w') as f:
+        json.dump({'files': [], 'samples': {'test_total': [[['a'], 9]]}}, f)
+    registry = shared_registry()
+    registry.share_to(directory, clear=True)
+    assert os.listdir(directory) == []
+    registry.metrics['test_total'].inc(kind='a')
+    assert 'test_total{kind="a"} 1' in registry.render().splitlines()
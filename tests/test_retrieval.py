@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+from benchmarks.synthetic import contract_text
+from retrieval import ChunkIndex, ChunkIndexBuilder, chunk_spans
+
+TEXT = contract_text(5)
+
+
+def postings(index):
+    return {term: (list(chunk_ids), list(weights)) for term, (chunk_ids, weights) in index.postings.items()}
+
+
+@pytest.mark.parametrize('chunk_size, overlap', [(1000, 200), (300, 0), (50, 49)])
+def test_builder_windows_match_chunk_spans(chunk_size, overlap):
+    index = ChunkIndex.build(TEXT, chunk_size, overlap)
+    assert index.spans == list(chunk_spans(len(TEXT), chunk_size, overlap))
+
+
+def test_any_split_builds_the_same_index():
+    full = ChunkIndex.build(TEXT, 500, 100)
+    rng = random.Random(3)
+    for _ in range(20):
+        cuts = sorted(rng.sample(range(1, len(TEXT)), rng.randint(1, 40)))
+        builder = ChunkIndexBuilder(500, 100)
+        for start, end in zip([0] + cuts, cuts + [len(TEXT)]):
+            builder.feed(TEXT[start:end])
+        index = builder.finish()
+        assert index.spans == full.spans
+        assert postings(index) == postings(full)
+
+
+def test_empty_text_has_one_chunk():
+    index = ChunkIndex.build('', 100, 10)
+    assert index.spans == [(0, 0)]
+    assert index.search("termination") == []
+
+
+def test_search_ranks_matching_chunk_first():
+    text = "Payment is due in thirty days. " * 20 + "Either party may terminate this agreement. " + "x " * 400
+    index = ChunkIndex.build(text, 200, 50)
+    chunk_id, _ = index.search("when can a party terminate", k=1)[0]
+    start, end = index.spans[chunk_id]
+    assert "terminate" in text[start:end]
@@ -0,0 +1,129 @@
+import io
+
+import pytest
+
+from ai_processor import document_processor
+from cache import AnalysisCache
+from clause_matcher import Section
+from extraction import TextSegment
+from revisions import SectionMap, diff_clauses, section_hash
+
+VERSION_1 = """MASTER SERVICES AGREEMENT
+
+1. Termination
+Either party may terminate this agreement with thirty days written notice.
+
+2. Payment
+The customer shall pay each invoice within thirty days of the invoice date.
+
+3. Confidentiality
+All confidential information must be kept secret by the receiving party.
+
+4. Liability
+The supplier is liable for direct damages up to the fees paid.
+"""
+
+# Payment changed, Confidentiality removed, Intellectual Property added,
+# Liability renumbered but unchanged
+VERSION_2 = """MASTER SERVICES AGREEMENT
+
+1. Termination
+Either party may terminate this agreement with thirty days written notice.
+
+2. Payment
+The customer shall pay each invoice within sixty days of the invoice date.
+
+3. Liability
+The supplier is liable for direct damages up to the fees paid.
+
+4. Intellectual Property
+Each party keeps its patents, copyrights and trademarks.
+"""
+
+
+def analyze(text, parent=None):
+    return document_processor.analyze_stream([TextSegment(0, text, 1)], parent)
+
+
+def test_section_hash_ignores_numbering_but_not_context():
+    body = " Payment is due within thirty days of the invoice."
+    assert section_hash(Section(0, 0, '3.', 'Payment', '3.' + body)) == \
+        section_hash(Section(0, 0, '7.', 'Payment', '7.' + body))
+    assert section_hash(Section(0, 0, '3.', 'Payment', '3.' + body)) != \
+        section_hash(Section(0, 0, '3.', 'Liability', '3.' + body))
+
+
+def test_section_map_round_trip():
+    section_map = SectionMap('fp')
+    section_map.add('h1', 0, 10, 'Payment')
+    section_map.add('h2', 10, 5, None)
+    section_map.add('h3', 15, 8, 'Liability')
+    restored = SectionMap.from_dict(section_map.to_dict())
+    assert restored.hashes() == ['h1', 'h2', 'h3']
+    assert restored.lookup('h2') == (True, None)
+    assert restored.lookup('h4') == (False, None)
+    assert restored.clause_groups(['payment', 'liability']) == [['payment'], [], ['liability']]
+
+
+def test_diff_clauses_between_versions():
+    old, new = analyze(VERSION_1), analyze(VERSION_2)
+    diff = diff_clauses(old['sections'], old['clauses'], new['sections'], new['clauses'])
+    assert [clause['type'] for clause in diff['added']] == ['Intellectual Property']
+    assert [clause['type'] for clause in diff['removed']] == ['Confidentiality']
+    assert [(change['type'], 'sixty' in change['after']['content']) for change in diff['changed']] == \
+        [('Payment', True)]
+    # Termination and the renumbered Liability
+    assert diff['unchanged'] == 2
+
+
+def test_unchanged_sections_are_reused():
+    old = analyze(VERSION_1)
+    new = analyze(VERSION_2, old['sections'])
+    # The title, Termination and the renumbered Liability section
+    assert new['section_stats'] == {'total': 5, 'reused': 3, 'reanalyzed': 2}
+    assert new['clauses'] == analyze(VERSION_2)['clauses']
+
+
+def test_revised_upload_reports_the_diff(app_module):
+    client = app_module.app.test_client()
+    first = client.post('/upload', data={'file': (io.BytesIO(VERSION_1.encode()), "msa-v1.txt")}).get_json()
+    response = client.post('/upload?parent_doc_id=' + first['doc_id'],
+                           data={'file': (io.BytesIO(VERSION_2.encode()), "msa-v2.txt")})
+    assert response.status_code == 200
+    revision = response.get_json()['revision']
+    assert revision['parent_doc_id'] == first['doc_id']
+    assert [clause['type'] for clause in revision['clause_diff']['added']] == ['Intellectual Property']
+    assert revision['sections']['reused'] == 3
+
+
+@pytest.mark.parametrize('parent, status', [
+    ('../../etc/passwd', 400),
+    ('A' * 64, 400),
+    ('f' * 64, 404),
+])
+def test_bad_parent_doc_id(app_module, parent, status):
+    client = app_module.app.test_client()
+    response = client.post('/upload', query_string={'parent_doc_id': parent},
+                           data={'file': (io.BytesIO(VERSION_2.encode()), "msa-v2.txt")})
+    assert response.status_code == status
+    assert 'parent_doc_id' in response.get_json()['error']
+
+
+def test_unreadable_parent_is_treated_as_expired(app_module):
+    client = app_module.app.test_client()
+    text = VERSION_1.replace("thirty days written", "fourteen days written")
+    doc_id = client.post('/upload', data={'file': (io.BytesIO(text.encode()), "msa.txt")}).get_json()['doc_id']
+    app_module.section_cache.put(doc_id, {'sections': 'garbage'})
+    response = client.post('/upload?parent_doc_id=' + doc_id,
+                           data={'file': (io.BytesIO(VERSION_2.encode()), "msa-v2.txt")})
+    assert response.status_code == 404
+
+
+def test_cache_rejects_paths_as_keys(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache"), version='1')
+    (tmp_path / "secret-1.json").write_text('{"leaked": true}')
+    assert cache.get('../secret') is None
+    with pytest.raises(ValueError):
+        cache.put('../secret', {})
+    cache.put('e' * 64, {'ok': True})
+    assert cache.get('e' * 64) == {'ok': True}
@@ -0,0 +1,181 @@
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+import serve
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StreamingApp:
+    """WSGI app streaming a few chunks and recording when it is closed"""
+
+    def __init__(self):
+        self.closed = False
+
+    def __call__(self, environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return self.Body(self)
+
+    class Body:
+        def __init__(self, app):
+            self.app = app
+            self.chunks = iter([b'a', b'b', b'c'])
+
+        def __iter__(self):
+            return self
+
+        def __next__(self):
+            return next(self.chunks)
+
+        def close(self):
+            self.app.closed = True
+
+
+def call(app, path='/'):
+    from werkzeug.test import EnvironBuilder
+
+    statuses = []
+    response = app(EnvironBuilder(path=path).get_environ(), lambda status, headers: statuses.append(status))
+    return statuses, response
+
+
+def test_streamed_response_is_closed_through_the_budget():
+    inner = StreamingApp()
+    budget = serve.RequestBudget(inner, 0, on_exhausted=lambda: None)
+    statuses, response = call(budget)
+    assert statuses == ['200 OK']
+    assert budget.in_flight == 1
+    assert b''.join(response) == b'abc'
+    # Still in flight until the server closes the response
+    assert budget.in_flight == 1
+    response.close()
+    assert inner.closed
+    assert budget.in_flight == 0
+
+
+def test_failing_app_releases_the_budget():
+    def broken(environ, start_response):
+        raise RuntimeError("boom")
+
+    budget = serve.RequestBudget(broken, 0, on_exhausted=lambda: None)
+    try:
+        call(budget)
+    except RuntimeError:
+        pass
+    assert budget.in_flight == 0
+    assert budget.handled == 1
+
+
+def test_budget_is_exhausted_once():
+    exhausted = []
+    budget = serve.RequestBudget(StreamingApp(), 2, on_exhausted=lambda: exhausted.append(True))
+    for _ in range(3):
+        _, response = call(budget)
+        response.close()
+    assert exhausted == [True]
+    assert budget.handled == 3
+    assert budget.in_flight == 0
+
+
+def test_flask_close_hooks_run_under_the_budget():
+    from flask import Flask, Response
+
+    app = Flask(__name__)
+    closed = []
+
+    @app.route('/stream')
+    def stream():
+        response = Response(iter(['x', 'y']), mimetype='text/plain')
+        response.call_on_close(lambda: closed.append(True))
+        return response
+
+    budget = serve.RequestBudget(app, 0, on_exhausted=lambda: None)
+    statuses, response = call(budget, '/stream')
+    assert b''.join(response) == b'xy'
+    assert closed == []
+    response.close()
+    assert closed == [True]
+    assert budget.in_flight == 0
+
+
+def test_health_warms_up_outside_serve(app_module, monkeypatch):
+    from ai_processor import DocumentProcessor
+
+    processor = DocumentProcessor()
+    monkeypatch.setattr(app_module, 'document_processor', processor)
+    client = app_module.app.test_client()
+
+    response = client.get('/health')
+    assert response.status_code == 200
+    assert response.get_json()['status'] in ('warming', 'healthy')
+
+    processor._warming.join(timeout=30)
+    assert processor.ready
+    body = client.get('/health').get_json()
+    assert body['status'] == 'healthy'
+    assert body['ready'] is True
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_health(port):
+    with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=5) as response:
+        return response.status, json.loads(response.read())
+
+
+def wait_for_health(port, timeout=60):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return get_health(port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="serve.py needs fork()")
+def test_prefork_workers_restart_and_stop(tmp_path):
+    port = free_port()
+    master = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'serve.py'), '--workers', '2', '--port', str(port)],
+        cwd=tmp_path, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+        start_new_session=True
+    )
+    try:
+        status, body = wait_for_health(port)
+        assert status == 200
+        assert body['ready'] is True
+        old_pids = {get_health(port)[1]['pid'] for _ in range(10)}
+        assert master.pid not in old_pids
+
+        # A rolling restart replaces the workers and keeps serving
+        master.send_signal(signal.SIGHUP)
+        deadline = time.monotonic() + 30
+        while get_health(port)[1]['pid'] in old_pids:
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+
+        # Stopping right after a restart also reaches workers still starting up
+        master.send_signal(signal.SIGHUP)
+        master.send_signal(signal.SIGTERM)
+        output, _ = master.communicate(timeout=60)
+    finally:
+        if master.poll() is None:
+            # Take the workers down too, or they keep the output pipe open
+            os.killpg(master.pid, signal.SIGKILL)
+            print(master.communicate()[0])
+    assert master.returncode == 0
+    assert "All workers stopped" in output
@@ -0,0 +1,112 @@
+import io
+import os
+
+import pytest
+
+from benchmarks.synthetic import contract_text
+from sessions import SessionStore
+from upload_store import UploadStore
+
+TEXT = "Payment is due within thirty days.\nEither party may terminate — with notice ✓.\n"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(str(tmp_path / 'sessions'), max_memory_bytes=64 * 1024, spill_threshold_bytes=1024)
+
+
+def test_small_text_stays_in_memory(store):
+    session = store.create('small', 'a.txt', TEXT)
+    assert not session.spilled
+    assert session.text == TEXT
+    assert session.slice(5, 12) == TEXT[5:12]
+    assert not os.path.exists(store.spill_path('small'))
+
+
+def test_large_text_is_spilled_and_memory_mapped(store):
+    text = TEXT * 100
+    writer = store.writer('large', 'b.txt')
+    for start in range(0, len(text), 500):
+        writer.write(text[start:start + 500])
+    session = writer.close()
+    assert session.spilled
+    assert session.length == len(text)
+    assert session.memory_bytes() == 0
+    # Character offsets map to byte offsets, whatever the characters
+    assert session.slice(40, 90) == text[40:90]
+    assert session.slice(len(text) - 10, len(text) + 50) == text[-10:]
+    assert session.text == text
+    assert os.path.getsize(store.spill_path('large')) == len(text) * 4
+
+
+def test_spilled_session_is_reopened_after_eviction(store):
+    text = TEXT * 100
+    store.create('large', 'b.txt', text).attach('index', object(), 60 * 1024)
+    store.create('other', 'c.txt', TEXT).attach('index', object(), 60 * 1024)
+    store.touch('other')
+    assert 'large' not in store
+    assert store.evictions == 1
+
+    session = store.get('large')
+    assert session.spilled
+    assert session.text == text
+    assert session.get('index') is None
+    assert store.get('../large') is None
+    assert store.get('unknown') is None
+
+
+def test_least_recently_used_session_is_evicted(store):
+    for doc_id in ('a', 'b', 'c'):
+        store.create(doc_id, None, TEXT).attach('index', object(), 20 * 1024)
+    store.get('a')
+    store.create('d', None, TEXT).attach('index', object(), 20 * 1024)
+    store.touch('d')
+    assert 'b' not in store
+    assert all(doc_id in store for doc_id in ('a', 'c', 'd'))
+    assert store.get('b') is None  # Kept in memory only, so gone
+    assert store.stats()['sessions'] == 3
+
+
+def test_most_recent_session_is_kept_over_budget(store):
+    store.create('huge', None, TEXT).attach('index', object(), 1024 * 1024)
+    store.touch('huge')
+    assert 'huge' in store
+
+
+def test_expired_session_is_restored_on_first_chat(app_module, monkeypatch, tmp_path):
+    monkeypatch.setattr(app_module, 'upload_store', UploadStore(str(tmp_path / 'uploads'), enabled=True))
+    client = app_module.app.test_client()
+    text = contract_text(3, seed=404)
+    upload = lambda: client.post('/upload', data={'file': (io.BytesIO(text.encode()), "restore.txt")})
+
+    doc_id = upload().get_json()['doc_id']
+    # Expire the session
+    monkeypatch.setattr(app_module, 'session_store', SessionStore(str(tmp_path / 'sessions')))
+
+    response = upload()
+    assert response.status_code == 200
+    assert response.get_json()['doc_id'] == doc_id
+    assert doc_id not in app_module.session_store
+
+    response = client.post('/chat', json={'doc_id': doc_id, 'question': "When is payment due?"})
+    assert response.status_code == 200
+    assert response.get_json()['sources']
+    session = app_module.session_store.get(doc_id)
+    assert session.text == text
+    assert session.get('page_index').locate(len(text) - 1) == (1, text.count('\n'))
+    assert session.get('summary') == app_module.analysis_cache.get(doc_id)['summary']
+
+
+def test_expired_session_without_stored_upload_is_restored_by_the_upload(app_module, monkeypatch, tmp_path):
+    client = app_module.app.test_client()
+    text = contract_text(2, seed=405)
+    upload = lambda: client.post('/upload', data={'file': (io.BytesIO(text.encode()), "restore.txt")})
+
+    doc_id = upload().get_json()['doc_id']
+    monkeypatch.setattr(app_module, 'session_store', SessionStore(str(tmp_path / 'sessions')))
+    assert client.post('/chat', json={'doc_id': doc_id, 'question': "Payment?"}).status_code == 404
+
+    assert upload().status_code == 200
+    session = app_module.session_store.get(doc_id)
+    assert session.text == text
+    assert session.get('page_index') is not None
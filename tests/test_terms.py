@@ -0,0 +1,69 @@
+import pytest
+
+from ai_processor import DocumentProcessor
+from benchmarks.synthetic import contract_text
+from terms import TermCounter, TermVocabulary
+
+VOCABULARY = TermVocabulary({
+    'key': ['payment', 'Breach', 'party'],
+    'risk': ['governing   law', 'non-compete']
+})
+
+
+def vector_of(*pieces):
+    counter = TermCounter(VOCABULARY)
+    for piece in pieces:
+        counter.feed(piece)
+    return counter.finish()
+
+
+def test_counts_inflections_and_punctuation():
+    vector = vector_of("Payments, payment; PAYMENT's breach. The party's (breaches) “party”")
+    assert vector.count('payment') == 3
+    assert vector.count('breach') == 2
+    assert vector.count('party') == 2
+    assert vector.word_count == 8
+    assert not vector.contains('governing law')
+
+
+def test_counts_phrases_on_word_boundaries():
+    vector = vector_of("Governing law: this governing\n law applies. Misgoverning law does not. Non-compete clauses.")
+    assert vector.count('governing law') == 2
+    assert vector.count('non-compete') == 1
+    assert vector.group_counts('risk') == {'governing law': 2, 'non-compete': 1}
+    assert vector.group_total('key') == 0
+
+
+@pytest.mark.parametrize('piece_size', [1, 3, 7, 64])
+def test_pieces_count_like_the_whole_text(piece_size):
+    text = contract_text(2) + " governing law"
+    whole = vector_of(text)
+    pieces = vector_of(*[text[i:i + piece_size] for i in range(0, len(text), piece_size)])
+    assert pieces.counts == whole.counts
+    assert pieces.word_count == whole.word_count == len(text.split())
+
+
+def test_phrase_split_across_pieces_is_counted_once():
+    assert vector_of("the governing ", "law", " and governing law").count('governing law') == 2
+
+
+def test_to_dict_reports_risk_totals():
+    processor = DocumentProcessor()
+    vector = processor.term_vector("Liability for breach and damages. Termination. Payment of fees.")
+    data = vector.to_dict()
+    assert data['word_count'] == 9
+    assert data['counts']['liability'] == 1
+    assert data['risk_terms'] == {'high': 3, 'medium': 1, 'low': 1}
+
+
+def test_summary_uses_the_term_vector():
+    processor = DocumentProcessor()
+    text = "This Agreement sets payment terms. Payments are due monthly. Any breach ends it."
+    summary = processor.summarize_document(text)
+    assert summary.startswith("This appears to be a legal agreement or contract.")
+    assert "2 payment-related terms" in summary
+    assert "1 breach clauses" in summary
+    assert "approximately 13 words long" in summary
+    assert "1 high-risk elements" in summary
+    # Counted once per distinct text
+    assert processor.term_vector(text) is processor.term_vector(text)
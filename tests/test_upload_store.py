@@ -0,0 +1,92 @@
+import io
+import os
+import time
+
+import pytest
+
+import upload_store
+from upload_store import UploadBuffer, UploadStore
+
+DAY = 24 * 3600
+
+
+def upload(data, filename="contract.txt", spool_bytes=1024 * 1024, temp_dir=None):
+    return UploadBuffer(io.BytesIO(data), filename, spool_bytes, temp_dir=temp_dir)
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_buffer_spools_large_uploads(tmp_path):
+    small = upload(b"small")
+    assert not small.spooled and small.source == b"small"
+    large = upload(b"x" * 100, spool_bytes=10, temp_dir=str(tmp_path))
+    assert large.spooled and open(large.source, 'rb').read() == b"x" * 100
+    assert large.doc_id == upload(b"x" * 100).doc_id
+    large.release()
+    assert os.listdir(tmp_path) == []
+
+
+def test_disabled_store_touches_nothing(tmp_path):
+    store = UploadStore(str(tmp_path / "uploads"))
+    assert store.save(upload(b"data")) is None
+    assert not os.path.exists(tmp_path / "uploads")
+
+
+def test_save_deduplicates(tmp_path):
+    store = UploadStore(str(tmp_path), enabled=True)
+    first = store.save(upload(b"data", "a.txt"))
+    assert store.save(upload(b"data", "b.txt")) == first
+    assert os.listdir(tmp_path) == [os.path.basename(first)]
+    assert store.stats()['saved'] == 1
+    assert store.stats()['deduplicated'] == 1
+
+
+def test_oldest_files_go_first_over_budget(tmp_path):
+    store = UploadStore(str(tmp_path), enabled=True, max_bytes=250)
+    paths = []
+    for position in range(3):
+        paths.append(store.save(upload(bytes([position]) * 100)))
+        age(paths[-1], 100 - position)
+    assert [os.path.exists(path) for path in paths] == [False, True, True]
+    assert store.stats()['disk_bytes'] == 200
+
+
+def test_save_expires_old_files_at_most_once_an_interval(tmp_path):
+    store = UploadStore(str(tmp_path), enabled=True, max_age_seconds=DAY, retention_interval_seconds=60)
+    old = store.save(upload(b"old"))
+    age(old, 2 * DAY)
+
+    store._last_retention -= 30
+    store.save(upload(b"new"))
+    assert os.path.exists(old)
+
+    store._last_retention -= 30
+    store.save(upload(b"new"))  # A deduplicated save checks as well
+    assert not os.path.exists(old)
+    assert store.stats()['expired'] == 1
+    assert store.stats()['disk_bytes'] == 3
+
+
+def test_startup_expires_old_files(tmp_path):
+    path = tmp_path / "stale.txt"
+    path.write_bytes(b"stale")
+    age(path, 2 * DAY)
+    UploadStore(str(tmp_path), enabled=True, max_age_seconds=DAY)
+    assert not path.exists()
+
+
+@pytest.mark.parametrize('spooled', [False, True])
+def test_failed_write_leaves_no_temporary_file(tmp_path, monkeypatch, spooled):
+    store = UploadStore(str(tmp_path / "uploads"), enabled=True)
+
+    def fail(source, destination):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(upload_store.os, 'replace', fail)
+    buffer = upload(b"x" * 100, spool_bytes=10 if spooled else 1024, temp_dir=str(tmp_path))
+    assert store.save(buffer) is None
+    assert os.listdir(tmp_path / "uploads") == []
+    buffer.release()
@@ -0,0 +1,104 @@
+import importlib.util
+import sys
+import types
+
+import numpy as np
+import pytest
+
+import vector_index
+from vector_index import HashingEmbedder, VectorIndex
+
+DOCUMENTS = {
+    'a' * 64: ["Either party may terminate this agreement with thirty days written notice.",
+               "Payment is due within sixty days of the invoice date."],
+    'b' * 64: ["The supplier shall indemnify the customer against all damages and liabilities.",
+               "This agreement is governed by the laws of Delaware."],
+    'c' * 64: ["All confidential information must be kept secret by the receiving party.",
+               "The customer may terminate for convenience on ninety days notice."],
+}
+
+
+def chunks(texts):
+    offsets = np.cumsum([0] + [len(text) + 1 for text in texts])
+    return [{'text': text, 'chunk': position, 'start': int(offsets[position]),
+             'end': int(offsets[position]) + len(text), 'page': position + 1}
+            for position, text in enumerate(texts)]
+
+
+def fill(index):
+    for doc_id, texts in DOCUMENTS.items():
+        assert index.add_document(doc_id, f"{doc_id[0]}.pdf", chunks(texts))
+
+
+def test_embeddings_are_unit_and_deterministic():
+    embedder = HashingEmbedder(64)
+    vectors = embedder.embed(["terminate the agreement", "terminate the agreement", ""])
+    assert vectors.shape == (3, 64)
+    assert np.allclose(np.linalg.norm(vectors[:2], axis=1), 1.0)
+    assert np.array_equal(vectors[0], vectors[1])
+    assert not vectors[2].any()
+
+
+def test_add_and_search(tmp_path):
+    index = VectorIndex(str(tmp_path))
+    fill(index)
+    assert not index.add_document('a' * 64, "a.pdf", chunks(["again"]))
+
+    hits = index.search("indemnify against damages", k=1)
+    assert [(hit['doc_id'], hit['chunk'], hit['page']) for hit in hits] == [('b' * 64, 0, 1)]
+    assert hits[0]['text'] == DOCUMENTS['b' * 64][0]
+
+    # One hit per document by default; every chunk otherwise
+    hits = index.search("terminate notice", k=10)
+    assert sorted(hit['doc_id'] for hit in hits) == sorted(DOCUMENTS)
+    assert {hit['doc_id'] for hit in hits[:2]} == {'a' * 64, 'c' * 64}
+    assert len(index.search("terminate notice", k=10, per_document=False)) == 6
+    assert index.stats()['documents'] == 3
+    assert index.stats()['chunks'] == 6
+
+
+def test_reopen_and_share_between_instances(tmp_path):
+    first = VectorIndex(str(tmp_path))
+    second = VectorIndex(str(tmp_path))
+    fill(first)
+    # Another process's additions are picked up on the next search
+    assert second.contains('c' * 64)
+    assert second.search("confidential information", k=1)[0]['doc_id'] == 'c' * 64
+
+    reopened = VectorIndex(str(tmp_path))
+    assert reopened.stats()['chunks'] == 6
+    assert reopened.search("governed by Delaware law", k=1)[0]['doc_id'] == 'b' * 64
+
+
+def test_crashed_add_is_cut_off(tmp_path):
+    index = VectorIndex(str(tmp_path))
+    fill(index)
+    with open(tmp_path / vector_index.VECTORS_FILE, 'ab') as f:
+        f.write(b'\0' * 100)  # Vectors written, metadata never updated
+    index.add_document('d' * 64, "d.pdf", chunks(["The licensee owns no intellectual property."]))
+    assert VectorIndex(str(tmp_path)).search("intellectual property", k=1)[0]['doc_id'] == 'd' * 64
+
+
+def test_other_embedder_starts_a_new_index(tmp_path):
+    fill(VectorIndex(str(tmp_path)))
+    index = VectorIndex(str(tmp_path), HashingEmbedder(128))
+    assert index.stats()['documents'] == 0
+    assert index.search("terminate") == []
+
+
+def test_locks_with_msvcrt_without_fcntl(tmp_path, monkeypatch):
+    """Windows has no fcntl; vector_index must still import and lock"""
+    calls = []
+    msvcrt = types.SimpleNamespace(LK_LOCK=1, LK_UNLCK=0,
+                                   locking=lambda fd, mode, size: calls.append((mode, size)))
+    monkeypatch.setitem(sys.modules, 'fcntl', None)
+    monkeypatch.setitem(sys.modules, 'msvcrt', msvcrt)
+    spec = importlib.util.spec_from_file_location('vector_index_windows', vector_index.__file__)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    assert module.fcntl is None
+
+    index = module.VectorIndex(str(tmp_path))
+    assert index.add_document('a' * 64, "a.pdf", chunks(DOCUMENTS['a' * 64]))
+    assert calls == [(1, 1), (0, 1)]
+    assert index.search("invoice payment", k=1)[0]['chunk'] == 1
@@ -0,0 +1,184 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from extraction import document_format
+
+READ_BLOCK_SIZE = 1024 * 1024
+# Saves check for expired files at most this often
+RETENTION_INTERVAL_SECONDS = 60
+
+
+class UploadBuffer:
+    """One uploaded file, read from the request stream once.
+
+    The bytes are hashed while they are read and kept in memory; past
+    spool_bytes the upload moves to a temporary file instead, so a large
+    upload never sits in RAM twice. source is what extraction takes: the
+    bytes, or the temporary file's path.
+    """
+
+    def __init__(self, stream, filename, spool_bytes, temp_dir=None):
+        self.filename = filename
+        self.size = 0
+        self.path = None
+        self._data = None
+        digest = hashlib.sha256()
+        parts = []
+        temp_file = None
+        try:
+            for block in iter(lambda: stream.read(READ_BLOCK_SIZE), b''):
+                digest.update(block)
+                self.size += len(block)
+                if temp_file is None and self.size > spool_bytes:
+                    temp_file = tempfile.NamedTemporaryFile(
+                        prefix='upload-', suffix=document_format(filename), dir=temp_dir, delete=False
+                    )
+                    self.path = temp_file.name
+                    temp_file.writelines(parts)
+                    parts = []
+                if temp_file is not None:
+                    temp_file.write(block)
+                else:
+                    parts.append(block)
+        except BaseException:
+            if temp_file is not None:
+                temp_file.close()
+            self.release()
+            raise
+        if temp_file is not None:
+            temp_file.close()
+        else:
+            self._data = b''.join(parts)
+        self.doc_id = digest.hexdigest()
+
+    @property
+    def spooled(self):
+        return self.path is not None
+
+    @property
+    def source(self):
+        return self.path if self.path is not None else self._data
+
+    def release(self):
+        """Delete the temporary file, if the upload was spooled to one"""
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+
+class UploadStore:
+    """Optional content-addressed archive of uploaded files.
+
+    Files are stored as <sha256><extension>, so re-uploads of the same bytes
+    share one file and same-named uploads never overwrite each other.
+    Files older than max_age_seconds are deleted by the saves, at most once
+    per retention_interval_seconds, and the oldest files go first as soon as
+    the archive passes max_bytes. When disabled nothing touches the disk.
+    """
+
+    def __init__(self, upload_dir, enabled=False, max_bytes=1024 * 1024 * 1024, max_age_seconds=30 * 24 * 3600,
+                 retention_interval_seconds=RETENTION_INTERVAL_SECONDS):
+        self.upload_dir = upload_dir
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.retention_interval_seconds = retention_interval_seconds
+        self.saved = 0
+        self.deduplicated = 0
+        self.expired = 0
+        self._lock = threading.Lock()
+        self._disk_bytes = 0
+        self._last_retention = None
+        if enabled:
+            os.makedirs(upload_dir, exist_ok=True)
+            self.enforce_retention()
+
+    def path_for(self, doc_id, filename):
+        return os.path.join(self.upload_dir, doc_id + document_format(filename))
+
+    def save(self, upload):
+        """Keep a copy of an UploadBuffer; returns its path, or None when disabled"""
+        if not self.enabled:
+            return None
+        path = self.path_for(upload.doc_id, upload.filename)
+        if os.path.exists(path):
+            os.utime(path)  # Refresh its age for the retention policy
+            with self._lock:
+                self.deduplicated += 1
+                due = self._retention_due()
+            if due:
+                self.enforce_retention()
+            return path
+
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if upload.spooled:
+                shutil.copyfile(upload.path, tmp_path)
+            else:
+                with open(tmp_path, 'wb') as f:
+                    f.write(upload.source)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  Could not store upload {upload.filename}: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return None
+
+        with self._lock:
+            self.saved += 1
+            self._disk_bytes += upload.size
+            due = self._disk_bytes > self.max_bytes or self._retention_due()
+        if due:
+            self.enforce_retention()
+        return path
+
+    def _retention_due(self):
+        return time.monotonic() - self._last_retention >= self.retention_interval_seconds
+
+    def enforce_retention(self):
+        """Delete expired files, then the oldest ones until the archive fits its budget"""
+        with self._lock:
+            self._last_retention = time.monotonic()
+            entries = []
+            for entry in os.scandir(self.upload_dir):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+            entries.sort()
+            total = sum(size for _, _, size in entries)
+            cutoff = time.time() - self.max_age_seconds
+            # Trim to 90% of the budget so retention does not run on every save
+            target = self.max_bytes * 0.9
+            for mtime, path, size in entries:
+                if mtime >= cutoff and total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    self.expired += 1
+                except OSError:
+                    pass
+            self._disk_bytes = total
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "saved": self.saved,
+                "deduplicated": self.deduplicated,
+                "expired": self.expired,
+                "disk_bytes": self._disk_bytes
+            }
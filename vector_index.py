@@ -0,0 +1,331 @@
+import json
+import os
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+
+from retrieval import tokenize
+
+# One row per indexed chunk; rows of a document are contiguous
+ROW_DTYPE = np.dtype([
+    ('doc', '<u4'),
+    ('chunk', '<u4'),
+    ('page', '<u4'),
+    ('start', '<u8'),
+    ('end', '<u8'),
+    ('text_offset', '<u8'),
+    ('text_length', '<u4')
+])
+
+VECTORS_FILE = 'vectors.f32'
+ROWS_FILE = 'rows.bin'
+TEXTS_FILE = 'texts.txt'
+META_FILE = 'index.json'
+
+
+class HashingEmbedder:
+    """Offline embedder: feature-hashed unigrams and bigrams.
+
+    Each token and adjacent token pair is hashed into one of dim signed
+    buckets and the counts are log-scaled and L2-normalised, so cosine
+    similarity rewards shared vocabulary and shared phrases. Needs no model
+    download and gives the same vectors in every process.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def embed(self, texts):
+        """Return a float32 array of shape (len(texts), dim) with unit rows"""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = tokenize(text)
+            features = tokens + [a + ' ' + b for a, b in zip(tokens, tokens[1:])]
+            if not features:
+                continue
+            hashes = np.fromiter((zlib.crc32(f.encode('utf-8')) for f in features), dtype=np.uint32, count=len(features))
+            signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(vectors[row], hashes % self.dim, signs)
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).astype(np.float32)
+
+
+class SentenceTransformerEmbedder:
+    """Dense embeddings from a local sentence-transformers model"""
+
+    name = "sentence_transformers"
+
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.name = f"sentence_transformers:{model_name}"
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts):
+        return np.asarray(self.model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+
+def create_embedder(model_name=None, dim=512):
+    """Pick the embedder: a sentence-transformers model if one is configured
+    and loadable, otherwise the HashingEmbedder"""
+    if not model_name:
+        return HashingEmbedder(dim)
+    try:
+        return SentenceTransformerEmbedder(model_name)
+    except ImportError:
+        print("⚠️  sentence-transformers is not installed, using hashed embeddings")
+    except Exception as e:
+        print(f"⚠️  Could not load embedding model {model_name}: {e}")
+    return HashingEmbedder(dim)
+
+
+@contextmanager
+def file_lock(path):
+    """Hold an exclusive lock on a lock file, across processes"""
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+            return
+        # msvcrt locks a byte range and gives up after about 10 seconds, so keep trying
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                break
+            except OSError:
+                pass
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class VectorIndex:
+    """Corpus-wide chunk embedding index persisted in a directory.
+
+    Vectors and row metadata are flat little-endian files that are opened as
+    read-only memory maps, so opening the index is instant and a search only
+    pages in the vectors it scans. Chunk texts go to an append-only UTF-8
+    file and are read back only for the returned hits. Documents are
+    appended under a file lock and the row count in index.json is written
+    last, so a crashed write is simply cut off on the next add and several
+    server processes can share one directory.
+    """
+
+    def __init__(self, index_dir, embedder=None):
+        self.index_dir = index_dir
+        self.embedder = embedder or HashingEmbedder()
+        os.makedirs(index_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._meta_mtime = None
+        self._meta = None
+        self._vectors = None
+        self._rows = None
+        self._doc_starts = None
+        self.searches = 0
+        self.total_search_seconds = 0.0
+        self.last_search_seconds = 0.0
+        self._refresh()
+
+    def contains(self, doc_id):
+        self._refresh()
+        return doc_id in self._meta['doc_ids']
+
+    def add_document(self, doc_id, filename, chunks):
+        """Embed and append a document's chunks.
+
+        chunks is a list of dicts with text, chunk, start, end and page.
+        Returns False when the document is already indexed.
+        """
+        if not chunks:
+            return False
+        vectors = self.embedder.embed([chunk['text'] for chunk in chunks])
+        with self._lock, file_lock(self._path('.lock')):
+            self._refresh()
+            meta = self._meta
+            if doc_id in meta['doc_ids']:
+                return False
+            row_count = meta['rows']
+            self._truncate(row_count, meta['text_bytes'])
+
+            rows = np.zeros(len(chunks), dtype=ROW_DTYPE)
+            text_offset = meta['text_bytes']
+            encoded = []
+            for position, chunk in enumerate(chunks):
+                data = chunk['text'].encode('utf-8', 'surrogatepass')
+                encoded.append(data)
+                rows[position] = (
+                    len(meta['doc_ids']), chunk['chunk'], chunk.get('page') or 0,
+                    chunk['start'], chunk['end'], text_offset, len(data)
+                )
+                text_offset += len(data)
+
+            with open(self._path(TEXTS_FILE), 'ab') as f:
+                f.write(b''.join(encoded))
+            with open(self._path(ROWS_FILE), 'ab') as f:
+                f.write(rows.tobytes())
+            with open(self._path(VECTORS_FILE), 'ab') as f:
+                f.write(vectors.astype('<f4').tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            meta['doc_ids'].append(doc_id)
+            meta['filenames'].append(filename)
+            meta['doc_starts'].append(row_count)
+            meta['rows'] = row_count + len(chunks)
+            meta['text_bytes'] = text_offset
+            self._write_meta(meta)
+            self._refresh(force=True)
+        return True
+
+    def search(self, query, k=10, per_document=True):
+        """Return the top-k chunks by cosine similarity to the query.
+
+        With per_document only the best chunk of each document is returned,
+        so k documents come back rather than k passages from one contract.
+        """
+        started = time.perf_counter()
+        self._refresh()
+        meta, vectors, rows, doc_starts = self._meta, self._vectors, self._rows, self._doc_starts
+        if vectors is None or k <= 0:
+            return []
+        query_vector = self.embedder.embed([query])[0]
+        scores = vectors @ query_vector
+
+        if per_document:
+            # Rows of a document are contiguous: take each document's best row
+            candidates = self._best_rows(scores, doc_starts)
+        else:
+            candidates = np.arange(len(scores))
+
+        candidate_scores = scores[candidates]
+        if len(candidates) > k:
+            top = np.argpartition(-candidate_scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+        top = top[np.argsort(-candidate_scores[top], kind='stable')]
+
+        results = []
+        with open(self._path(TEXTS_FILE), 'rb') as texts:
+            for position in top:
+                row_id = int(candidates[position])
+                row = rows[row_id]
+                texts.seek(int(row['text_offset']))
+                text = texts.read(int(row['text_length'])).decode('utf-8', 'surrogatepass')
+                results.append({
+                    "doc_id": meta['doc_ids'][row['doc']],
+                    "filename": meta['filenames'][row['doc']],
+                    "chunk": int(row['chunk']),
+                    "page": int(row['page']) or None,
+                    "start": int(row['start']),
+                    "end": int(row['end']),
+                    "score": round(float(candidate_scores[position]), 4),
+                    "text": text
+                })
+
+        self.last_search_seconds = time.perf_counter() - started
+        self.searches += 1
+        self.total_search_seconds += self.last_search_seconds
+        return results
+
+    def stats(self):
+        self._refresh()
+        return {
+            "embedder": self.embedder.name,
+            "dim": self.embedder.dim,
+            "documents": len(self._meta['doc_ids']),
+            "chunks": self._meta['rows'],
+            "vector_bytes": self._meta['rows'] * self.embedder.dim * 4,
+            "searches": self.searches,
+            "last_search_ms": round(self.last_search_seconds * 1000, 3),
+            "avg_search_ms": round(self.total_search_seconds / self.searches * 1000, 3) if self.searches else 0.0
+        }
+
+    @staticmethod
+    def _best_rows(scores, doc_starts):
+        """Index of the highest-scoring row of each document, vectorised"""
+        doc_best = np.maximum.reduceat(scores, doc_starts)
+        doc_of_row = np.repeat(np.arange(len(doc_starts)), np.diff(np.append(doc_starts, len(scores))))
+        hits = np.flatnonzero(scores == doc_best[doc_of_row])
+        # First row reaching its document's maximum
+        _, first = np.unique(doc_of_row[hits], return_index=True)
+        return hits[first]
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def _empty_meta(self):
+        return {
+            "embedder": self.embedder.name,
+            "dim": self.embedder.dim,
+            "rows": 0,
+            "text_bytes": 0,
+            "doc_ids": [],
+            "filenames": [],
+            "doc_starts": []
+        }
+
+    def _write_meta(self, meta):
+        temp_path = self._path(META_FILE + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, self._path(META_FILE))
+
+    def _truncate(self, row_count, text_bytes):
+        """Cut off anything a crashed add left past the recorded row count"""
+        for name, size in ((VECTORS_FILE, row_count * self.embedder.dim * 4),
+                           (ROWS_FILE, row_count * ROW_DTYPE.itemsize),
+                           (TEXTS_FILE, text_bytes)):
+            path = self._path(name)
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+
+    def _refresh(self, force=False):
+        """Reopen the memory maps if another process or thread added documents"""
+        meta_path = self._path(META_FILE)
+        try:
+            mtime = os.stat(meta_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if not force and self._meta is not None and mtime == self._meta_mtime:
+            return
+
+        meta = self._empty_meta()
+        if mtime is not None:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+            if stored.get('embedder') == self.embedder.name and stored.get('dim') == self.embedder.dim:
+                meta = stored
+            else:
+                print(f"⚠️  Vector index in {self.index_dir} was built with {stored.get('embedder')} "
+                      f"({stored.get('dim')} dims), starting a new index")
+                self._truncate(0, 0)
+                self._write_meta(meta)
+                mtime = os.stat(meta_path).st_mtime_ns
+
+        rows = meta['rows']
+        if rows:
+            self._vectors = np.memmap(self._path(VECTORS_FILE), dtype='<f4', mode='r', shape=(rows, self.embedder.dim))
+            self._rows = np.memmap(self._path(ROWS_FILE), dtype=ROW_DTYPE, mode='r', shape=(rows,))
+            self._doc_starts = np.asarray(meta['doc_starts'], dtype=np.int64)
+        else:
+            self._vectors = self._rows = self._doc_starts = None
+        self._meta = meta
+        self._meta_mtime = mtime